@@ -0,0 +1,106 @@
+"""
+Hedged requests across the model fallback chain.
+
+Instead of waiting for each model to fail before trying the next, the first
+model is called and, if it hasn't answered within the hedge delay, the next
+model is called as well. Whichever produces a reply first wins and the other
+attempt is told to stop. A failed attempt is replaced by the next model
+straight away, and the whole thing gives up once the per-request budget is
+spent.
+
+Counters for how often hedges fire and win are kept for /test/ai_hedging.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='ai-hedge')
+
+_stats_lock = threading.Lock()
+_stats = {
+    'requests': 0,
+    'hedged': 0,              # requests where at least one hedge was sent
+    'primary_wins': 0,
+    'hedge_wins': 0,          # the reply came from a model started by the hedge timer
+    'cancelled': 0,           # attempts stopped because another model won
+    'all_failed': 0,
+    'budget_exhausted': 0,
+}
+
+
+def _count(**increments):
+    with _stats_lock:
+        for key, value in increments.items():
+            _stats[key] += value
+
+
+def hedge_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    finished = stats['primary_wins'] + stats['hedge_wins']
+    stats['hedge_win_rate'] = round(stats['hedge_wins'] / finished, 3) if finished else None
+    return stats
+
+
+def run_hedged(models, call, hedge_delay, budget, max_in_flight=2):
+    """Race `call(model, cancel_event)` across `models`; returns (model, reply) or (None, None).
+
+    `call` returns the reply, or None if the model failed. It should return
+    early once its cancel event is set.
+    """
+    _count(requests=1)
+    deadline = time.monotonic() + budget
+    queue = list(models)
+    in_flight = {}       # future -> (model, cancel event, started by the hedge timer)
+    hedged = False
+
+    def launch(as_hedge):
+        model = queue.pop(0)
+        cancel = threading.Event()
+        in_flight[_executor.submit(call, model, cancel)] = (model, cancel, as_hedge)
+
+    try:
+        if queue:
+            launch(False)
+        while in_flight:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                print(f"AI request budget of {budget}s spent - giving up")
+                _count(budget_exhausted=1)
+                return None, None
+
+            can_hedge = bool(queue) and len(in_flight) < max_in_flight
+            done, _ = wait(list(in_flight), timeout=min(left, hedge_delay) if can_hedge else left,
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                if can_hedge and time.monotonic() < deadline:
+                    print(f"No reply after {hedge_delay}s - hedging with {queue[0]}")
+                    if not hedged:
+                        _count(hedged=1)
+                        hedged = True
+                    launch(True)
+                continue
+
+            for future in done:
+                model, _, as_hedge = in_flight.pop(future)
+                try:
+                    reply = future.result()
+                except Exception as e:
+                    print(f"Hedged attempt on {model} failed with error: {str(e)}")
+                    reply = None
+                if reply is not None:
+                    _count(**{'hedge_wins' if as_hedge else 'primary_wins': 1})
+                    return model, reply
+            # Replace failed attempts right away rather than waiting for the hedge timer
+            if not in_flight and queue:
+                launch(False)
+
+        _count(all_failed=1)
+        return None, None
+    finally:
+        if in_flight:
+            _count(cancelled=len(in_flight))
+        for future, (_, cancel, _) in in_flight.items():
+            cancel.set()
+            future.cancel()
@@ -0,0 +1,177 @@
+"""
+Pooled HTTP client for the OpenRouter API.
+
+All model calls share one requests.Session per process, so keep-alive
+connections are reused across attempts, fallbacks and requests instead of
+paying a new TCP + TLS handshake each time. Timeouts are split into connect
+and read, and every attempt records where its time went:
+
+    dns_ms      name resolution (only on a new connection)
+    connect_ms  TCP connect (only on a new connection)
+    tls_ms      TLS handshake (only on a new connection)
+    ttfb_ms     request sent -> response headers received, including any of the above
+    total_ms    whole attempt, including reading the body
+
+Recent attempts are kept in memory for /test/ai_timings.
+"""
+
+import os
+import socket
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NameResolutionError
+from urllib3.util.connection import allowed_gai_family
+
+_settings = {
+    'pool_size': 10,
+    'connect_timeout': 5,
+    'read_timeout': 30,
+}
+
+_local = threading.local()
+_session_lock = threading.Lock()
+_session = None
+_session_pid = None
+
+recent_attempts = deque(maxlen=200)
+
+
+def configure(pool_size=None, connect_timeout=None, read_timeout=None):
+    """Set pool size and timeouts; takes effect for the next session created"""
+    global _session
+    for key, value in (('pool_size', pool_size), ('connect_timeout', connect_timeout), ('read_timeout', read_timeout)):
+        if value is not None:
+            _settings[key] = value
+    with _session_lock:
+        _session = None
+
+
+def _current_timing():
+    return getattr(_local, 'timing', None)
+
+
+def _elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+class _TimedConnectionMixin:
+    """Records DNS, TCP and TLS time for new connections into the current attempt"""
+
+    def _new_conn(self):
+        timing = _current_timing()
+        if timing is not None:
+            timing['reused_connection'] = False
+        started = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        if timing is not None:
+            timing['dns_ms'] = _elapsed_ms(started)
+
+        started = time.perf_counter()
+        host = self._dns_host
+        error = None
+        try:
+            # Connect to the already-resolved addresses so DNS isn't looked up twice
+            for address in dict.fromkeys(info[4][0] for info in addresses):
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except Exception as e:
+                    error = e
+            else:
+                raise error
+        finally:
+            self._dns_host = host
+        if timing is not None:
+            timing['connect_ms'] = _elapsed_ms(started)
+        return sock
+
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        timing = _current_timing()
+        if timing is not None and 'connect_ms' in timing:
+            timing['tls_ms'] = round(_elapsed_ms(started) - timing['dns_ms'] - timing['connect_ms'], 1)
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools use the timed connection classes and which records TTFB"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        response = super().send(request, **kwargs)
+        timing = _current_timing()
+        if timing is not None:
+            timing['ttfb_ms'] = _elapsed_ms(started)
+            if timing['reused_connection'] is None:
+                timing['reused_connection'] = True
+        return response
+
+
+def get_session():
+    """The process-wide Session (recreated after a fork, e.g. in each gunicorn worker)"""
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = TimedHTTPAdapter(pool_connections=_settings['pool_size'], pool_maxsize=_settings['pool_size'])
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session, _session_pid = session, os.getpid()
+        return _session
+
+
+@contextmanager
+def attempt(model):
+    """Time one model attempt; requests made inside the block fill in the timing dict"""
+    timing = {'model': model, 'status': None, 'reused_connection': None, 'error': None}
+    _local.timing = timing
+    started = time.perf_counter()
+    try:
+        yield timing
+    except Exception as e:
+        timing['error'] = str(e)
+        raise
+    finally:
+        _local.timing = None
+        timing['total_ms'] = _elapsed_ms(started)
+        recent_attempts.append(timing)
+        print(f"AI attempt timing: {timing}")
+
+
+def post(url, **kwargs):
+    """session.post with the configured (connect, read) timeout"""
+    kwargs.setdefault('timeout', (_settings['connect_timeout'], _settings['read_timeout']))
+    return get_session().post(url, **kwargs)
@@ -1,23 +1,59 @@
 import os
+import sys
 import sqlite3
+import click
 import requests
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, redirect, flash, url_for, session, send_from_directory, jsonify, g 
+from flask import Flask, render_template, request, redirect, flash, url_for, session, jsonify, g, Response, stream_with_context
 from werkzeug.utils import secure_filename
 from flask_mail import Mail
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import inspect
+from sqlalchemy import inspect, text, event
 import json
 
 
 from dotenv import load_dotenv
 from email_utils import (
     create_verification_token,
-    send_verification_email,
+    build_verification_email,
     verify_token,
     log_verification_attempt,
     mark_email_verified
 )
+from company_cache import (
+    VersionedCache,
+    install_change_counter,
+    SELECT_COMPANY_VERSION_SQL
+)
+from company_retrieval import BM25Index, select_companies
+from response_cache import ResponseCache
+from local_answers import LocalAnswerer
+from db_connections import (
+    DATABASES,
+    BUSY_TIMEOUT_MS,
+    connect,
+    configure_connection,
+    configure_databases,
+    get_connection,
+    release_connections,
+    connection_stats
+)
+import ai_http
+from model_router import ModelRouter, parse_retry_after
+from ai_hedge import run_hedged, hedge_stats
+from email_queue import EmailDeliveryWorker, enqueue_email
+from company_search import search_companies, count_matches
+from static_assets import StaticAssets
+from upload_store import store_upload, digests_in, sync_refs, DIGEST_RE
+from image_pipeline import (
+    UPLOAD_EXTENSIONS,
+    ImageWorkerPool,
+    add_pending_image,
+    get_image_records,
+    picture_html
+)
+from industry_taxonomy import assign_industry_ids, install_industries
+from partner_matches import MatchRefresher, vendor_connections
 
 # Load environment variables
 load_dotenv()
@@ -27,8 +63,13 @@ load_dotenv()
 
 
 app = Flask(__name__)
-# your DB config and Company model here...
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///companies.db'
+# One companies database: the ORM uses the same ./companies.db as db_connections, the importer, leads search
+# and partner matches (a relative sqlite:/// URI would resolve to instance/companies.db instead). The file is
+# looked up per connection, so repointing DATABASES['partner'] moves the ORM with it
+app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.abspath(DATABASES['partner'])
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'creator': lambda: sqlite3.connect(DATABASES['partner'], timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+}
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # Configure Flask for proper URL generation
@@ -36,19 +77,40 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your_secret_key_here_change_
 app.config['SERVER_NAME'] = None  # Let Flask auto-detect
 app.config['PREFERRED_URL_SCHEME'] = 'http'
 
+# AI assistant prompt size: how many companies /ask may include and their JSON size ceiling
+app.config['AI_PROMPT_TOP_K'] = int(os.getenv('AI_PROMPT_TOP_K', 8))
+app.config['AI_PROMPT_MAX_CHARS'] = int(os.getenv('AI_PROMPT_MAX_CHARS', 6000))
+
+# Cached /ask replies: entry count, lifetime in seconds, and how similar (Jaccard over the question's
+# words) a question must be to reuse another's reply. 1 (the default) = same words in any order only;
+# below 1, the words the two questions don't share must still be filler (see response_cache.py)
+app.config['AI_CACHE_SIZE'] = int(os.getenv('AI_CACHE_SIZE', 500))
+app.config['AI_CACHE_TTL'] = float(os.getenv('AI_CACHE_TTL', 3600))
+app.config['AI_CACHE_SIMILARITY'] = float(os.getenv('AI_CACHE_SIMILARITY', 1))
+
+# Leads search paging: default page size, hard cap on ?limit=, and how far result counts go
+app.config['LEADS_PAGE_SIZE'] = 20
+app.config['LEADS_MAX_PAGE_SIZE'] = 100
+app.config['LEADS_COUNT_CAP'] = 1000
+
+# Most companies connections_page lists from the vendor's own and adjacent industries
+app.config['CONNECTIONS_LIMIT'] = int(os.getenv('CONNECTIONS_LIMIT', 50))
+
+# Seconds between background passes over changed profiles/companies for partner_matches (0 = never)
+app.config['MATCH_REFRESH_INTERVAL'] = float(os.getenv('MATCH_REFRESH_INTERVAL', 60))
+
+# Set the databases up in create_app(). Deploys run `python app.py init-db` as a release step and
+# set AUTO_MIGRATE=false, so workers only check the databases are current and refuse to start otherwise
+app.config['AUTO_MIGRATE'] = os.getenv('AUTO_MIGRATE', 'True').lower() == 'true'
+
 
 db = SQLAlchemy()
 db.init_app(app)
 
-# Initialize database tables (only if they don't exist)
 with app.app_context():
-    # Check if company table exists
-    inspector = inspect(db.engine)
-    if not inspector.has_table('company'):
-        print("Creating company table...")
-        db.create_all()
-    else:
-        print("Company table already exists")
+    # Same pragmas (WAL, busy timeout, ...) for SQLAlchemy's connections as for db_connections.
+    # Creating the engine doesn't connect; tables are created by init_databases(), not on import
+    event.listen(db.engine, 'connect', lambda dbapi_conn, record: configure_connection(dbapi_conn))
 
 
 class Company(db.Model):
@@ -59,6 +121,18 @@ class Company(db.Model):
     mobile = db.Column(db.String(50))
     email = db.Column(db.String(100))
     services = db.Column(db.String(300))
+    industry = db.Column(db.String(100))
+    country = db.Column(db.String(100))
+
+
+def create_company_table():
+    """Create the company table if it doesn't exist, and the triggers keeping the cached AI prompt in sync with it"""
+    with app.app_context():
+        if not inspect(db.engine).has_table('company'):
+            print("Creating company table...")
+            db.create_all()
+        with db.engine.begin() as conn:
+            install_change_counter(conn.exec_driver_sql)
 
 
 
@@ -72,7 +146,9 @@ def get_company_prompt_data():
                     "name": c.name,
                     "website": c.address,
                     "services": c.services.split(", ") if c.services else [],
-                    "contact": f"{c.email} | {c.phone or ''} | {c.mobile or ''}"
+                    "contact": f"{c.email} | {c.phone or ''} | {c.mobile or ''}",
+                    "industry": c.industry or '',
+                    "country": c.country or ''
                 }
                 for c in companies
             ]
@@ -80,12 +156,20 @@ def get_company_prompt_data():
         print(f"Error fetching company data: {str(e)}")
         return []
 
-def create_system_prompt():
-    companies_data = get_company_prompt_data()
+def company_data_version():
+    """Return the company table change counter, or None if it can't be read"""
+    try:
+        with app.app_context():
+            return db.session.execute(text(SELECT_COMPANY_VERSION_SQL)).scalar()
+    except Exception as e:
+        print(f"Error reading company data version: {str(e)}")
+        return None
+
+def format_system_prompt(companies_data, heading="Here are our registered partner companies with their details:"):
     return f"""
 You are a helpful AI assistant for Africa House Pakistan Trade Portal. You help users find information about our partner companies.
 
-Here are our registered partner companies with their details:
+{heading}
 
 {json.dumps(companies_data, indent=2)}
 
@@ -106,6 +190,37 @@ INSTRUCTIONS:
 8. never include this symbol in your response "*".
 """
 
+def build_system_prompt():
+    return format_system_prompt(get_company_prompt_data())
+
+# Both rebuilt only when the company table changes (see company_cache.py)
+system_prompt_cache = VersionedCache(build_system_prompt, company_data_version)
+company_index_cache = VersionedCache(lambda: BM25Index(get_company_prompt_data()), company_data_version)
+local_answerer_cache = VersionedCache(lambda: LocalAnswerer(get_company_prompt_data()), company_data_version)
+response_cache = ResponseCache(
+    max_entries=app.config['AI_CACHE_SIZE'],
+    ttl=app.config['AI_CACHE_TTL'],
+    similarity=app.config['AI_CACHE_SIMILARITY']
+)
+
+def create_system_prompt():
+    """Full-directory prompt (kept for scripts; /ask uses create_retrieval_prompt)"""
+    return system_prompt_cache.get()
+
+def create_retrieval_prompt(user_message):
+    """Prompt with only the companies relevant to user_message. Returns (prompt, companies_included)"""
+    companies_data = select_companies(
+        company_index_cache.get(),
+        user_message,
+        top_k=app.config['AI_PROMPT_TOP_K'],
+        max_chars=app.config['AI_PROMPT_MAX_CHARS']
+    )
+    prompt = format_system_prompt(
+        companies_data,
+        heading="Here are the registered partner companies most relevant to the user's question:"
+    )
+    return prompt, len(companies_data)
+
 try:
     from flask_cors import CORS
     CORS(app)
@@ -124,9 +239,26 @@ app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
 app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER')
 app.config['APP_NAME'] = os.getenv('APP_NAME', 'Africa House Pakistan')
 
+app.config['EMAIL_DELIVERY_THREADS'] = int(os.getenv('EMAIL_DELIVERY_THREADS', 2))
+
 # Initialize Flask-Mail
 mail = Mail(app)
 
+# Verification emails go through the outbox in database.db and are sent by background threads
+email_worker = EmailDeliveryWorker(app, mail, threads=app.config['EMAIL_DELIVERY_THREADS'])
+
+def queue_verification_email(user_id, email, full_name, verification_token):
+    """Log the attempt and put the verification email in the outbox. Returns False if it couldn't be queued"""
+    try:
+        message = build_verification_email(email, full_name, verification_token)
+        log_id = log_verification_attempt(user_id, email, verification_token)
+        enqueue_email(get_user_db(), message, log_id)
+        email_worker.start()
+        return True
+    except Exception as e:
+        print(f"Error queueing verification email: {str(e)}")
+        return False
+
 
 
 @app.route('/signup', methods=['GET', 'POST'])
@@ -158,10 +290,15 @@ def signup():
 
             # Check if email already exists (check for verified users only)
             print(f"Checking if email {email} already exists...")
-            conn = sqlite3.connect('database.db')
+            conn = get_user_db()
             cursor = conn.cursor()
 
             # First, clean up any duplicate unverified accounts for this email
+            # (their verification logs are kept but detached, as foreign keys are enforced)
+            cursor.execute('''
+                UPDATE email_verification_logs SET user_id = NULL
+                WHERE user_id IN (SELECT id FROM users WHERE email = ? AND email_verified = 0)
+            ''', (email,))
             cursor.execute('DELETE FROM users WHERE email = ? AND email_verified = 0', (email,))
             deleted_count = cursor.rowcount
             if deleted_count > 0:
@@ -175,7 +312,6 @@ def signup():
 
             if existing_verified_user:
                 print(f"Verified account with email {email} already exists")
-                conn.close()
                 flash("An account with this email already exists and is verified.", "error")
                 return render_template('Register_page.html')
 
@@ -197,23 +333,20 @@ def signup():
             user_id = cursor.lastrowid
             print(f"User inserted successfully with ID: {user_id}")
             conn.commit()
-            conn.close()
 
-            # Send verification email
-            print("Attempting to send verification email...")
-            email_sent = send_verification_email(mail, email, full_name, verification_token)
+            # Queue verification email (sent in the background)
+            print("Queueing verification email...")
+            email_queued = queue_verification_email(user_id, email, full_name, verification_token)
 
-            if email_sent:
-                print("Verification email sent successfully")
-                # Log verification attempt
-                log_verification_attempt(user_id, email, verification_token)
+            if email_queued:
+                print("Verification email queued successfully")
 
                 # Store email in session for verification page
                 session['pending_verification_email'] = email
 
                 return redirect(url_for('verification_sent'))
             else:
-                print("Failed to send verification email")
+                print("Failed to queue verification email")
                 # Store email in session for manual verification
                 session['pending_verification_email'] = email
                 session['verification_failed'] = True
@@ -255,7 +388,7 @@ def verify_email(token):
 
         if email:
             # Check if user exists and is not already verified
-            conn = sqlite3.connect('database.db')
+            conn = get_user_db()
             cursor = conn.cursor()
             cursor.execute('SELECT id, email_verified, full_name FROM users WHERE email = ?', (email,))
             user = cursor.fetchone()
@@ -264,14 +397,12 @@ def verify_email(token):
                 user_id, is_verified, full_name = user
 
                 if is_verified:
-                    conn.close()
                     return render_template('verification_result.html',
                                          status='already_verified',
                                          message='Your email is already verified!')
 
                 # Mark email as verified
                 success = mark_email_verified(email)
-                conn.close()
 
                 if success:
                     # Clear session
@@ -286,7 +417,6 @@ def verify_email(token):
                                          status='error',
                                          message='Failed to verify email. Please try again.')
             else:
-                conn.close()
                 return render_template('verification_result.html',
                                      status='error',
                                      message='User not found.')
@@ -314,7 +444,7 @@ def manual_verification():
 
         try:
             # Verify the token manually
-            conn = sqlite3.connect('database.db')
+            conn = get_user_db()
             cursor = conn.cursor()
 
             # Check if user exists with this email and token
@@ -328,7 +458,6 @@ def manual_verification():
 
             if not user:
                 flash("Invalid email or verification token.", "error")
-                conn.close()
                 return render_template('manual_verification.html')
 
             user_id, db_token, expires = user
@@ -336,7 +465,6 @@ def manual_verification():
             # Check if token has expired
             if expires and datetime.now() > datetime.fromisoformat(expires):
                 flash("Verification token has expired. Please register again.", "error")
-                conn.close()
                 return render_template('manual_verification.html')
 
             # Verify the user
@@ -347,7 +475,6 @@ def manual_verification():
             ''', (user_id,))
 
             conn.commit()
-            conn.close()
 
             flash("Email verified successfully! You can now login.", "success")
             return redirect(url_for('login'))
@@ -370,7 +497,7 @@ def resend_verification():
 
     try:
         # Check if user exists and is not verified
-        conn = sqlite3.connect('database.db')
+        conn = get_user_db()
         cursor = conn.cursor()
         cursor.execute('SELECT id, email_verified, full_name FROM users WHERE email = ?', (email,))
         user = cursor.fetchone()
@@ -379,7 +506,6 @@ def resend_verification():
             user_id, is_verified, full_name = user
 
             if is_verified:
-                conn.close()
                 flash("Email is already verified!", "info")
                 return redirect(url_for('login'))
 
@@ -394,25 +520,22 @@ def resend_verification():
                 WHERE email = ?
             ''', (verification_token, token_expires, email))
             conn.commit()
-            conn.close()
 
-            # Send verification email
-            print(f"Attempting to resend verification email to {email}...")
-            email_sent = send_verification_email(mail, email, full_name, verification_token)
+            # Queue verification email (sent in the background)
+            print(f"Queueing verification email resend to {email}...")
+            email_queued = queue_verification_email(user_id, email, full_name, verification_token)
 
-            if email_sent:
-                print("Verification email resent successfully")
-                log_verification_attempt(user_id, email, verification_token)
+            if email_queued:
+                print("Verification email resend queued successfully")
                 session['pending_verification_email'] = email
                 flash("Verification email sent successfully!", "success")
                 return redirect(url_for('verification_sent'))
             else:
-                print("Failed to resend verification email")
+                print("Failed to queue verification email resend")
                 session['pending_verification_email'] = email
                 flash("Failed to send verification email due to a network issue. Your account is created and ready - you can try again or contact support for manual verification.", "warning")
                 return redirect(url_for('verification_sent'))
         else:
-            conn.close()
             flash("No account found with this email address.", "error")
             return redirect(url_for('signup'))
 
@@ -422,15 +545,85 @@ def resend_verification():
         return redirect(url_for('signup'))
 
 def get_logged_in_user(user_id):
-    conn = sqlite3.connect('database.db')
+    conn = get_user_db()
     cursor = conn.cursor()
     cursor.execute("SELECT id, full_name, email, mobile_number,company_name FROM users WHERE id = ?", (user_id,))
     row = cursor.fetchone()
-    conn.close()
     if row:
         return {'id': row[0], 'name': row[1], 'email': row[2], 'mobile_number': row[3], 'company_name': row[4]}
     return None
 import json
+
+def store_uploaded_image(file_storage):
+    """Save an upload and queue it for resizing (see image_pipeline.py).
+
+    Returns the URL of the original file, which pages show until the variants
+    are ready, or None if it doesn't look like an image.
+    """
+    extension = os.path.splitext(secure_filename(file_storage.filename))[1].lower()
+    if extension not in UPLOAD_EXTENSIONS:
+        print(f"Rejected upload {file_storage.filename}: not an image file")
+        return None
+    # Stored under the SHA-256 of its bytes (see upload_store.py), so identical uploads share one file
+    conn = get_user_db()
+    digest, filename, created = store_upload(conn, file_storage.stream, app.config['UPLOAD_FOLDER'], extension)
+    src = url_for('static', filename='uploads/' + filename)
+    record = get_image_records(conn, [src]).get(src)
+    if created or record is None or record['status'] == 'failed':
+        path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        add_pending_image(conn, src, path)
+        image_pool.submit(src, path)
+    return src
+
+def sync_profile_uploads(conn, user_id, *values):
+    """Record which stored uploads the profile's logo/product fields point at (refcounts for upload GC)"""
+    sync_refs(conn, f'profile:{user_id}', digests_in(*values))
+
+def store_product_images():
+    """Save and queue product_image1..5 from the request; returns {product number: URL}"""
+    urls = {}
+    for i in range(1, 6):
+        image = request.files.get(f'product_image{i}')
+        if image and image.filename:
+            url = store_uploaded_image(image)
+            if url:
+                urls[i] = url
+    return urls
+
+def attach_product_images(products_and_services, urls):
+    """Point products in the JSON list at their processed image instead of the inline data: URL preview"""
+    if not urls:
+        return products_and_services
+    try:
+        products = json.loads(products_and_services)
+    except (TypeError, ValueError):
+        return products_and_services
+    for product in products if isinstance(products, list) else []:
+        if isinstance(product, dict) and product.get('id') in urls:
+            product['image'] = urls[product['id']]
+    return json.dumps(products)
+
+@app.route('/image_status')
+def image_status():
+    """Processing status and variants for ?src=<url>&src=<url>... (polled by pages showing new uploads)"""
+    records = get_image_records(get_user_db(), request.args.getlist('src')[:50])
+    return jsonify({'images': {
+        src: {
+            'status': row['status'],
+            'fallback': row['fallback'] or row['src'],
+            'srcset': row['srcset'],
+            'webp_srcset': row['webp_srcset'],
+            'avif_srcset': row['avif_srcset'],
+        }
+        for src, row in records.items()
+    }})
+
+@app.template_global()
+def responsive_image(url, alt='', sizes='100vw', **attrs):
+    """<picture> with srcset for an uploaded image; a plain <img> for anything else"""
+    record = get_image_records(get_user_db(), [url]).get(url) if url else None
+    return picture_html(url, record, alt=alt, sizes=sizes, **attrs)
+
 @app.route('/vendor_profile', methods=['GET', 'POST'])
 def vendor_profile():
     if 'user_id' not in session:
@@ -441,7 +634,7 @@ def vendor_profile():
     user = get_logged_in_user(user_id)
     print("Logged in user:", user_id)
 
-    conn = sqlite3.connect('database.db')
+    conn = get_user_db()
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -474,19 +667,9 @@ def vendor_profile():
         logo_url = company_logo
 
         if uploaded_logo and uploaded_logo.filename:
-            filename = secure_filename(uploaded_logo.filename)
-            path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            uploaded_logo.save(path)
-            logo_url = url_for('static', filename='uploads/' + filename)
-
-        product_image_urls = []
-        for i in range(1, 6):
-            image = request.files.get(f'product_image{i}')
-            if image and image.filename:
-                imgname = secure_filename(image.filename)
-                imgpath = os.path.join(app.config['UPLOAD_FOLDER'], imgname)
-                image.save(imgpath)
-                product_image_urls.append(url_for('static', filename='uploads/' + imgname))
+            logo_url = store_uploaded_image(uploaded_logo) or logo_url
+
+        product_image_urls = list(store_product_images().values())
 
         # Get text input values
         description = request.form.get('product_description')
@@ -536,11 +719,13 @@ def vendor_profile():
                 email, phone, website
             ))
 
+        sync_profile_uploads(conn, user_id, logo_url, ','.join(product_image_urls), products_and_services)
+        assign_industry_ids(conn, 'company_profiles')
         conn.commit()
+        match_refresher.start()
         flash("Company profile updated successfully!", "success")
         return redirect(url_for('vendor_profile'))
 
-    conn.close()
     products_and_services = profile[7] if profile else '[]'
     try:
         products = json.loads(products_and_services)
@@ -585,23 +770,14 @@ def update_vendor_profile():
     uploaded_logo = request.files.get('company_logo')
     logo_url = None
     if uploaded_logo and uploaded_logo.filename:
-        filename = secure_filename(uploaded_logo.filename)
-        path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        uploaded_logo.save(path)
-        logo_url = url_for('static', filename='uploads/' + filename)
+        logo_url = store_uploaded_image(uploaded_logo)
 # Save logo_url in your UPDATE/INSERT SQL
-    product_image_urls = []
-    for i in range(1, 6):  # Adjust range for your max number of images
-        image = request.files.get(f'product_image{i}')
-        if image and image.filename:
-            imgname = secure_filename(image.filename)
-            imgpath = os.path.join(app.config['UPLOAD_FOLDER'], imgname)
-            image.save(imgpath)
-            product_image_urls.append(url_for('static', filename='uploads/' + imgname))
-    product_images = ','.join(product_image_urls)
+    product_image_urls = store_product_images()
+    product_images = ','.join(product_image_urls.values())
+    products_and_services = attach_product_images(products_and_services, product_image_urls)
 
     try:
-        conn = sqlite3.connect('database.db')
+        conn = get_user_db()
         cursor = conn.cursor()
         # Check if profile exists
         cursor.execute("SELECT id FROM company_profiles WHERE user_id = ?", (user_id,))
@@ -622,8 +798,10 @@ def update_vendor_profile():
             """, (
                 user_id, product_images, logo_url, company_name, location, industry, about_us, email, phone, website, products_and_services
             ))
+        sync_profile_uploads(conn, user_id, logo_url, product_images, products_and_services)
+        assign_industry_ids(conn, 'company_profiles')
         conn.commit()
-        conn.close()
+        match_refresher.start()
         return jsonify({'success': True})
     except Exception as e:
         print(f"Error updating vendor profile: {str(e)}")
@@ -648,7 +826,7 @@ def login():
 
         try:
             # Check user credentials
-            conn = sqlite3.connect('database.db')
+            conn = get_user_db()
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT id, email, password, full_name, role, email_verified
@@ -656,7 +834,6 @@ def login():
                 WHERE email = ?
             ''', (email,))
             user = cursor.fetchone()
-            conn.close()
 
             if not user:
                 flash("Invalid email or password.", "error")
@@ -735,7 +912,7 @@ def vendor_dashboard():
 @app.route('/images/<path:filename>')
 def serve_images(filename):
     """Serve image files"""
-    return send_from_directory('static/images', filename)
+    return static_assets.send_from('images', filename)
 
 @app.route('/')
 def index():
@@ -761,36 +938,112 @@ MODELS = [
 
 MODEL = MODELS[0]  # Use the first model by default
 
+OPENROUTER_URL = os.getenv('OPENROUTER_URL', "https://openrouter.ai/api/v1/chat/completions")
+
+DEFAULT_SYSTEM_PROMPT = "You are a helpful AI assistant for Africa House Pakistan. Answer only business-related questions."
+
+FALLBACK_REPLY = """I'm currently experiencing high demand and some technical difficulties. However, I can still help you with:
+
+• Finding buyers and suppliers across Africa and Pakistan
+• Trade opportunities and market insights
+• Business connections and networking
+• Export/import guidance
+
+Please try asking your question again in a moment, or contact our support team for immediate assistance."""
+
+def build_ai_request(model, user_message, system_prompt=None, stream=False):
+    """Headers and JSON body for one OpenRouter chat completion"""
+    headers = {
+        "Authorization": f"Bearer {API_KEY}",
+        "Content-Type": "application/json"
+    }
+
+    data = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_prompt or DEFAULT_SYSTEM_PROMPT},
+            {"role": "user", "content": user_message}
+        ]
+    }
+    if stream:
+        data["stream"] = True
+    return headers, data
+
+# Shared keep-alive connection pool for OpenRouter calls (per gunicorn worker)
+app.config['AI_HTTP_POOL_SIZE'] = int(os.getenv('AI_HTTP_POOL_SIZE', 10))
+app.config['AI_CONNECT_TIMEOUT'] = float(os.getenv('AI_CONNECT_TIMEOUT', 5))
+app.config['AI_READ_TIMEOUT'] = float(os.getenv('AI_READ_TIMEOUT', 30))
+ai_http.configure(
+    pool_size=app.config['AI_HTTP_POOL_SIZE'],
+    connect_timeout=app.config['AI_CONNECT_TIMEOUT'],
+    read_timeout=app.config['AI_READ_TIMEOUT']
+)
+
+# Per-model health shared by all workers: models that keep failing are skipped
+# for a while and the rest are tried fastest-and-most-reliable first
+app.config['AI_ROUTER_FAILURE_THRESHOLD'] = int(os.getenv('AI_ROUTER_FAILURE_THRESHOLD', 3))
+app.config['AI_ROUTER_OPEN_SECONDS'] = float(os.getenv('AI_ROUTER_OPEN_SECONDS', 30))
+model_router = ModelRouter(
+    lambda: get_connection('router'),
+    failure_threshold=app.config['AI_ROUTER_FAILURE_THRESHOLD'],
+    open_seconds=app.config['AI_ROUTER_OPEN_SECONDS'],
+    # A half-open model's trial request is given up on after at most this long
+    trial_seconds=app.config['AI_CONNECT_TIMEOUT'] + app.config['AI_READ_TIMEOUT']
+)
+
+def record_model_failure(model, timing, response=None, error=None):
+    """Feed a failed attempt to the router; a 429 opens the circuit for its Retry-After"""
+    retry_after = None
+    if response is not None:
+        error = error or f"HTTP {response.status_code}"
+        if response.status_code == 429:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+    model_router.record_failure(model, timing['total_ms'] if timing else 0, error, retry_after)
+
+# Optional hedging: if the first model hasn't answered after AI_HEDGE_DELAY
+# seconds, the next one is asked too and the first reply wins. AI_REQUEST_BUDGET
+# caps the total time spent on one question.
+app.config['AI_HEDGING'] = os.getenv('AI_HEDGING', 'false').lower() == 'true'
+app.config['AI_HEDGE_DELAY'] = float(os.getenv('AI_HEDGE_DELAY', 3))
+app.config['AI_REQUEST_BUDGET'] = float(os.getenv('AI_REQUEST_BUDGET', 45))
+
+def iter_stream_tokens(response, cancel=None):
+    """Content pieces from an OpenRouter streaming response; stops early once `cancel` is set"""
+    for line in response.iter_lines(decode_unicode=True):
+        if cancel is not None and cancel.is_set():
+            return
+        # Skip blank separators and SSE comments such as ": OPENROUTER PROCESSING"
+        if not line or not line.startswith("data:"):
+            continue
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            return
+        choices = json.loads(payload).get("choices") or [{}]
+        token = (choices[0].get("delta") or {}).get("content")
+        if token:
+            yield token
+
 def try_ai_request(user_message, system_prompt=None, models_to_try=None):
     """Try AI request with different models until one works"""
     if models_to_try is None:
-        models_to_try = MODELS
+        models_to_try = model_router.order(MODELS)
+    if app.config['AI_HEDGING']:
+        return hedged_ai_request(user_message, system_prompt, models_to_try)
 
     for model in models_to_try:
+        timing = None
         try:
             print(f"Trying model: {model}")
 
-            headers = {
-                "Authorization": f"Bearer {API_KEY}",
-                "Content-Type": "application/json"
-            }
-
-            data = {
-                "model": model,
-                "messages": [
-                    {"role": "system", "content": system_prompt or "You are a helpful AI assistant for Africa House Pakistan. Answer only business-related questions."},
-                    {"role": "user", "content": user_message}
-                ]
-            }
+            headers, data = build_ai_request(model, user_message, system_prompt)
 
             # Debug: Log what we're sending to AI
             print(f"Sending to AI - User message: {user_message}")
             print(f"System prompt being used: {len(system_prompt) if system_prompt else 0} characters")
 
-            response = requests.post("https://openrouter.ai/api/v1/chat/completions",
-                                   headers=headers,
-                                   json=data,
-                                   timeout=30)
+            with ai_http.attempt(model) as timing:
+                response = ai_http.post(OPENROUTER_URL, headers=headers, json=data)
+                timing['status'] = response.status_code
 
             print(f"Model {model} - Response Status: {response.status_code}")
 
@@ -800,33 +1053,182 @@ def try_ai_request(user_message, system_prompt=None, models_to_try=None):
                     ai_reply = response_data["choices"][0]["message"]["content"]
                     print(f"Success with model: {model}")
                     print(f"AI Response: {ai_reply[:200]}...")
+                    model_router.record_success(model, timing['total_ms'])
                     return {"reply": ai_reply, "model_used": model}
+                record_model_failure(model, timing, error="empty reply")
             elif response.status_code == 429:
                 print(f"Model {model} rate limited (429) - trying next model")
+                record_model_failure(model, timing, response)
                 continue
             else:
                 print(f"Model {model} failed with status {response.status_code}: {response.text}")
+                record_model_failure(model, timing, response)
 
         except Exception as e:
             print(f"Model {model} failed with error: {str(e)}")
+            record_model_failure(model, timing, error=str(e))
             continue
 
-    fallback_response = """I'm currently experiencing high demand and some technical difficulties. However, I can still help you with:
+    return {"reply": FALLBACK_REPLY, "model_used": "fallback"}
 
-• Finding buyers and suppliers across Africa and Pakistan
-• Trade opportunities and market insights
-• Business connections and networking
-• Export/import guidance
+def hedged_model_attempt(model, user_message, system_prompt, cancel):
+    """One model's attempt inside hedged_ai_request; returns the reply or None.
 
-Please try asking your question again in a moment, or contact our support team for immediate assistance."""
+    The reply is requested as a stream so that a losing attempt can stop
+    reading and close its connection as soon as another model has won.
+    """
+    timing = None
+    try:
+        print(f"Trying model (hedged): {model}")
+        headers, data = build_ai_request(model, user_message, system_prompt, stream=True)
+        with ai_http.attempt(model) as timing, \
+                ai_http.post(OPENROUTER_URL, headers=headers, json=data, stream=True) as response:
+            timing['status'] = response.status_code
+            if response.status_code != 200:
+                record_model_failure(model, timing, response)
+                return None
+            reply = ''.join(iter_stream_tokens(response, cancel))
+        if cancel.is_set():
+            # Lost the race; not the model's fault, so no failure is recorded
+            print(f"Model {model} cancelled - another model answered first")
+            return None
+        if not reply:
+            record_model_failure(model, timing, error="empty reply")
+            return None
+        model_router.record_success(model, timing['total_ms'])
+        return reply
+    except Exception as e:
+        print(f"Model {model} failed with error: {str(e)}")
+        if not cancel.is_set():
+            record_model_failure(model, timing, error=str(e))
+        return None
+
+def hedged_ai_request(user_message, system_prompt, models_to_try):
+    """try_ai_request with hedging; see ai_hedge.py"""
+    model, reply = run_hedged(
+        models_to_try,
+        lambda model, cancel: hedged_model_attempt(model, user_message, system_prompt, cancel),
+        hedge_delay=app.config['AI_HEDGE_DELAY'],
+        budget=app.config['AI_REQUEST_BUDGET']
+    )
+    if reply is None:
+        return {"reply": FALLBACK_REPLY, "model_used": "fallback"}
+    print(f"Success with model: {model}")
+    return {"reply": reply, "model_used": model}
+
+def stream_ai_request(user_message, system_prompt=None, models_to_try=None):
+    """Streaming version of try_ai_request.
+
+    Yields ("model", name) once the first token arrives, then ("token", text)
+    for each piece of the reply. A model that fails before sending anything is
+    skipped like in try_ai_request; a failure mid-reply yields ("error", message).
+    """
+    if models_to_try is None:
+        models_to_try = model_router.order(MODELS)
 
-    return {"reply": fallback_response, "model_used": "fallback"}
+    for model in models_to_try:
+        started = False
+        timing = None
+        try:
+            print(f"Trying model (streaming): {model}")
+            headers, data = build_ai_request(model, user_message, system_prompt, stream=True)
+
+            with ai_http.attempt(model) as timing, \
+                    ai_http.post(OPENROUTER_URL, headers=headers, json=data, stream=True) as response:
+                timing['status'] = response.status_code
+                print(f"Model {model} - Response Status: {response.status_code}")
+                if response.status_code != 200:
+                    record_model_failure(model, timing, response)
+                    continue
+
+                for token in iter_stream_tokens(response):
+                    if not started:
+                        started = True
+                        yield "model", model
+                    yield "token", token
+
+            if started:
+                print(f"Success with model: {model}")
+                model_router.record_success(model, timing['total_ms'])
+                return
+            record_model_failure(model, timing, error="empty reply")
+        except Exception as e:
+            print(f"Model {model} failed with error: {str(e)}")
+            record_model_failure(model, timing, error=str(e))
+            if started:
+                yield "error", "The response was interrupted. Please try again."
+                return
+
+    yield "model", "fallback"
+    yield "token", FALLBACK_REPLY
+
+def sse_event(event, data):
+    """Format one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def stream_ask_response(user_message, system_prompt, companies_count, data_version=None):
+    """SSE body for /ask: a meta event with the model, token events, then done"""
+    model_used, parts, failed = None, [], False
+    for kind, value in stream_ai_request(user_message, system_prompt=system_prompt):
+        if kind == "model":
+            model_used = value
+            yield sse_event("meta", {"model_used": value, "companies_included": companies_count})
+        elif kind == "token":
+            parts.append(value)
+            yield sse_event("token", {"text": value})
+        else:
+            failed = True
+            yield sse_event("error", {"error": value})
+    yield sse_event("done", {})
+    if not failed and model_used != "fallback":
+        cache_reply(user_message, data_version, ''.join(parts), model_used, companies_count, system_prompt)
+
+def stream_complete_reply(reply, meta):
+    """SSE body for a reply that is already complete (cache hit or local answer): one token event"""
+    yield sse_event("meta", meta)
+    yield sse_event("token", {"text": reply})
+    yield sse_event("done", {})
+
+def cache_reply(user_message, data_version, reply, model_used, companies_count, system_prompt):
+    """Remember a model reply for repeats of this question"""
+    response_cache.put(
+        user_message, data_version, reply, model_used, companies_count,
+        request_bytes=len(system_prompt.encode('utf-8')) + len(user_message.encode('utf-8'))
+    )
 
 # Test route to check if Flask is working
 @app.route('/test', methods=['GET'])
 def test():
     return jsonify({"status": "Flask is working!", "message": "API endpoint is accessible"})
 
+# Connection reuse counters for the SQLite databases
+@app.route('/test/db_stats', methods=['GET'])
+def test_db_stats():
+    return jsonify(connection_stats())
+
+# Per-attempt timing (DNS, connect, TLS, TTFB, total) for recent OpenRouter calls
+@app.route('/test/ai_timings', methods=['GET'])
+def test_ai_timings():
+    return jsonify(list(ai_http.recent_attempts))
+
+# How often hedged requests fired and which attempt won
+@app.route('/test/ai_hedging', methods=['GET'])
+def test_ai_hedging():
+    return jsonify(hedge_stats())
+
+# Hit rate and bytes saved by the /ask response cache
+@app.route('/test/ai_cache', methods=['GET'])
+def test_ai_cache():
+    return jsonify(response_cache.stats())
+
+# Rolling latency, success rate and circuit state per model
+@app.route('/test/model_router', methods=['GET'])
+def test_model_router():
+    return jsonify({
+        "order": model_router.order(MODELS, claim_trials=False),
+        "models": model_router.stats()
+    })
+
 # Test POST route
 @app.route('/test_post', methods=['POST'])
 def test_post():
@@ -853,24 +1255,67 @@ def ask():
             print("ERROR: Empty message")
             return jsonify({"error": "Empty message"}), 400
 
+        wants_stream = request.json.get('stream') or 'text/event-stream' in request.headers.get('Accept', '')
+
+        # Structured questions (list all, contact details, who offers X) are answered from the table
+        local = local_answerer_cache.get().answer(user_message)
+        if local:
+            print(f"Answered locally (intent: {local['intent']})")
+            meta = {"model_used": "local", "intent": local["intent"], "companies_included": local["companies_included"]}
+            if wants_stream:
+                return Response(
+                    stream_complete_reply(local["reply"], meta),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'}
+                )
+            return jsonify(dict(meta, reply=local["reply"]))
+
         # Check API key
         if not API_KEY:
             print("ERROR: API_KEY is not set")
             return jsonify({"error": "API configuration error"}), 500
 
+        # Repeated (or near-identical) questions are answered from the cache
+        data_version = company_data_version()
+        cached = response_cache.get(user_message, data_version)
+        if cached:
+            print(f"Serving cached reply (model {cached['model_used']})")
+            if wants_stream:
+                return Response(
+                    stream_complete_reply(cached["reply"], {
+                        "model_used": cached["model_used"],
+                        "companies_included": cached["companies_included"],
+                        "cached": True
+                    }),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'}
+                )
+            return jsonify({
+                "reply": cached["reply"],
+                "model_used": cached["model_used"],
+                "companies_included": cached["companies_included"],
+                "cached": True
+            })
+
         print(f"Trying AI request with message: {user_message}")
 
         # Try the AI request with multiple models
-        # Create dynamic system prompt from DB
+        # Create system prompt from the companies relevant to this message
         print("Creating system prompt with company data...")
-        system_prompt = create_system_prompt()
+        system_prompt, companies_count = create_retrieval_prompt(user_message)
         print(f"System prompt created. Length: {len(system_prompt)} characters")
         print(f"System prompt preview: {system_prompt[:300]}...")
-
-        # Debug: Check if companies data is in the prompt
-        companies_count = system_prompt.count('"name":')
         print(f"Number of companies in system prompt: {companies_count}")
 
+        # Stream tokens as Server-Sent Events when the client asks for it
+        if wants_stream:
+            print("Streaming AI response...")
+            return Response(
+                stream_with_context(stream_ask_response(user_message, system_prompt, companies_count, data_version)),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+
         # Call AI with prompt + message
         print("Calling AI with company data...")
         result = try_ai_request(user_message, system_prompt=system_prompt)
@@ -880,7 +1325,9 @@ def ask():
             model_used = result.get('model_used', 'unknown')
             print(f"Response generated! Model used: {model_used}")
             print(f"AI Reply: {result['reply']}")
-            return jsonify({"reply": result["reply"], "model_used": model_used})
+            if model_used != "fallback":
+                cache_reply(user_message, data_version, result["reply"], model_used, companies_count, system_prompt)
+            return jsonify({"reply": result["reply"], "model_used": model_used, "companies_included": companies_count})
         else:
             # This shouldn't happen with our fallback, but just in case
             print(f"Unexpected result: {result}")
@@ -907,37 +1354,45 @@ def ask():
 
 app.secret_key = 'your_secret_key' # Required for session & flash
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
+# Modern formats written next to the JPEG fallback for each upload (e.g. "webp,avif")
+app.config['IMAGE_FORMATS'] = tuple(f.strip() for f in os.getenv('IMAGE_FORMATS', 'webp').split(',') if f.strip())
+# Worker processes resizing uploads; 0 processes them inside the request
+app.config['IMAGE_WORKERS'] = int(os.getenv('IMAGE_WORKERS', 2))
 
 # Ensure upload folder exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Fingerprinted url_for('static', ...) URLs, immutable caching and precompressed CSS/JS (see static_assets.py).
+# Content-addressed uploads are immutable under their own names
+static_assets = StaticAssets(
+    app,
+    immutable=lambda filename: filename.startswith('uploads/') and DIGEST_RE.search(filename)
+)
+
+# Precomputed connections_page recommendations, updated as profiles and companies change
+match_refresher = MatchRefresher(app.config['MATCH_REFRESH_INTERVAL'])
+
+image_pool = ImageWorkerPool(
+    lambda: connect('user'),
+    app.config['IMAGE_FORMATS'],
+    processes=app.config['IMAGE_WORKERS']
+)
 
 
-DATABASE_USER = 'database.db'
-DATABASE_PARTNER = 'companies.db'
 
 def get_user_db():
-    db = getattr(g, '_user_db', None)
-    if db is None:
-        db = g._user_db = sqlite3.connect(DATABASE_USER)
-        db.row_factory = sqlite3.Row
-    return db
+    return get_connection('user')
 
 def get_partner_db():
-    db = getattr(g, '_partner_db', None)
-    if db is None:
-        db = g._partner_db = sqlite3.connect(DATABASE_PARTNER)
-        db.row_factory = sqlite3.Row
-    return db
+    return get_connection('partner')
+
+def get_contact_db():
+    return get_connection('contact')
 
 @app.teardown_appcontext
 def close_connections(exception):
-    user_db = getattr(g, '_user_db', None)
-    if user_db:
-        user_db.close()
-    partner_db = getattr(g, '_partner_db', None)
-    if partner_db:
-        partner_db.close()
+    # Connections stay open for reuse by this thread; see db_connections.py
+    release_connections(exception)
 
 @app.route('/connections_page')
 def connections_page():
@@ -947,7 +1402,7 @@ def connections_page():
 
     user_id = session.get('user_id')
     user_db = get_user_db()
-    cur = user_db.execute("SELECT industry FROM company_profiles WHERE user_id = ?", (user_id,))
+    cur = user_db.execute("SELECT industry, industry_id FROM company_profiles WHERE user_id = ?", (user_id,))
     row = cur.fetchone()
 
     if not row:
@@ -956,13 +1411,11 @@ def connections_page():
     user_industry = row['industry']
     print(f"user_industry: '{user_industry}'")
 
-    partner_db = get_partner_db()
+    match_refresher.start()
     try:
-        cur2 = partner_db.execute(
-            "SELECT * FROM company WHERE LOWER(TRIM(industry)) = LOWER(TRIM(?))",
-            (user_industry,)
-        )
-        similar_companies = cur2.fetchall()
+        # Precomputed by partner_matches.py; until the first refresh, same and adjacent industries.
+        # One query: the user connection has companies.db attached
+        similar_companies = vendor_connections(user_db, user_id, app.config['CONNECTIONS_LIMIT'])
     except sqlite3.Error as e:
         return f"Database error: {e}", 500
 
@@ -973,26 +1426,29 @@ def connections_page():
     )
 
 
-@app.route('/leads_page', methods=['GET'])
-def leads_page():
-    if not session.get('logged_in'):
-        flash("Please log in to access this page.", "warning")
-        return redirect(url_for('login'))
+# Common stopwords to ignore in leads searches
+LEADS_STOPWORDS = {'i', 'the', 'of', 'want', 'to', 'and', 'a', 'start', 'in','export','import', 'for', 'on', 'at', 'is'}
 
-    query = request.args.get('query', '').strip().lower()
-    partner_db = get_partner_db()
+def find_leads(partner_db, query, after=None, limit=None):
+    """One page of leads for `query` (all companies when empty).
 
-    # Common stopwords to ignore
-    stopwords = {'i', 'the', 'of', 'want', 'to', 'and', 'a', 'start', 'in','export','import', 'for', 'on', 'at', 'is'}
+    Pages are keyset-based: `after` is the id of the last company already shown.
+    Returns (results, next_after, total, total_capped) where total counts at most
+    LEADS_COUNT_CAP matches and total_capped says whether there may be more.
+    """
+    cap = app.config['LEADS_COUNT_CAP']
+    # Split query and filter out stopwords
+    words = [word for word in query.split() if word not in LEADS_STOPWORDS]
 
-    if query:
-        # Split query and filter out stopwords
-        words = [word for word in query.split() if word not in stopwords]
+    if query and not words:
+        return [], None, 0, False  # No meaningful words left
 
-        if not words:
-            search_results = []  # No meaningful words left
-        else:
-            like_clauses = " OR ".join([
+    if query and company_search_enabled():
+        results = search_companies(partner_db, words, after=after, limit=limit + 1)
+        total = count_matches(partner_db, words, cap + 1)
+    else:
+        if query:
+            where = " OR ".join([
                 "(LOWER(name) LIKE ? OR LOWER(industry) LIKE ? OR LOWER(services) LIKE ?)"
                 for _ in words
             ])
@@ -1000,35 +1456,132 @@ def leads_page():
             for word in words:
                 like_word = f"%{word}%"
                 params.extend([like_word, like_word, like_word])
+        else:
+            where, params = "1", []
+
+        total = partner_db.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM company WHERE {where} LIMIT ?)",
+            (*params, cap + 1)
+        ).fetchone()[0]
+        cur = partner_db.execute(f"""
+            SELECT * FROM company
+            WHERE ({where}) AND id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (*params, after or 0, limit + 1))
+        results = [dict(row) for row in cur.fetchall()]
+
+    next_after = None
+    if len(results) > limit:
+        results = results[:limit]
+        next_after = results[-1]['id']
+    return results, next_after, min(total, cap), total > cap
+
+def get_leads_page_args():
+    """Read ?query=, ?after= and ?limit= with the server-side page size cap applied"""
+    query = request.args.get('query', '').strip().lower()
+    after = request.args.get('after', type=int)
+    limit = request.args.get('limit', app.config['LEADS_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, app.config['LEADS_MAX_PAGE_SIZE']))
+    return query, after, limit
 
-            cur = partner_db.execute(f"""
-                SELECT * FROM company
-                WHERE {like_clauses}
-            """, tuple(params))
-            search_results = cur.fetchall()
-    else:
-        cur = partner_db.execute("SELECT * FROM company LIMIT 20")
-        search_results = cur.fetchall()
-
-    return render_template('leads_page.html', search_results=search_results, query=query)
-
-def init_db():
-    conn = sqlite3.connect('contact_messages.db')
-    cur = conn.cursor()
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS contact_messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            company_name TEXT NOT NULL,
-            email TEXT NOT NULL,
-            purpose TEXT NOT NULL,
-            subject TEXT NOT NULL
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-init_db()
+@app.route('/leads_page', methods=['GET'])
+def leads_page():
+    if not session.get('logged_in'):
+        flash("Please log in to access this page.", "warning")
+        return redirect(url_for('login'))
+
+    query, after, limit = get_leads_page_args()
+    search_results, next_after, total, total_capped = find_leads(get_partner_db(), query, after, limit)
+
+    return render_template('leads_page.html', search_results=search_results, query=query,
+                           next_after=next_after, limit=limit, total=total, total_capped=total_capped)
+
+@app.route('/leads_page/data', methods=['GET'])
+def leads_page_data():
+    """JSON variant of leads_page, used to lazy-load further pages"""
+    if not session.get('logged_in'):
+        return jsonify({'success': False, 'error': 'Not logged in'}), 401
+
+    query, after, limit = get_leads_page_args()
+    results, next_after, total, total_capped = find_leads(get_partner_db(), query, after, limit)
+    return jsonify({
+        'success': True,
+        'results': results,
+        'next_after': next_after,
+        'total': total,
+        'total_capped': total_capped
+    })
+
+def init_databases():
+    """Put every database in WAL mode, create the company table, apply pending schema migrations
+    and bring the industry taxonomy up to date"""
+    from migrations import migrate_all
+    print(f"SQLite journal modes: {configure_databases()}")
+    create_company_table()
+    migrate_all()
+    # Not a versioned migration: new industries or synonyms in the code must reach existing
+    # databases, and rows the previous taxonomy couldn't resolve get another try
+    for name, table in (('partner', 'company'), ('user', 'company_profiles')):
+        conn = connect(name)
+        try:
+            install_industries(conn, table)
+        finally:
+            conn.close()
+
+@app.cli.command('init-db')
+@click.option('--check', is_flag=True, help="Also fail if a route query does a full table scan")
+def init_db_command(check):
+    """Create or upgrade the app's databases (run at deploy time, before the workers start)"""
+    init_databases()
+    if check:
+        from migrations import main as migrations_main
+        status = migrations_main(['--check'])
+        if status:
+            raise SystemExit(status)
+
+def resume_uploaded_images():
+    """Finish processing uploads a restart interrupted"""
+    resumed = image_pool.resume_pending()
+    if resumed:
+        print(f"Resumed processing of {resumed} uploaded images")
+
+def company_search_enabled():
+    """Whether the FTS5 index used by leads_page exists (this SQLite build may lack FTS5), looked up once"""
+    global COMPANY_FTS_ENABLED
+    if COMPANY_FTS_ENABLED is None:
+        COMPANY_FTS_ENABLED = get_partner_db().execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'company_fts'"
+        ).fetchone() is not None
+    return COMPANY_FTS_ENABLED
+
+COMPANY_FTS_ENABLED = None
+
+_started = False
+
+def create_app(config=None):
+    """Return the app ready to serve, with `config` applied (gunicorn loads "app:create_app()").
+
+    Importing this module does no database I/O; the first call sets the databases up (or only
+    checks them, with AUTO_MIGRATE off), resumes interrupted uploads and starts email delivery. Settings read at import,
+    such as cache and pool sizes, still come from the environment.
+    """
+    global _started
+    if config:
+        app.config.update(config)
+    if not _started:
+        if app.config['AUTO_MIGRATE']:
+            init_databases()
+        else:
+            from migrations import schema_status
+            pending = {name: versions for name, (_, versions) in schema_status().items() if versions}
+            if pending:
+                raise RuntimeError(f"Pending schema migrations {pending}: run `python app.py init-db` first")
+        resume_uploaded_images()
+        # Deliver what the outbox still holds from before the restart (queued, retries, stale claims)
+        email_worker.start()
+        _started = True
+    return app
 
 
 # ---------- Routes ----------
@@ -1050,14 +1603,13 @@ def submit_contact_form():
         if not all([name, company_name, email, purpose, subject]):
             return jsonify({'success': False, 'message': 'All fields are required'}), 400
 
-        conn = sqlite3.connect('contact_messages.db')
+        conn = get_contact_db()
         cur = conn.cursor()
         cur.execute('''
             INSERT INTO contact_messages (name, company_name, email, purpose, subject)
             VALUES (?, ?, ?, ?, ?)
         ''', (name, company_name, email, purpose, subject))
         conn.commit()
-        conn.close()
 
         return jsonify({'success': True})
     except Exception as e:
@@ -1068,5 +1620,8 @@ def submit_contact_form():
 
 
 if __name__ == '__main__':
-    
-    app.run(debug=True)
+    if sys.argv[1:2] == ['init-db']:
+        # Same as `flask --app app init-db`, which can't import this folder as a package
+        with app.app_context():
+            init_db_command.main(sys.argv[2:], prog_name='app.py init-db')
+    create_app().run(debug=True)
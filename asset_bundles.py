@@ -0,0 +1,350 @@
+"""
+Build step for the page stylesheets and scripts.
+
+Each large template includes static/css/pages/<page>.css and
+static/js/pages/<page>.js (see static_assets.py). build_bundles() minifies
+them into static/dist and records the result in static/dist/manifest.json.
+
+The dashboard pages repeat much of their CSS (header, sidebar, profile
+menu, footer). For each bundle in SHARED_BUNDLES the rules that all of its
+pages have are moved into one stylesheet, loaded before the page's own, so
+it is downloaded once for all of them. A rule is only moved when that can't
+change the cascade: wherever moving it reverses its order with another rule
+of the page, the two must not set the same property, with selectors of the
+same specificity, on an element both can match (judged from the selectors
+and from which classes the templates and scripts put on the same element). Rules that fail the check stay in the
+page's stylesheet.
+
+Minifying needs rcssmin and rjsmin; without them the files are copied as
+they are.
+"""
+
+import json
+import os
+import re
+from static_assets import MANIFEST, StaticAssets
+
+# Bundles of the rules common to all their pages, loaded in this order before the page's own
+# stylesheet. A page can be in several; later bundles are built from what earlier ones left
+SHARED_BUNDLES = (
+    ('base', ('vendor_profile', 'contact_us', 'leads_page', 'connections_page', 'vendor_dashboard', 'ai_assistant')),
+    ('dashboard', ('leads_page', 'connections_page', 'vendor_dashboard')),
+)
+
+VENDOR_PREFIX_RE = re.compile(r'^-(webkit|moz|ms|o)-')
+DECLARATION_RE = re.compile(r'(?:^|;)\s*(--[\w-]+|-?[a-zA-Z][\w-]*)\s*:')
+RULE_RE = re.compile(r'([^{}]+)\{([^{}]*)\}')
+
+# Shorthands whose longhands don't share their first word
+SHORTHAND_FAMILIES = {
+    'inset': {'top', 'right', 'bottom', 'left'},
+    'font': {'line'},
+    'place': {'align', 'justify'},
+    'gap': {'row', 'column', 'grid'},
+    'grid': {'gap', 'row', 'column'},
+    'columns': {'column'},
+}
+
+PSEUDO_ELEMENTS = ('before', 'after', 'first-line', 'first-letter', 'placeholder', 'selection', 'marker')
+CLASS_ATTRIBUTE_RE = re.compile(r'class(?:Name)?\s*=\s*(["\'`])(.*?)\1', re.S)
+DYNAMIC_CLASS_LINE_RE = re.compile(r'^.*\b(?:classList|className)\b.*$', re.M)
+QUOTED_RE = re.compile(r'(["\'`])([\w\s-]+)\1')
+
+
+def _minifiers():
+    try:
+        from rcssmin import cssmin
+        from rjsmin import jsmin
+    except ImportError:
+        print("rcssmin/rjsmin are not installed - copying CSS/JS unminified (pip install rcssmin rjsmin)")
+        return (lambda css: css), (lambda js: js)
+    return cssmin, jsmin
+
+
+def css_blocks(css):
+    """Top-level rules and at-rules of a stylesheet, comments removed (@media etc. kept whole)"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    blocks = []
+    start = depth = 0
+    quote = None
+    for i, char in enumerate(css):
+        if quote:
+            if char == quote and css[i - 1] != '\\':
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                blocks.append(css[start:i + 1].strip())
+                start = i + 1
+        elif char == ';' and depth == 0:
+            # @charset / @import statements
+            blocks.append(css[start:i + 1].strip())
+            start = i + 1
+    return [block for block in blocks if block]
+
+
+def _families(declarations):
+    """Property families a declaration list sets: margin-top -> margin, plus shorthand overlaps"""
+    families = set()
+    for prop in DECLARATION_RE.findall(declarations):
+        if prop.startswith('--'):
+            families.add(prop)
+            continue
+        family = VENDOR_PREFIX_RE.sub('', prop.lower()).split('-')[0]
+        if family == 'all':
+            return {'*'}
+        families.add(family)
+        families |= SHORTHAND_FAMILIES.get(family, set())
+    return families
+
+
+def _split_top_level(text, separators):
+    """Split on any of `separators` outside (...) and [...]"""
+    parts, depth, current = [], 0, ''
+    for char in text:
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        if depth == 0 and char in separators:
+            parts.append(current)
+            current = ''
+        else:
+            current += char
+    parts.append(current)
+    return [part.strip() for part in parts if part.strip()]
+
+
+def subject(selector):
+    """What the rightmost part of a selector requires of the element: (tag, id, classes, pseudo-element).
+    Pseudo-classes and attribute selectors are ignored, which only makes it match more"""
+    compound = _split_top_level(selector, ' >+~')[-1] if selector.strip() else ''
+    pseudo = None
+    for found in re.finditer(r'::?([\w-]+)', re.sub(r'\([^)]*\)', '', compound)):
+        if found.group(0).startswith('::') or found.group(1) in PSEUDO_ELEMENTS:
+            pseudo = found.group(1)
+    plain = re.sub(r'\[[^\]]*\]|::?[\w-]+(\([^)]*\))?', '', compound)
+    tag = re.match(r'^([a-zA-Z][\w-]*)', plain)
+    tag = tag.group(1).lower() if tag else None
+    if ':root' in compound:
+        tag = 'html'
+    ids = re.findall(r'#([\w-]+)', plain)
+    return tag, ids[0] if ids else None, frozenset(re.findall(r'\.([\w-]+)', plain)), pseudo
+
+
+def specificity(selector):
+    """(ids, classes/attributes/pseudo-classes, tags/pseudo-elements) of a selector, or None when
+    it has functional pseudo-classes (:is(), :not(), ...) this doesn't work out"""
+    if re.search(r':(?:is|where|not|has|matches|-\w+-any)\(', selector):
+        return None
+    pseudo_elements = r'::[\w-]+|:(?:%s)\b' % '|'.join(PSEUDO_ELEMENTS)
+    elements = len(re.findall(pseudo_elements, selector))
+    rest = re.sub(pseudo_elements, ' ', selector)
+    ids = len(re.findall(r'#[\w-]+', rest))
+    classes = len(re.findall(r'\.[\w-]+|\[[^\]]*\]|:[\w-]+(?:\([^)]*\))?', rest))
+    rest = re.sub(r'#[\w-]+|\.[\w-]+|\[[^\]]*\]|:[\w-]+(?:\([^)]*\))?', ' ', rest)
+    return ids, classes, elements + len(re.findall(r'[a-zA-Z][\w-]*', rest))
+
+
+def block_rules(block):
+    """[(set of (subject, specificity), property families)] for each style rule in a block (several for @media)"""
+    prelude = block.split('{', 1)[0].strip()
+    if prelude.startswith(('@keyframes', '@-webkit-keyframes', '@font-face', '@import', '@charset')):
+        return [({(('@', prelude, frozenset(), None), None)}, {prelude})]
+    body = block[block.index('{') + 1:block.rindex('}')] if prelude.startswith('@') else block
+    return [
+        ({(subject(selector), specificity(selector)) for selector in _split_top_level(selectors, ',')},
+         _families(declarations))
+        for selectors, declarations in RULE_RE.findall(body)
+    ]
+
+
+class ClassUsage:
+    """Which classes the markup puts on the same element, to tell whether .a and .b can both match"""
+
+    def __init__(self, texts=()):
+        self.sets = []
+        self.dynamic = set()    # added from JS, or next to a template expression: may go anywhere
+        for text in texts:
+            for _, value in CLASS_ATTRIBUTE_RE.findall(text):
+                classes = set(re.findall(r'[\w-]+', re.sub(r'\{\{.*?\}\}|\$\{.*?\}|\{%.*?%\}', ' ', value)))
+                if re.search(r'\{\{|\$\{|\{%', value):
+                    self.dynamic |= classes
+                self.sets.append(classes)
+            for line in DYNAMIC_CLASS_LINE_RE.findall(text):
+                for _, value in QUOTED_RE.findall(line):
+                    self.dynamic |= set(value.split())
+
+    def together(self, classes):
+        if len(classes) <= 1 or classes & self.dynamic:
+            return True
+        return any(classes <= used for used in self.sets)
+
+
+def may_match_same(a, b, usage):
+    tag_a, id_a, classes_a, pseudo_a = a
+    tag_b, id_b, classes_b, pseudo_b = b
+    if tag_a == '@' or tag_b == '@':
+        return a == b
+    if pseudo_a != pseudo_b:
+        return False
+    if tag_a and tag_b and tag_a != tag_b:
+        return False
+    if id_a and id_b and id_a != id_b:
+        return False
+    return usage.together(classes_a | classes_b)
+
+
+def conflicts(rules_a, rules_b, usage):
+    """Whether the order of two blocks can matter: they set a common property, with selectors of
+    equal specificity, on an element both can match"""
+    for subjects_a, families_a in rules_a:
+        for subjects_b, families_b in rules_b:
+            if not (families_a & families_b or '*' in families_a or '*' in families_b):
+                continue
+            for x, weight_x in subjects_a:
+                for y, weight_y in subjects_b:
+                    # Otherwise the more specific one wins wherever it is (!important aside, and
+                    # that doesn't depend on the order either)
+                    same_weight = weight_x is None or weight_y is None or weight_x == weight_y
+                    if same_weight and may_match_same(x, y, usage):
+                        return True
+    return False
+
+
+def split_shared(pages, usage=None, earlier=None):
+    """{page: [minified blocks in original order]} -> (shared blocks, {page: remaining blocks}).
+
+    earlier is {page: blocks already moved into bundles loaded before this one}.
+    """
+    usage = usage or ClassUsage()
+    earlier = earlier or {}
+    names = list(pages)
+    position = {}
+    for name in names:
+        counts = {}
+        for block in pages[name]:
+            counts[block] = counts.get(block, 0) + 1
+        # Rules appearing twice in one page are left alone
+        position[name] = {block: i for i, block in enumerate(pages[name]) if counts[block] == 1}
+    rules = {block: block_rules(block) for name in names for block in pages[name]}
+
+    shared = []
+    moved = set()
+    for block in pages[names[0]]:
+        if not all(block in position[name] and block not in earlier.get(name, ()) for name in names):
+            continue
+        ok = True
+        for name in names:
+            here = position[name][block]
+            for i, other in enumerate(pages[name]):
+                if other == block:
+                    continue
+                # Earlier bundles and the rules already in this one will load before it, the
+                # rest of the page after it; where that flips the original order, they mustn't conflict
+                loads_after = other not in earlier.get(name, ()) and other not in moved
+                if (i > here) != loads_after and conflicts(rules[other], rules[block], usage):
+                    ok = False
+                    break
+            if not ok:
+                break
+        if ok:
+            shared.append(block)
+            moved.add(block)
+    return shared, {
+        name: [block for block in pages[name] if block not in moved and block not in earlier.get(name, ())]
+        for name in names
+    }
+
+
+def _read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return len(text.encode('utf-8'))
+
+
+def build_bundles(folder='static', templates='templates', report=print):
+    """Minify the page CSS/JS into <folder>/dist, write the manifest and return per-page byte counts"""
+    cssmin, jsmin = _minifiers()
+    assets = StaticAssets()
+    assets.folder = folder
+    pages = sorted({
+        os.path.splitext(name)[0]
+        for kind in ('css', 'js') if os.path.isdir(os.path.join(folder, kind, 'pages'))
+        for name in os.listdir(os.path.join(folder, kind, 'pages')) if name.endswith('.' + kind)
+    })
+    manifest = {'pages': {}}
+    sizes = {}
+    css = {}            # page -> minified top-level blocks, in source order
+    markup = []         # templates and scripts, to see which classes appear together
+
+    for page in pages:
+        entry = manifest['pages'][page] = {'css': [], 'js': [], 'sources': {}}
+        sizes[page] = {'source': 0, 'minified': 0}
+        template = os.path.join(templates, page + '.html')
+        if os.path.exists(template):
+            markup.append(_read(template))
+        for kind in ('css', 'js'):
+            source = f"{kind}/pages/{page}.{kind}"
+            path = os.path.join(folder, source)
+            if not os.path.exists(path):
+                continue
+            text = _read(path)
+            entry['sources'][source] = assets.fingerprint(source)
+            sizes[page]['source'] += len(text.encode('utf-8'))
+            if kind == 'css':
+                css[page] = [cssmin(block) for block in css_blocks(text)]
+            else:
+                markup.append(text)
+                target = f"dist/js/pages/{page}.min.js"
+                sizes[page]['minified'] += _write(os.path.join(folder, target), jsmin(text))
+                entry['js'].append(target)
+
+    usage = ClassUsage(markup)
+    moved = {page: set() for page in css}
+    for group, members in SHARED_BUNDLES:
+        members = [page for page in members if page in css]
+        if len(members) < 2:
+            continue
+        shared, _ = split_shared({page: css[page] for page in members}, usage, moved)
+        target = f"dist/css/{group}.min.css"
+        size = _write(os.path.join(folder, target), ''.join(shared))
+        report(f"{group}: {len(shared)} rules shared by {len(members)} pages ({size:,} bytes)")
+        for page in members:
+            moved[page].update(shared)
+            manifest['pages'][page]['css'].append(target)
+            sizes[page]['minified'] += size
+
+    for page, blocks in css.items():
+        target = f"dist/css/pages/{page}.min.css"
+        remaining = ''.join(block for block in blocks if block not in moved[page])
+        sizes[page]['minified'] += _write(os.path.join(folder, target), remaining)
+        manifest['pages'][page]['css'].append(target)
+
+    _write(os.path.join(folder, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True))
+
+    # What each navigation re-sends: the template, which used to carry the CSS/JS inline
+    for page in pages:
+        template = os.path.join(templates, page + '.html')
+        html = os.path.getsize(template) if os.path.exists(template) else 0
+        sizes[page]['html_before'] = html + sizes[page]['source']
+        sizes[page]['html_after'] = html
+    return sizes
+
+
+def format_report(sizes):
+    lines = [f"{'page':<20} {'HTML before':>12} {'HTML after':>11} {'CSS+JS':>9} {'minified':>9}"]
+    for page, size in sizes.items():
+        lines.append(f"{page:<20} {size['html_before']:>12,} {size['html_after']:>11,} "
+                     f"{size['source']:>9,} {size['minified']:>9,}")
+    return '\n'.join(lines)
@@ -0,0 +1,49 @@
+"""
+Benchmark: cost per verification email body.
+
+Compares a full Jinja render of templates/email/verification.* per message
+with the precompiled skeletons used by email_utils.build_verification_email.
+
+Usage:
+    python bench_email_templates.py [messages]
+"""
+
+import sys
+import time
+from email_templates import verification_html, verification_text
+
+def bench(label, render, count):
+    started = time.perf_counter()
+    for i in range(count):
+        render(i)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<24} {elapsed / count * 1e6:8.1f} us/message  ({count} messages in {elapsed:.3f}s)")
+    return elapsed
+
+def fields(i):
+    return {
+        'user_name': f'User {i}',
+        'verification_url': f'http://localhost:5000/verify-email/token{i}',
+        'verification_token': f'token{i}',
+    }
+
+def main(count=20000):
+    app_name = 'Africa House Pakistan'
+    full = bench('full Jinja render', lambda i: (
+        verification_html.render_uncached('en', app_name, **fields(i)),
+        verification_text.render_uncached('en', app_name, **fields(i)),
+    ), count)
+    cached = bench('precompiled skeleton', lambda i: (
+        verification_html.render('en', app_name, **fields(i)),
+        verification_text.render('en', app_name, **fields(i)),
+    ), count)
+    rows = [fields(i) for i in range(count)]
+    started = time.perf_counter()
+    verification_html.render_batch('en', app_name, rows)
+    verification_text.render_batch('en', app_name, rows)
+    batch = time.perf_counter() - started
+    print(f"{'batch render':<24} {batch / count * 1e6:8.1f} us/message")
+    print(f"Speedup: {full / cached:.1f}x")
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,68 @@
+"""
+Benchmark: bulk company import throughput.
+
+Writes a synthetic CSV of `rows` companies, imports it into a throwaway copy
+of the company schema (with the FTS index and change counter installed), then
+imports it again to measure the upsert path.
+
+Usage:
+    python bench_import_companies.py [rows]
+"""
+
+import csv
+import os
+import sys
+import tempfile
+import time
+from company_cache import install_change_counter
+from company_search import install_company_fts
+from import_companies import connect_for_import, import_rows, read_rows
+
+COMPANY_DDL = '''
+    CREATE TABLE company (
+        id INTEGER NOT NULL PRIMARY KEY,
+        name VARCHAR(200), address VARCHAR(300), phone VARCHAR(50), mobile VARCHAR(50),
+        email VARCHAR(100), services VARCHAR(300), industry, country
+    )
+'''
+
+SERVICES = ['Basmati rice', 'Cotton fabrics', 'Solar panels', 'Coffee beans', 'Spices', 'Leather goods']
+COUNTRIES = ['Pakistan', 'Kenya', 'Nigeria', 'Egypt', 'Ghana', 'South Africa']
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['name', 'website', 'phone', 'mobile', 'email', 'services', 'industry', 'country'])
+        for i in range(rows):
+            writer.writerow([
+                f'Company {i}', f'www.company{i}.com', f'+92 21 {i:08d}', '', f'info@company{i}.com',
+                f'{SERVICES[i % 6]}, {SERVICES[(i + 1) % 6]}', 'Trade', COUNTRIES[i % 6],
+            ])
+
+
+def main(rows=1000000):
+    folder = tempfile.mkdtemp()
+    source = os.path.join(folder, 'companies.csv')
+    database = os.path.join(folder, 'companies.db')
+    write_csv(source, rows)
+
+    conn = connect_for_import(database)
+    conn.execute(COMPANY_DDL)
+    install_change_counter(conn.execute)
+    install_company_fts(conn)
+
+    for label in ('first import', 're-import (upsert)'):
+        started = time.perf_counter()
+        stats = import_rows(conn, read_rows(source), report=lambda line: None)
+        elapsed = time.perf_counter() - started
+        print(f"{label:<20} {rows:,} rows in {elapsed:.1f}s "
+              f"({rows / elapsed:,.0f} rows/sec incl. FTS rebuild; "
+              f"{stats['inserted']:,} inserted, {stats['updated']:,} updated)")
+    total = conn.execute("SELECT COUNT(*) FROM company").fetchone()[0]
+    conn.close()
+    assert total == rows, total
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,129 @@
+"""
+Benchmark: worker start-up time.
+
+Each run is a fresh interpreter (like a gunicorn worker or the exe) that
+imports app, calls create_app() and serves its first request through the
+test client. The databases are copies in a scratch directory, so the
+migrations create_app() applies leave the real ones alone. A separate
+`python -X importtime -c "import app"` lists the slowest imports.
+
+With --record, the medians are appended to a CSV (one row per run of this
+script, with the date and git commit) so start-up time can be followed
+over time.
+
+Usage:
+    python bench_startup.py [runs] [--record bench_startup.csv]
+"""
+
+import argparse
+import csv
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from db_connections import DATABASES
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+CHILD = '''
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+response = app.app.test_client().get('/contact')
+assert response.status_code == 200, response.status_code
+served = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "create_app_ms": (created - imported) * 1000,
+                  "first_request_ms": (served - created) * 1000, "total_ms": (served - started) * 1000}))
+'''
+
+TIMINGS = ('import_ms', 'create_app_ms', 'first_request_ms', 'total_ms')
+
+
+def scratch_copy():
+    """A directory with copies of the app's databases, used as the child's working directory"""
+    folder = tempfile.mkdtemp()
+    for filename in DATABASES.values():
+        if os.path.exists(os.path.join(ROOT, filename)):
+            shutil.copy(os.path.join(ROOT, filename), folder)
+    return folder
+
+
+def child_env():
+    # Uploads a copied database still has pending are processed inline rather than in a new process pool
+    return dict(os.environ, PYTHONPATH=ROOT, AUTO_MIGRATE='true', IMAGE_WORKERS='0')
+
+
+def run_once(folder):
+    output = subprocess.run([sys.executable, '-c', CHILD], cwd=folder, env=child_env(),
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(folder, count=10):
+    """[(cumulative ms, module)] for the modules app imports directly, slowest first"""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=folder,
+                            env=child_env(), capture_output=True, text=True, check=True).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Two spaces of indent per level: 'app' is top level, its own imports one level down
+        if len(name) - len(name.lstrip()) <= 3:
+            imports.append((int(cumulative) / 1000, name.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def record(path, runs, medians):
+    new = not os.path.exists(path)
+    with open(path, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if new:
+            writer.writerow(('date', 'commit', 'runs') + TIMINGS)
+        writer.writerow([datetime.now().isoformat(timespec='seconds'), git_commit(), runs]
+                        + [f"{medians[key]:.1f}" for key in TIMINGS])
+
+
+def main(runs=5, history=None):
+    folder = scratch_copy()
+    try:
+        # The first run also applies any migrations to the copies; it isn't counted
+        run_once(folder)
+        results = [run_once(folder) for _ in range(runs)]
+        print(f"Start-up over {runs} fresh interpreters (median / min):")
+        medians = {}
+        for key in TIMINGS:
+            values = [result[key] for result in results]
+            medians[key] = statistics.median(values)
+            print(f"  {key:<18} {medians[key]:8.1f} ms  {min(values):8.1f} ms")
+        print("Slowest imports (cumulative, python -X importtime):")
+        for elapsed, name in slowest_imports(folder):
+            print(f"  {elapsed:8.1f} ms  {name}")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    if history:
+        record(history, runs, medians)
+        print(f"Recorded in {history}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure app import, create_app() and first-request time")
+    parser.add_argument('runs', nargs='?', type=int, default=5)
+    parser.add_argument('--record', metavar='CSV', help="append the medians to this CSV")
+    args = parser.parse_args()
+    main(args.runs, args.record)
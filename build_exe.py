@@ -120,6 +120,17 @@ def build_executable():
         print(f"❌ Build error: {str(e)}")
         return False
 
+def build_static_assets():
+    """Minify and precompress the static files (static/dist, .gz) so the exe bundles them"""
+    print("📦 Building static assets...")
+    result = subprocess.run([sys.executable, "static_assets.py", "build"], capture_output=True, text=True)
+    if result.returncode == 0:
+        print("✅ Static assets built")
+        return True
+    print("❌ Static asset build failed!")
+    print("Error output:", result.stderr)
+    return False
+
 def create_launcher_script():
     """Create a launcher script for the executable"""
     launcher_content = '''@echo off
@@ -235,17 +246,21 @@ def main():
     # Step 2: Create spec file
     create_spec_file()
     
-    # Step 3: Build executable
+    # Step 3: Build static assets
+    if not build_static_assets():
+        return False
+    
+    # Step 4: Build executable
     if not build_executable():
         return False
     
-    # Step 4: Copy additional files
+    # Step 5: Copy additional files
     copy_additional_files()
     
-    # Step 5: Create launcher script
+    # Step 6: Create launcher script
     create_launcher_script()
     
-    # Step 6: Create README
+    # Step 7: Create README
     create_readme()
     
     print("\n" + "=" * 60)
@@ -8,6 +8,7 @@ pip install pyinstaller
 
 echo.
 echo Step 2: Building executable...
+python static_assets.py build
 pyinstaller --onefile --add-data "templates;templates" --add-data "static;static" --add-data "*.db;." --add-data ".env;." --hidden-import=flask --hidden-import=flask_mail --hidden-import=flask_cors --hidden-import=flask_sqlalchemy --hidden-import=sqlite3 --hidden-import=requests --hidden-import=email_utils --hidden-import=dotenv --name "AfricaHousePakistan" app.py
 
 echo.
@@ -0,0 +1,91 @@
+"""
+Versioned caches for data derived from the company table.
+
+The company table carries a change counter (company_version) that is bumped
+by triggers on every INSERT, UPDATE and DELETE, so any writer - the app, the
+seed script or a plain sqlite3 shell - invalidates cached data automatically.
+Caches compare the counter with the one they were built from and rebuild
+lazily when it has moved.
+"""
+
+import threading
+
+SELECT_COMPANY_VERSION_SQL = "SELECT version FROM company_version WHERE id = 1"
+BUMP_COMPANY_VERSION_SQL = "UPDATE company_version SET version = version + 1 WHERE id = 1"
+
+COMPANY_VERSION_DDL = [
+    '''
+    CREATE TABLE IF NOT EXISTS company_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    "INSERT OR IGNORE INTO company_version (id, version) VALUES (1, 0)",
+    f"CREATE TRIGGER IF NOT EXISTS company_version_ai AFTER INSERT ON company BEGIN {BUMP_COMPANY_VERSION_SQL}; END",
+    f"CREATE TRIGGER IF NOT EXISTS company_version_au AFTER UPDATE ON company BEGIN {BUMP_COMPANY_VERSION_SQL}; END",
+    f"CREATE TRIGGER IF NOT EXISTS company_version_ad AFTER DELETE ON company BEGIN {BUMP_COMPANY_VERSION_SQL}; END",
+]
+
+
+def install_change_counter(execute):
+    """Create the company_version table and its triggers (idempotent).
+
+    `execute` is any callable that runs a single SQL statement, e.g.
+    sqlite3's `conn.execute` or SQLAlchemy's `conn.exec_driver_sql`.
+    """
+    for statement in COMPANY_VERSION_DDL:
+        execute(statement)
+
+
+def bump_company_version(execute):
+    """Force every process to rebuild its company caches on next use"""
+    execute(BUMP_COMPANY_VERSION_SQL)
+    invalidate_all()
+
+
+class VersionedCache:
+    """Holds one value built from the company table and the version it was built at"""
+
+    def __init__(self, build, version):
+        self._build = build
+        self._version = version
+        self._lock = threading.Lock()
+        self._value = None
+        self._built_at = None
+        self.builds = 0
+        self.hits = 0
+        register_cache(self)
+
+    def get(self):
+        version = self._version()
+        with self._lock:
+            # A missing version means we can't tell whether data changed, so never reuse
+            if version is not None and self._built_at == version:
+                self.hits += 1
+                return self._value
+            self._value = self._build()
+            self._built_at = version
+            self.builds += 1
+            return self._value
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+            self._built_at = None
+
+    def stats(self):
+        return {'version': self._built_at, 'builds': self.builds, 'hits': self.hits}
+
+
+_registry = []
+
+
+def register_cache(cache):
+    """Have invalidate_all() also clear `cache` (anything with an invalidate() method)"""
+    _registry.append(cache)
+
+
+def invalidate_all():
+    """Drop every cached value in this process"""
+    for cache in _registry:
+        cache.invalidate()
@@ -0,0 +1,101 @@
+"""
+Local retrieval stage for the AI assistant.
+
+Instead of embedding the whole partner directory in every system prompt, /ask
+ranks companies against the user's message with an in-process BM25 index and
+only sends the best matches to the model.
+"""
+
+import heapq
+import json
+import math
+import re
+from collections import Counter, defaultdict
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'about', 'any', 'can', 'do', 'does', 'for', 'from', 'give', 'have',
+    'i', 'in', 'is', 'it', 'me', 'my', 'of', 'on', 'or', 'please', 'show', 'tell', 'the', 'to',
+    'want', 'what', 'which', 'who', 'with', 'you', 'your', 'company', 'companies',
+}
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Fields searched for each company and how much a match in each one counts
+FIELD_WEIGHTS = {'name': 3, 'services': 2, 'industry': 2, 'country': 1}
+
+
+def tokenize(text):
+    """Lowercase word tokens with stopwords removed and plurals folded"""
+    tokens = []
+    for token in TOKEN_RE.findall((text or '').lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def company_search_text(company):
+    """Weighted token list for one prompt record (see get_company_prompt_data)"""
+    tokens = []
+    for field, weight in FIELD_WEIGHTS.items():
+        value = company.get(field)
+        if isinstance(value, list):
+            value = ' '.join(value)
+        tokens.extend(tokenize(value) * weight)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of company records"""
+
+    def __init__(self, companies, k1=1.5, b=0.75):
+        self.companies = companies
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)
+        self.doc_lengths = []
+        for doc_id, company in enumerate(companies):
+            tokens = company_search_text(company)
+            self.doc_lengths.append(len(tokens))
+            for term, freq in Counter(tokens).items():
+                self.postings[term].append((doc_id, freq))
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0
+
+    def search(self, query, limit):
+        """Return up to `limit` (company, score) pairs, best first"""
+        total = len(self.companies)
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, freq in postings:
+                norm = 1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_length
+                scores[doc_id] += idf * freq * (self.k1 + 1) / (freq + self.k1 * norm)
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(self.companies[doc_id], score) for doc_id, score in best]
+
+
+def select_companies(index, user_message, top_k, max_chars):
+    """Pick the companies to send with this message.
+
+    Takes the top_k BM25 matches (or the first top_k companies when nothing
+    matches, e.g. "list all companies") and stops adding records once their
+    serialized size would pass max_chars.
+    """
+    matches = [company for company, _ in index.search(user_message, top_k)]
+    if not matches:
+        matches = index.companies[:top_k]
+
+    selected = []
+    used = 0
+    for company in matches:
+        size = len(json.dumps(company, indent=2))
+        if selected and used + size > max_chars:
+            break
+        selected.append(company)
+        used += size
+    return selected
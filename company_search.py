@@ -0,0 +1,138 @@
+"""
+SQLite FTS5 full-text search over the company table (companies.db).
+
+company_fts is an external-content FTS5 table: it stores only the index and
+reads column values from company, and triggers keep it in sync on every
+INSERT, UPDATE and DELETE. install_company_fts() creates it and backfills it
+from existing rows the first time it runs.
+"""
+
+import re
+import sqlite3
+from markupsafe import Markup, escape
+
+FTS_COLUMNS = ('name', 'industry', 'services', 'country')
+# bm25() weight per column, in FTS_COLUMNS order - a name match outranks a country match
+FTS_WEIGHTS = (10.0, 5.0, 3.0, 1.0)
+
+# Control characters can't appear in user data, so they are safe snippet markers
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+_columns = ', '.join(FTS_COLUMNS)
+_new_values = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+_old_values = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+
+COMPANY_FTS_DDL = [
+    f"CREATE VIRTUAL TABLE company_fts USING fts5({_columns}, content='company', content_rowid='id')",
+    f'''CREATE TRIGGER IF NOT EXISTS company_fts_ai AFTER INSERT ON company BEGIN
+        INSERT INTO company_fts(rowid, {_columns}) VALUES (new.id, {_new_values});
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS company_fts_ad AFTER DELETE ON company BEGIN
+        INSERT INTO company_fts(company_fts, rowid, {_columns}) VALUES ('delete', old.id, {_old_values});
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS company_fts_au AFTER UPDATE ON company BEGIN
+        INSERT INTO company_fts(company_fts, rowid, {_columns}) VALUES ('delete', old.id, {_old_values});
+        INSERT INTO company_fts(rowid, {_columns}) VALUES (new.id, {_new_values});
+    END''',
+]
+
+_bm25 = f"bm25(company_fts, {', '.join(str(w) for w in FTS_WEIGHTS)})"
+
+# Keyset pagination over (rank, id): the anchor is the rank of the last row already shown
+SEARCH_SQL = f'''
+    SELECT * FROM (
+        SELECT company.*,
+               snippet(company_fts, 2, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 12) AS snippet,
+               {_bm25} AS rank
+        FROM company_fts
+        JOIN company ON company.id = company_fts.rowid
+        WHERE company_fts MATCH :match
+    )
+    WHERE :after_rank IS NULL OR rank > :after_rank OR (rank = :after_rank AND id > :after)
+    ORDER BY rank, id
+    LIMIT :limit
+'''
+
+ANCHOR_RANK_SQL = f"SELECT {_bm25} FROM company_fts WHERE company_fts MATCH ? AND rowid = ?"
+
+COUNT_SQL = "SELECT COUNT(*) FROM (SELECT 1 FROM company_fts WHERE company_fts MATCH ? LIMIT ?)"
+
+
+def install_company_fts(conn):
+    """Create company_fts and its triggers, backfilling from company on first run.
+
+    Returns False when this SQLite build has no FTS5 support.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'company_fts'"
+    ).fetchone()
+    if exists:
+        return True
+    try:
+        with conn:
+            for statement in COMPANY_FTS_DDL:
+                conn.execute(statement)
+            conn.execute("INSERT INTO company_fts(company_fts) VALUES ('rebuild')")
+        print("Created company_fts full-text index")
+        return True
+    except sqlite3.OperationalError as e:
+        print(f"FTS5 unavailable, leads search will use LIKE: {str(e)}")
+        return False
+
+
+def build_match_query(words):
+    """FTS5 MATCH expression: any of the words, each as a prefix ("rice"*)"""
+    terms = []
+    for word in words:
+        # Drop FTS5 syntax characters; quoting keeps words like "and"/"or" literal
+        cleaned = re.sub(r'[^\w]+', ' ', word).strip()
+        for part in cleaned.split():
+            terms.append(f'"{part}"*')
+    return ' OR '.join(terms)
+
+
+def highlight(snippet):
+    """Escape a snippet and turn the match markers into <mark> tags"""
+    if not snippet:
+        return None
+    html = str(escape(snippet))
+    return Markup(html.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>'))
+
+
+def search_companies(conn, words, after=None, limit=None):
+    """Rank companies matching any of `words`; each result is a dict with a highlighted snippet.
+
+    `after` is the id of the last company on the previous page; results continue
+    in rank order from that row. `limit` of None returns every match.
+    """
+    match = build_match_query(words)
+    if not match:
+        return []
+    after_rank = None
+    if after is not None:
+        anchor = conn.execute(ANCHOR_RANK_SQL, (match, after)).fetchone()
+        if not anchor:
+            return []  # the anchor row no longer matches, so there is no "next page"
+        after_rank = anchor[0]
+    cursor = conn.execute(SEARCH_SQL, {
+        'match': match,
+        'after': after,
+        'after_rank': after_rank,
+        'limit': -1 if limit is None else limit,
+    })
+    columns = [description[0] for description in cursor.description]
+    results = []
+    for row in cursor:
+        company = dict(zip(columns, row))
+        company['snippet'] = highlight(company['snippet'])
+        results.append(company)
+    return results
+
+
+def count_matches(conn, words, cap):
+    """Number of matching companies, counting at most `cap` of them"""
+    match = build_match_query(words)
+    if not match:
+        return 0
+    return conn.execute(COUNT_SQL, (match, cap)).fetchone()[0]
@@ -0,0 +1,155 @@
+"""
+Connection management for the app's SQLite databases.
+
+Each thread keeps one open connection per database and reuses it across
+requests, so a gunicorn worker pays the open + PRAGMA cost once instead of on
+every query. All connections get the same configuration (row factory and
+pragmas). Counters record how often a connection was opened versus reused.
+
+The pragmas put every database in WAL mode so that readers never block the
+writer and concurrent writers from several gunicorn workers wait on
+busy_timeout instead of failing with "database is locked".
+
+Connections to the user database also ATTACH companies.db as the schema
+`partner`, so one statement can join vendor data with partner companies
+(e.g. partner_matches with partner.company). Qualify attached tables with
+their schema: an unqualified name is looked up in the main database first.
+A transaction that writes to both files is atomic per file only (WAL), so
+cross-database statements should read, not write, the attached side.
+"""
+
+import sqlite3
+import threading
+
+DATABASE_USER = 'database.db'
+DATABASE_PARTNER = 'companies.db'
+DATABASE_CONTACT = 'contact_messages.db'
+DATABASE_ROUTER = 'model_router.db'         # shared AI model health, see model_router.py
+
+DATABASES = {
+    'user': DATABASE_USER,
+    'partner': DATABASE_PARTNER,
+    'contact': DATABASE_CONTACT,
+    'router': DATABASE_ROUTER,
+}
+
+# name -> ((schema, attached database name), ...) for connect(name)
+ATTACHMENTS = {
+    'user': (('partner', 'partner'),),
+}
+
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KIB = 8192            # page cache per connection
+MMAP_SIZE_BYTES = 64 * 1024 * 1024
+
+# Applied to every new connection. journal_mode is persistent in the file, so
+# after configure_databases() has run once it is a cheap no-op here.
+PRAGMAS = [
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    f"PRAGMA cache_size = -{CACHE_SIZE_KIB}",
+    f"PRAGMA mmap_size = {MMAP_SIZE_BYTES}",
+    "PRAGMA foreign_keys = ON",
+]
+
+# The PRAGMAS that are per database file rather than per connection, repeated for attached schemas
+SCHEMA_PRAGMAS = [
+    "PRAGMA {schema}.journal_mode = WAL",
+    "PRAGMA {schema}.synchronous = NORMAL",
+    f"PRAGMA {{schema}}.cache_size = -{CACHE_SIZE_KIB}",
+    f"PRAGMA {{schema}}.mmap_size = {MMAP_SIZE_BYTES}",
+]
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = {name: {'opened': 0, 'reused': 0} for name in DATABASES}
+
+
+def configure_connection(conn):
+    """Apply PRAGMAS to a raw DB-API sqlite3 connection (also used for SQLAlchemy's engine)"""
+    cursor = conn.cursor()
+    for pragma in PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def connect(name):
+    """Open a new, configured connection that the caller must close (for scripts and startup)"""
+    conn = sqlite3.connect(DATABASES[name], timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.row_factory = sqlite3.Row
+    configure_connection(conn)
+    for schema, other in ATTACHMENTS.get(name, ()):
+        attach(conn, schema, DATABASES[other])
+    return conn
+
+
+def attach(conn, schema, path):
+    """ATTACH another database file to conn as `schema`, configured like the main one"""
+    conn.execute("ATTACH DATABASE ? AS " + schema, (path,))
+    for pragma in SCHEMA_PRAGMAS:
+        conn.execute(pragma.format(schema=schema))
+
+
+def configure_databases():
+    """Startup step: switch every database file to WAL. Returns {name: journal_mode}"""
+    modes = {}
+    for name in DATABASES:
+        conn = connect(name)
+        try:
+            modes[name] = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        finally:
+            conn.close()
+    return modes
+
+
+def _thread_connections():
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    return connections
+
+
+def get_connection(name):
+    """Return this thread's connection to the `name` database, opening it on first use"""
+    connections = _thread_connections()
+    conn = connections.get(name)
+    with _stats_lock:
+        _stats[name]['reused' if conn is not None else 'opened'] += 1
+    if conn is None:
+        conn = connections[name] = connect(name)
+    return conn
+
+
+def release_connections(exception=None):
+    """End-of-request cleanup for this thread's connections.
+
+    Uncommitted work is rolled back so it can't leak into the next request.
+    After an error the connections are closed instead of kept, in case one of
+    them is in a bad state.
+    """
+    connections = _thread_connections()
+    for name, conn in list(connections.items()):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            if exception is not None:
+                conn.close()
+                del connections[name]
+        except sqlite3.Error as e:
+            print(f"Error releasing {name} connection: {str(e)}")
+            connections.pop(name, None)
+
+
+def close_connections():
+    """Close every connection held by this thread"""
+    connections = _thread_connections()
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
+
+
+def connection_stats():
+    """Opened/reused counters per database, across all threads"""
+    with _stats_lock:
+        return {name: dict(counts) for name, counts in _stats.items()}
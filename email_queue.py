@@ -0,0 +1,218 @@
+"""
+Background email delivery.
+
+Routes put messages in the email_outbox table (database.db) and return
+straight away; a small pool of worker threads sends them. Each thread keeps
+its SMTP connection open while there is mail to send, failed sends are
+retried with exponential backoff, and the delivery result is written back to
+email_verification_logs.
+
+Rows are claimed with a single UPDATE ... RETURNING, so several gunicorn
+workers can run delivery threads against the same outbox without sending a
+message twice.
+"""
+
+import threading
+from flask_mail import Message
+from db_connections import connect
+
+OUTBOX_DDL = [
+    '''
+    CREATE TABLE IF NOT EXISTS email_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        log_id INTEGER,
+        recipient TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        sender TEXT,
+        html TEXT,
+        body TEXT,
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        claimed_at DATETIME,
+        last_error TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        sent_at DATETIME,
+        FOREIGN KEY (log_id) REFERENCES email_verification_logs (id)
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox (status, next_attempt_at)",
+]
+
+# Delivery result columns added to the existing verification log
+LOG_COLUMNS = {
+    'delivery_status': 'TEXT',
+    'delivery_error': 'TEXT',
+}
+
+CLAIM_SQL = '''
+    UPDATE email_outbox
+    SET status = 'sending', attempts = attempts + 1, claimed_at = CURRENT_TIMESTAMP
+    WHERE id = (
+        SELECT id FROM email_outbox
+        WHERE status = 'queued' AND next_attempt_at <= CURRENT_TIMESTAMP
+        ORDER BY id
+        LIMIT 1
+    )
+    RETURNING id, log_id, recipient, subject, sender, html, body, attempts
+'''
+
+# A row left in 'sending' this long belongs to a worker that died mid-send
+STALE_CLAIM_SQL = '''
+    UPDATE email_outbox SET status = 'queued'
+    WHERE status = 'sending' AND claimed_at < datetime('now', '-10 minutes')
+'''
+
+
+def install_outbox(conn):
+    """Create email_outbox and the delivery columns on email_verification_logs (idempotent)"""
+    for statement in OUTBOX_DDL:
+        conn.execute(statement)
+    columns = [column[1] for column in conn.execute("PRAGMA table_info(email_verification_logs)")]
+    if columns:
+        for column, column_type in LOG_COLUMNS.items():
+            if column not in columns:
+                conn.execute(f'ALTER TABLE email_verification_logs ADD COLUMN {column} {column_type}')
+    conn.commit()
+
+
+def _update_log(conn, log_id, status, error=None):
+    if log_id:
+        conn.execute(
+            'UPDATE email_verification_logs SET delivery_status = ?, delivery_error = ? WHERE id = ?',
+            (status, error, log_id)
+        )
+
+
+def enqueue_email(conn, message, log_id=None):
+    """Store a flask_mail Message in the outbox. Returns the outbox id"""
+    cursor = conn.execute('''
+        INSERT INTO email_outbox (log_id, recipient, subject, sender, html, body)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (log_id, ', '.join(message.recipients), message.subject, message.sender, message.html, message.body))
+    _update_log(conn, log_id, 'queued')
+    conn.commit()
+    return cursor.lastrowid
+
+
+class EmailDeliveryWorker:
+    """Thread pool that drains email_outbox through Flask-Mail"""
+
+    def __init__(self, app, mail, threads=2, max_attempts=5, retry_delay=30, poll_interval=5, connect=connect):
+        self.app = app
+        self.mail = mail
+        self.threads = threads
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay        # seconds before the first retry; doubles each time
+        self.poll_interval = poll_interval
+        self.connect = connect               # opens a new connection to the outbox database by name
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._started = False
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+
+    def start(self):
+        """Start the delivery threads once per process, then wake them"""
+        with self._lock:
+            if not self._started and self.threads > 0:
+                for i in range(self.threads):
+                    threading.Thread(target=self._run, name=f'email-delivery-{i}', daemon=True).start()
+                self._started = True
+        self._wakeup.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def _run(self):
+        with self.app.app_context():
+            conn = self.connect('user')
+            try:
+                self._reclaim_stale(conn)
+                while not self._stopped.is_set():
+                    try:
+                        self.deliver_pending(conn)
+                    except Exception as e:
+                        # e.g. "database is locked": keep the thread alive and try again on the next poll
+                        print(f"Error delivering queued emails: {str(e)}")
+                        conn.rollback()
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+            finally:
+                conn.close()
+
+    @staticmethod
+    def _reclaim_stale(conn):
+        """Requeue messages a worker that died mid-send left in 'sending'"""
+        try:
+            conn.execute(STALE_CLAIM_SQL)
+            conn.commit()
+        except Exception as e:
+            print(f"Error requeueing stale email claims: {str(e)}")
+            conn.rollback()
+
+    def deliver_pending(self, conn):
+        """Send every due message, reusing one SMTP connection. Returns how many were processed"""
+        smtp = None
+        processed = 0
+        try:
+            while not self._stopped.is_set():
+                # fetchall() finishes the RETURNING statement so the claim can be committed
+                claimed = conn.execute(CLAIM_SQL).fetchall()
+                conn.commit()
+                if not claimed:
+                    break
+                job = claimed[0]
+                processed += 1
+                try:
+                    if smtp is None:
+                        smtp = self.mail.connect().__enter__()
+                    smtp.send(Message(
+                        subject=job['subject'],
+                        sender=job['sender'],
+                        recipients=job['recipient'].split(', '),
+                        html=job['html'],
+                        body=job['body']
+                    ))
+                except Exception as e:
+                    print(f"Error sending email {job['id']} to {job['recipient']}: {str(e)}")
+                    # The SMTP connection may be what broke, so start a fresh one
+                    self._close(smtp)
+                    smtp = None
+                    self._retry_or_fail(conn, job, str(e))
+                else:
+                    conn.execute(
+                        "UPDATE email_outbox SET status = 'sent', sent_at = CURRENT_TIMESTAMP, last_error = NULL WHERE id = ?",
+                        (job['id'],)
+                    )
+                    _update_log(conn, job['log_id'], 'sent')
+                    conn.commit()
+                    self.sent += 1
+        finally:
+            self._close(smtp)
+        return processed
+
+    def _retry_or_fail(self, conn, job, error):
+        if job['attempts'] >= self.max_attempts:
+            conn.execute("UPDATE email_outbox SET status = 'failed', last_error = ? WHERE id = ?", (error, job['id']))
+            _update_log(conn, job['log_id'], 'failed', error)
+            self.failed += 1
+        else:
+            delay = self.retry_delay * 2 ** (job['attempts'] - 1)
+            conn.execute('''
+                UPDATE email_outbox
+                SET status = 'queued', last_error = ?, next_attempt_at = datetime('now', ?)
+                WHERE id = ?
+            ''', (error, f'+{delay} seconds', job['id']))
+            _update_log(conn, job['log_id'], 'retrying', error)
+        conn.commit()
+
+    @staticmethod
+    def _close(smtp):
+        if smtp is not None:
+            try:
+                smtp.__exit__(None, None, None)
+            except Exception as e:
+                print(f"Error closing SMTP connection: {str(e)}")
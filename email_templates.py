@@ -0,0 +1,74 @@
+"""
+Precompiled email templates.
+
+Email bodies live in templates/email/ as Jinja templates. The app-wide parts
+(locale and app name) are rendered once and cached as a "skeleton": a list of
+literal chunks with slots for the per-user fields. Each message is then just
+a join of the chunks with the escaped per-user values, so sending an email no
+longer renders ~150 lines of HTML.
+"""
+
+import os
+from functools import lru_cache
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import escape
+
+TEMPLATE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'email')
+
+_env = Environment(
+    loader=FileSystemLoader(TEMPLATE_FOLDER),
+    autoescape=select_autoescape(['html']),
+    keep_trailing_newline=True,
+)
+
+# NUL can't occur in template text, so it is safe to mark where a field goes
+_SLOT = '\x00'
+
+
+class EmailTemplate:
+    """One email body (e.g. verification.html) with a fixed set of per-user fields"""
+
+    def __init__(self, name, extension, fields):
+        self.name = name
+        self.extension = extension
+        self.fields = fields
+        self._escape = escape if extension == 'html' else str
+        self.skeleton = lru_cache(maxsize=32)(self._compile)
+
+    def _template(self, locale):
+        # A locale-specific file (verification.fr.html) wins over the default one
+        return _env.select_template([
+            f'{self.name}.{locale}.{self.extension}',
+            f'{self.name}.{self.extension}',
+        ])
+
+    def _compile(self, locale, app_name):
+        """Render everything except the per-user fields; returns (chunks, field order)"""
+        template = self._template(locale)
+        placeholders = {field: f'{_SLOT}{field}{_SLOT}' for field in self.fields}
+        rendered = template.render(app_name=app_name, locale=locale, **placeholders)
+        # Splitting on the marker alternates literal text and field names
+        parts = rendered.split(_SLOT)
+        return parts[0::2], parts[1::2]
+
+    def render(self, locale, app_name, **values):
+        chunks, slots = self.skeleton(locale, app_name)
+        out = [chunks[0]]
+        for field, chunk in zip(slots, chunks[1:]):
+            out.append(str(self._escape(values[field])))
+            out.append(chunk)
+        return ''.join(out)
+
+    def render_batch(self, locale, app_name, rows):
+        """Render one body per dict in `rows` (bulk resend campaigns)"""
+        return [self.render(locale, app_name, **row) for row in rows]
+
+    def render_uncached(self, locale, app_name, **values):
+        """Full Jinja render, for comparison in bench_email_templates.py"""
+        return self._template(locale).render(app_name=app_name, locale=locale, **values)
+
+
+VERIFICATION_FIELDS = ('user_name', 'verification_url', 'verification_token')
+
+verification_html = EmailTemplate('verification', 'html', VERIFICATION_FIELDS)
+verification_text = EmailTemplate('verification', 'txt', VERIFICATION_FIELDS)
@@ -0,0 +1,343 @@
+"""
+Image processing for vendor uploads (company logo and product images).
+
+Uploads used to be saved and served exactly as sent, often multi-megabyte
+PNGs shown in a 120px avatar. Each upload is now decoded with Pillow,
+rotated according to its EXIF orientation, stripped of metadata and written
+as thumb / medium / full variants in WebP (optionally AVIF) plus a JPEG
+fallback. The variant URLs are stored per image in uploaded_images
+(database.db) and picture_html() turns them into a <picture> element with
+srcset, so browsers download only the size and format they need.
+
+Uploads are saved to disk as sent and recorded as 'pending'; an
+ImageWorkerPool runs process_image_file() in worker processes and marks the
+row 'ready' (or 'failed') when it finishes, so the upload request doesn't
+wait for the resizing. Until then pages show the original file.
+"""
+
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from markupsafe import Markup, escape
+
+# Longest side of each variant, in pixels. Images are never upscaled
+VARIANTS = (('thumb', 160), ('medium', 640), ('full', 1600))
+FALLBACK_VARIANT = 'medium'
+
+# Refuse anything bigger than this before decoding it (about 8000 x 5000)
+MAX_SOURCE_PIXELS = 40_000_000
+
+QUALITY = {'jpeg': 82, 'webp': 80, 'avif': 55}
+EXTENSIONS = {'jpeg': 'jpg', 'webp': 'webp', 'avif': 'avif'}
+MIME_TYPES = {'webp': 'image/webp', 'avif': 'image/avif'}
+
+# Uploads with any other extension are refused before they are written to disk
+UPLOAD_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif', '.bmp', '.tif', '.tiff'}
+
+# src is the URL the profile stores (the original upload); fallback is the processed JPEG
+IMAGES_DDL = '''
+    CREATE TABLE IF NOT EXISTS uploaded_images (
+        src TEXT PRIMARY KEY,
+        status TEXT NOT NULL DEFAULT 'ready',
+        fallback TEXT,
+        original_path TEXT,
+        error TEXT,
+        width INTEGER,
+        height INTEGER,
+        srcset TEXT,
+        webp_srcset TEXT,
+        avif_srcset TEXT,
+        original_bytes INTEGER,
+        stored_bytes INTEGER,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+# Added after the table was first created
+IMAGE_COLUMNS = {
+    'status': "TEXT NOT NULL DEFAULT 'ready'",
+    'fallback': 'TEXT',
+    'original_path': 'TEXT',
+    'error': 'TEXT',
+}
+
+
+class InvalidImage(ValueError):
+    """The upload isn't an image Pillow can read, or is too large"""
+
+
+def supported_formats(requested):
+    """The modern formats from `requested` that this Pillow build can encode"""
+    from PIL import features
+    return tuple(f for f in requested if f in MIME_TYPES and features.check(f))
+
+
+def _open(data):
+    # Pillow is imported where images are decoded (in the worker processes), not when the app loads
+    from PIL import Image, ImageOps, UnidentifiedImageError
+    try:
+        image = Image.open(io.BytesIO(data))
+        if image.width * image.height > MAX_SOURCE_PIXELS:
+            raise InvalidImage(f"image is too large ({image.width}x{image.height})")
+        # JPEGs can be decoded straight at a reduced scale, which is much faster for camera photos
+        image.draft('RGB', (VARIANTS[-1][1], VARIANTS[-1][1]))
+        image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise InvalidImage(str(e)) from e
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    return image
+
+
+def _flatten(image):
+    """JPEG has no alpha channel: put transparent images on white"""
+    if image.mode != 'RGBA':
+        return image
+    from PIL import Image
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def process_image(data, folder, stem, formats=('webp',)):
+    """Write the variants of one uploaded image into `folder`.
+
+    Returns the file names and sizes needed to build the uploaded_images row
+    (see image_record). Raises InvalidImage for anything that isn't a usable image.
+    """
+    from PIL import Image
+    image = _open(data)
+    formats = supported_formats(formats)
+    variants = []
+    current = image
+    # Largest first, each one resized from the previous, so LANCZOS never works on the full original twice
+    for name, longest in reversed(VARIANTS):
+        if max(current.size) > longest:
+            current = current.copy()
+            current.thumbnail((longest, longest), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        if variants and variants[-1]['width'] == current.width:
+            continue  # original smaller than this cap; don't store the same size twice
+        files = {}
+        for image_format in ('jpeg',) + formats:
+            filename = f"{stem}-{name}.{EXTENSIONS[image_format]}"
+            output = _flatten(current) if image_format == 'jpeg' else current
+            # No exif= / icc_profile= arguments, so no metadata is carried over
+            output.save(os.path.join(folder, filename), image_format.upper(),
+                        quality=QUALITY[image_format], optimize=image_format == 'jpeg')
+            files[image_format] = filename
+        variants.append({'name': name, 'width': current.width, 'height': current.height, 'files': files})
+    variants.reverse()
+    stored = sum(os.path.getsize(os.path.join(folder, f)) for v in variants for f in v['files'].values())
+    return {
+        'width': image.width,
+        'height': image.height,
+        'variants': variants,
+        'original_bytes': len(data),
+        'stored_bytes': stored,
+    }
+
+
+def process_image_file(path, folder, stem, formats=('webp',)):
+    """process_image() for an upload already saved at `path` (what the worker processes run)"""
+    with open(path, 'rb') as f:
+        return process_image(f.read(), folder, stem, formats)
+
+
+def image_record(result, url_for_file, src=None, original_path=None):
+    """uploaded_images row for a process_image() result; url_for_file maps a file name to its URL.
+
+    `src` is the URL the upload is known by (defaults to the fallback JPEG).
+    """
+    def srcset(image_format):
+        entries = [f"{url_for_file(v['files'][image_format])} {v['width']}w"
+                   for v in result['variants'] if image_format in v['files']]
+        return ', '.join(entries) or None
+
+    by_name = {v['name']: v for v in result['variants']}
+    # The fallback is the medium JPEG, or the biggest variant if the original was smaller than that
+    fallback = url_for_file((by_name.get(FALLBACK_VARIANT) or result['variants'][-1])['files']['jpeg'])
+    return {
+        'src': src or fallback,
+        'status': 'ready',
+        'fallback': fallback,
+        'original_path': original_path,
+        'error': None,
+        'width': result['width'],
+        'height': result['height'],
+        'srcset': srcset('jpeg'),
+        'webp_srcset': srcset('webp'),
+        'avif_srcset': srcset('avif'),
+        'original_bytes': result['original_bytes'],
+        'stored_bytes': result['stored_bytes'],
+    }
+
+
+def install_images(conn):
+    """Create uploaded_images, or add the columns it is missing (idempotent)"""
+    conn.execute(IMAGES_DDL)
+    columns = [column[1] for column in conn.execute("PRAGMA table_info(uploaded_images)")]
+    for column, column_type in IMAGE_COLUMNS.items():
+        if column not in columns:
+            conn.execute(f'ALTER TABLE uploaded_images ADD COLUMN {column} {column_type}')
+    conn.commit()
+
+
+def save_image_record(conn, record):
+    conn.execute('''
+        INSERT OR REPLACE INTO uploaded_images
+            (src, status, fallback, original_path, error,
+             width, height, srcset, webp_srcset, avif_srcset, original_bytes, stored_bytes)
+        VALUES (:src, :status, :fallback, :original_path, :error,
+                :width, :height, :srcset, :webp_srcset, :avif_srcset, :original_bytes, :stored_bytes)
+    ''', record)
+    conn.commit()
+
+
+def add_pending_image(conn, src, original_path):
+    """Record an upload that has been saved but not processed yet"""
+    conn.execute(
+        "INSERT OR REPLACE INTO uploaded_images (src, status, original_path) VALUES (?, 'pending', ?)",
+        (src, original_path)
+    )
+    conn.commit()
+
+
+def mark_image_failed(conn, src, error):
+    conn.execute("UPDATE uploaded_images SET status = 'failed', error = ? WHERE src = ?", (error, src))
+    conn.commit()
+
+
+def get_image_records(conn, urls):
+    """{src: row} for the given image URLs (unknown URLs, e.g. older uploads, are left out)"""
+    urls = [url for url in urls if url]
+    if not urls:
+        return {}
+    rows = conn.execute(
+        f"SELECT * FROM uploaded_images WHERE src IN ({', '.join('?' * len(urls))})", urls
+    ).fetchall()
+    return {row['src']: row for row in rows}
+
+
+def picture_html(url, record=None, alt='', sizes='100vw', **attrs):
+    """<picture> with AVIF/WebP sources and a JPEG <img>; a plain <img> when there is no
+    processed record. Pending uploads are marked data-image-status="pending" so the page
+    can swap the variants in once they are ready (see /image_status)."""
+    def extra():
+        # class_='x' -> class="x", data_id='1' -> data-id="1"
+        return ''.join(f' {name.rstrip("_").replace("_", "-")}="{escape(value)}"' for name, value in attrs.items())
+
+    if record is not None and record['status'] == 'pending':
+        attrs.update(data_image_status='pending', data_sizes=sizes)
+    if record is None or record['status'] != 'ready':
+        return Markup(f'<img src="{escape(url or "")}" alt="{escape(alt)}"{extra()}>')
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    sources = ''.join(
+        f'<source type="{MIME_TYPES[image_format]}" srcset="{escape(record[image_format + "_srcset"])}" sizes="{escape(sizes)}">'
+        for image_format in ('avif', 'webp') if record[image_format + '_srcset']
+    )
+    return Markup(
+        f'<picture>{sources}<img src="{escape(record["fallback"] or record["src"])}" srcset="{escape(record["srcset"])}" '
+        f'sizes="{escape(sizes)}" width="{record["width"]}" height="{record["height"]}" '
+        f'alt="{escape(alt)}"{extra()}></picture>'
+    )
+
+
+class ImageWorkerPool:
+    """Process pool for uploads: process_image_file() runs in the workers and the
+    result is written to uploaded_images from a callback in this process.
+
+    processes=0 processes each upload inline in submit() instead.
+    """
+
+    def __init__(self, connect, formats=('webp',), processes=2):
+        self.connect = connect          # returns a new connection to the uploaded_images database
+        self.formats = tuple(formats)
+        self.processes = processes
+        self._executor = None
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+
+    def _pool(self, replace=False):
+        with self._lock:
+            if self._executor is None or replace:
+                # Not fork: the web process has threads (email delivery, match refresh, open SQLite
+                # connections) whose locks a forked child would inherit mid-use. The forkserver is
+                # started once with only this module preloaded, so workers still start cheaply
+                # without re-importing the app; Windows only has spawn
+                methods = multiprocessing.get_all_start_methods()
+                if 'forkserver' in methods:
+                    context = multiprocessing.get_context('forkserver')
+                    context.set_forkserver_preload([__name__])
+                else:
+                    context = multiprocessing.get_context('spawn')
+                self._executor = ProcessPoolExecutor(self.processes, mp_context=context)
+            return self._executor
+
+    def submit(self, src, path):
+        """Process the upload saved at `path` and served as `src` (its row already 'pending').
+
+        Variants are written next to it as <stem>-<variant>.<ext>. Returns the
+        Future, or None when the upload was processed inline.
+        """
+        name = os.path.basename(path)
+        url_prefix = src[:-len(name)]
+        args = (process_image_file, path, os.path.dirname(path), os.path.splitext(name)[0], self.formats)
+        if self.processes <= 0:
+            self._finish(src, path, url_prefix, lambda: args[0](*args[1:]))
+            return None
+        try:
+            future = self._pool().submit(*args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool
+            future = self._pool(replace=True).submit(*args)
+        future.add_done_callback(lambda done: self._finish(src, path, url_prefix, done.result))
+        return future
+
+    def _finish(self, src, path, url_prefix, get_result):
+        conn = self.connect()
+        try:
+            try:
+                result = get_result()
+            except Exception as e:
+                print(f"Error processing image {path}: {str(e)}")
+                # The file stays: it is a content-addressed blob that upload_refs and the profile
+                # still point at, and collect_garbage() deletes it once nothing refers to it
+                mark_image_failed(conn, src, str(e))
+                self.failed += 1
+            else:
+                save_image_record(conn, image_record(result, lambda name: url_prefix + name, src, path))
+                self.processed += 1
+        finally:
+            conn.close()
+
+    def resume_pending(self):
+        """Re-queue uploads left 'pending' by a restart. Returns how many were queued"""
+        conn = self.connect()
+        try:
+            rows = conn.execute(
+                "SELECT src, original_path FROM uploaded_images WHERE status = 'pending'"
+            ).fetchall()
+            missing = [row['src'] for row in rows if not os.path.exists(row['original_path'] or '')]
+            for src in missing:
+                mark_image_failed(conn, src, 'original upload is missing')
+        finally:
+            conn.close()
+        queued = 0
+        for row in rows:
+            if row['src'] not in missing:
+                self.submit(row['src'], row['original_path'])
+                queued += 1
+        return queued
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
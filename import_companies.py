@@ -0,0 +1,334 @@
+"""
+Bulk Company Import Script
+
+Loads partner directories from CSV, JSONL or XLSX files into the company
+table without any prompts. Rows are read as a stream and written in chunks
+with executemany inside batched transactions; a company already in the table
+(same email, or same name when there is no email) is updated instead of
+added again, so re-importing a file is safe.
+
+During the import the per-row triggers on company (company_fts,
+company_version, the industry_id alias lookup and the partner match change
+queue) are suspended. At the end their work is done once, set-based: the
+full-text index is rebuilt, industry_id resolved for the imported rows, the
+changed companies queued for one partner match refresh and the version
+bumped. That is much faster than firing them a million times.
+
+Usage:
+    python import_companies.py partners.csv [more.jsonl ...] [--db companies.db]
+                               [--chunk-size 5000] [--batch-size 100000]
+
+Recognised columns: name, address (or website), phone, mobile, email,
+services (text or list), industry, country. Other columns are ignored.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+from company_cache import install_change_counter, bump_company_version
+from company_search import COMPANY_FTS_DDL
+from db_connections import DATABASES, BUSY_TIMEOUT_MS, configure_connection
+from industry_taxonomy import assign_industry_ids, industry_table_ddl
+from partner_matches import COMPANY_DDL as MATCH_CHANGES_DDL
+
+COMPANY_FIELDS = ('name', 'address', 'phone', 'mobile', 'email', 'services', 'industry', 'country')
+NAME, EMAIL = COMPANY_FIELDS.index('name'), COMPANY_FIELDS.index('email')
+
+FIELD_ALIASES = {
+    'website': 'address',
+    'url': 'address',
+    'company': 'name',
+    'company_name': 'name',
+    'e-mail': 'email',
+    'telephone': 'phone',
+    'tel': 'phone',
+    'cell': 'mobile',
+}
+
+# Same email = same company; without an email, same name. Indexed so upserts stay cheap
+DEDUPE_KEY_SQL = "lower(coalesce(nullif(trim({email}), ''), trim({name})))"
+
+DEDUPE_INDEX_DDL = f"CREATE INDEX IF NOT EXISTS idx_company_dedupe_key ON company ({DEDUPE_KEY_SQL.format(email='email', name='name')})"
+
+_columns = ', '.join(COMPANY_FIELDS)
+
+# One chunk at a time goes through this table; the primary key dedupes within the chunk
+# (last row wins). `key` has no declared type so comparing it with the indexed
+# expression keeps the index usable.
+STAGING_DDL = f"CREATE TEMP TABLE IF NOT EXISTS company_import (key PRIMARY KEY, id INTEGER, {_columns})"
+
+# The key is computed by SQLite too, so it matches the index exactly (SQLite's lower() is ASCII-only)
+_params = {field: f'?{n}' for n, field in enumerate(COMPANY_FIELDS, 1)}
+STAGE_SQL = f'''
+    INSERT OR REPLACE INTO company_import (key, {_columns})
+    VALUES ({DEDUPE_KEY_SQL.format(email=_params['email'], name=_params['name'])},
+            {', '.join(_params.values())})
+'''
+
+# Existing company for each staged row (the oldest, if the table already holds duplicates)
+MATCH_SQL = f'''
+    UPDATE company_import SET id = (
+        SELECT min(company.id) FROM company WHERE {DEDUPE_KEY_SQL.format(email='company.email', name='company.name')} = company_import.key
+    )
+'''
+
+# Empty values in the file keep what is already stored
+UPDATE_SQL = f'''
+    UPDATE company SET {', '.join(f"{field} = coalesce(nullif(i.{field}, ''), company.{field})" for field in COMPANY_FIELDS)}
+    FROM company_import AS i
+    WHERE company.id = i.id
+'''
+
+INSERT_SQL = f"INSERT INTO company ({_columns}) SELECT {_columns} FROM company_import WHERE id IS NULL"
+
+# Ids of the companies this import inserted or updated
+CHANGED_DDL = "CREATE TEMP TABLE IF NOT EXISTS company_import_changed (id INTEGER PRIMARY KEY)"
+
+TRACK_UPDATED_SQL = "INSERT OR IGNORE INTO company_import_changed (id) SELECT id FROM company_import WHERE id IS NOT NULL"
+
+TRACK_INSERTED_SQL = "INSERT OR IGNORE INTO company_import_changed (id) SELECT id FROM company WHERE id > ?"
+
+# What company_industry_ai/_au would have set, for every imported row at once
+INDUSTRY_IDS_SQL = '''
+    UPDATE company SET industry_id = (
+        SELECT industry_id FROM industry_aliases WHERE alias = lower(trim(company.industry))
+    )
+    WHERE id IN (SELECT id FROM company_import_changed)
+'''
+
+QUEUE_MATCH_CHANGES_SQL = '''
+    INSERT INTO company_match_changes (company_id) SELECT id FROM company_import_changed WHERE true
+    ON CONFLICT(company_id) DO UPDATE SET changes = changes + 1
+'''
+
+# Trigger name -> the feature it belongs to (see restore_triggers)
+ROW_TRIGGERS = {
+    'company_fts_ai': 'fts', 'company_fts_ad': 'fts', 'company_fts_au': 'fts',
+    'company_version_ai': 'version', 'company_version_au': 'version', 'company_version_ad': 'version',
+    'company_industry_ai': 'industry', 'company_industry_au': 'industry',
+    'company_match_changes_ai': 'matches', 'company_match_changes_au': 'matches',
+    'company_match_changes_ad': 'matches',
+}
+
+
+def column_plan(columns):
+    """Position of each of COMPANY_FIELDS among `columns` (None when the file doesn't have it)"""
+    plan = {}
+    for position, column in enumerate(columns):
+        field = str(column or '').strip().lower().replace(' ', '_')
+        field = FIELD_ALIASES.get(field, field)
+        if field in COMPANY_FIELDS and field not in plan:
+            plan[field] = position
+    return tuple(plan.get(field) for field in COMPANY_FIELDS)
+
+
+def _clean(value):
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return ', '.join(str(v).strip() for v in value)
+    return str(value).strip()
+
+
+def pick(values, plan):
+    """One row as a tuple in COMPANY_FIELDS order, or None if it has neither name nor email"""
+    count = len(values)
+    record = tuple(
+        '' if i is None or i >= count else value.strip() if type(value := values[i]) is str else _clean(value)
+        for i in plan
+    )
+    if not record[NAME] and not record[EMAIL]:
+        return None
+    return record
+
+
+def rows_from_dicts(rows):
+    """pick() for dict rows (JSONL, seed data); the plan is worked out once per set of keys"""
+    plans = {}
+    for row in rows:
+        columns = tuple(row)
+        plan = plans.get(columns)
+        if plan is None:
+            plan = plans[columns] = column_plan(columns)
+        yield pick(tuple(row.values()), plan)
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        plan = column_plan(next(reader, []))
+        for values in reader:
+            yield pick(values, plan)
+
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        yield from rows_from_dicts(json.loads(line) for line in f if line.strip())
+
+
+def read_xlsx(path):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise SystemExit("Reading .xlsx files needs openpyxl: pip install openpyxl")
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        plan = column_plan(next(rows, ()))
+        for values in rows:
+            yield pick(values, plan)
+    finally:
+        workbook.close()
+
+
+READERS = {
+    '.csv': read_csv,
+    '.jsonl': read_jsonl,
+    '.ndjson': read_jsonl,
+    '.xlsx': read_xlsx,
+}
+
+
+def read_rows(path):
+    """Stream a CSV, JSONL or XLSX file as rows for import_rows (None marks an unusable row)"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in READERS:
+        raise SystemExit(f"Unsupported file type {extension!r} (use {', '.join(READERS)})")
+    return READERS[extension](path)
+
+
+def suspend_triggers(conn):
+    """Drop the per-row triggers on company. Returns the features that had triggers, plus 'fts'
+    when company_fts exists"""
+    suspended = {
+        ROW_TRIGGERS[name] for (name,) in conn.execute(
+            f"SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN ({', '.join('?' * len(ROW_TRIGGERS))})",
+            tuple(ROW_TRIGGERS)
+        )
+    }
+    for trigger in ROW_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'company_fts'").fetchone():
+        suspended.add('fts')
+    return suspended
+
+
+def restore_triggers(conn, suspended):
+    """Do once what the suspended triggers would have done per row, then recreate them: resolve
+    industry_id, queue the changed companies for partner_matches, rebuild company_fts and bump
+    the company version"""
+    # A connection in sqlite3's default isolation level may already have opened one implicitly
+    if not conn.in_transaction:
+        conn.execute("BEGIN")
+    # Before any trigger is back, so these updates don't fire the others row by row
+    if 'industry' in suspended:
+        conn.execute(INDUSTRY_IDS_SQL)
+        assign_industry_ids(conn, 'company')
+        for statement in industry_table_ddl('company'):
+            conn.execute(statement)
+    if 'matches' in suspended:
+        conn.execute(QUEUE_MATCH_CHANGES_SQL)
+        for statement in MATCH_CHANGES_DDL:
+            conn.execute(statement)
+    install_change_counter(conn.execute)
+    if 'fts' in suspended:
+        for statement in COMPANY_FTS_DDL[1:]:
+            conn.execute(statement)
+        conn.execute("INSERT INTO company_fts(company_fts) VALUES ('rebuild')")
+    bump_company_version(conn.execute)
+    conn.execute("DELETE FROM company_import_changed")
+    conn.commit()
+
+
+def import_rows(conn, rows, chunk_size=5000, batch_size=100000, report=print):
+    """Upsert rows from read_rows() or rows_from_dicts() into company. Returns counters and rows/sec"""
+    stats = {'read': 0, 'skipped': 0, 'inserted': 0, 'updated': 0}
+    conn.execute(STAGING_DDL)
+    conn.execute(CHANGED_DDL)
+    conn.execute(DEDUPE_INDEX_DDL)
+    suspended = suspend_triggers(conn)
+    conn.commit()
+    last_id = conn.execute("SELECT coalesce(max(id), 0) FROM company").fetchone()[0]
+    started = time.perf_counter()
+    in_batch = 0
+
+    def flush(chunk):
+        conn.executemany(STAGE_SQL, chunk)
+        conn.execute(MATCH_SQL)
+        conn.execute(TRACK_UPDATED_SQL)
+        stats['updated'] += conn.execute(UPDATE_SQL).rowcount
+        stats['inserted'] += conn.execute(INSERT_SQL).rowcount
+        conn.execute("DELETE FROM company_import")
+
+    try:
+        chunk = []
+        conn.execute("BEGIN")
+        for row in rows:
+            stats['read'] += 1
+            if row is None:
+                stats['skipped'] += 1
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                in_batch += len(chunk)
+                chunk = []
+                if in_batch >= batch_size:
+                    conn.commit()
+                    conn.execute("BEGIN")
+                    in_batch = 0
+                    elapsed = time.perf_counter() - started
+                    report(f"  {stats['read']:>10,} rows read  ({stats['read'] / elapsed:,.0f} rows/sec)")
+        if chunk:
+            flush(chunk)
+        conn.execute(TRACK_INSERTED_SQL, (last_id,))
+        conn.commit()
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+            # Batches committed before the failure still need their follow-up
+            conn.execute(TRACK_INSERTED_SQL, (last_id,))
+        restore_triggers(conn, suspended)
+
+    stats['seconds'] = round(time.perf_counter() - started, 2)
+    stats['rows_per_sec'] = round(stats['read'] / stats['seconds']) if stats['seconds'] else None
+    return stats
+
+
+def connect_for_import(path):
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    configure_connection(conn)
+    # Bigger page cache for the duration of the load
+    conn.execute("PRAGMA cache_size = -262144")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import companies from CSV, JSONL or XLSX files")
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--db', default=DATABASES['partner'], help="target database (default: %(default)s)")
+    parser.add_argument('--chunk-size', type=int, default=5000, help="rows per executemany")
+    parser.add_argument('--batch-size', type=int, default=100000, help="rows per transaction")
+    args = parser.parse_args(argv)
+
+    conn = connect_for_import(args.db)
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'company'").fetchone():
+        raise SystemExit(f"{args.db} has no company table - run `python app.py init-db` first")
+    try:
+        for path in args.files:
+            print(f"Importing {path} into {args.db}...")
+            stats = import_rows(conn, read_rows(path), args.chunk_size, args.batch_size)
+            print(f"Done: {stats['read']:,} rows read, {stats['inserted']:,} inserted, "
+                  f"{stats['updated']:,} updated, {stats['skipped']:,} skipped "
+                  f"in {stats['seconds']}s ({stats['rows_per_sec']:,} rows/sec)")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
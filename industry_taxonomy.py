@@ -0,0 +1,280 @@
+"""
+Canonical industry taxonomy shared by companies.db and database.db.
+
+Industries are free text in both company and company_profiles, so
+"Textiles", "textile & apparel" and "Garments" never matched each other.
+install_industries() adds to a database:
+
+    industries          id, canonical name and sector
+    industry_aliases    lower(trim(text)) -> industry id (names, synonyms, spellings)
+    industry_adjacency  industry -> related industries with a weight (1 for itself)
+
+plus an indexed industry_id column on the given table, kept up to date by
+triggers on INSERT/UPDATE OF industry. Text that no alias covers exactly is
+resolved in Python (resolve_industry) and remembered as a new alias, so the
+next row with the same text is handled by the trigger.
+
+Industry ids are fixed in INDUSTRIES, so both databases agree on them
+without a cross-database join.
+"""
+
+import re
+
+# (id, name, sector, synonyms). Ids are stored in company rows: never renumber, only append
+INDUSTRIES = (
+    (1, 'Agriculture', 'primary', ('farming', 'agri', 'agribusiness', 'agro', 'crops', 'livestock', 'rice', 'fruit and vegetables')),
+    (2, 'Food & Beverage', 'consumer', ('food', 'foods', 'beverages', 'food processing', 'fmcg', 'halal food', 'spices')),
+    (3, 'Textiles & Apparel', 'manufacturing', ('textile', 'apparel', 'garments', 'clothing', 'fashion', 'cotton', 'yarn', 'fabrics')),
+    (4, 'Leather', 'manufacturing', ('leather goods', 'footwear', 'tannery')),
+    (5, 'Manufacturing', 'manufacturing', ('industrial', 'factory', 'engineering', 'machinery', 'production')),
+    (6, 'Chemicals', 'manufacturing', ('chemical', 'fertilizer', 'fertilizers', 'plastics', 'petrochemicals')),
+    (7, 'Pharmaceuticals', 'health', ('pharma', 'pharmaceutical', 'medicines', 'drugs')),
+    (8, 'Healthcare', 'health', ('health', 'medical', 'hospital', 'hospitals', 'health care', 'surgical instruments')),
+    (9, 'Construction', 'infrastructure', ('building', 'building materials', 'cement', 'steel', 'contractors')),
+    (10, 'Real Estate', 'infrastructure', ('property', 'realty', 'housing')),
+    (11, 'Energy', 'infrastructure', ('power', 'oil and gas', 'oil', 'gas', 'renewable energy', 'solar', 'electricity', 'utilities')),
+    (12, 'Mining', 'primary', ('minerals', 'gemstones', 'marble', 'quarrying', 'metals')),
+    (13, 'Transportation', 'services', ('transport', 'logistics', 'shipping', 'freight', 'supply chain', 'courier', 'aviation')),
+    (14, 'Retail', 'consumer', ('wholesale', 'trading', 'trade', 'e-commerce', 'ecommerce', 'import export', 'distribution')),
+    (15, 'Hospitality', 'services', ('tourism', 'travel', 'hotels', 'restaurants', 'travel and tourism')),
+    (16, 'Technology', 'services', ('it', 'information technology', 'software', 'tech', 'it services', 'electronics', 'computers')),
+    (17, 'Telecommunications', 'services', ('telecom', 'telecoms', 'mobile', 'internet', 'communications')),
+    (18, 'Finance', 'services', ('banking', 'financial services', 'insurance', 'fintech', 'investment')),
+    (19, 'Education', 'services', ('training', 'schools', 'universities', 'e-learning', 'edtech')),
+    (20, 'Media', 'services', ('advertising', 'marketing', 'publishing', 'entertainment', 'printing')),
+)
+
+# Industries that trade with or supply each other (both directions)
+RELATED = (
+    ('Agriculture', 'Food & Beverage'),
+    ('Agriculture', 'Textiles & Apparel'),
+    ('Agriculture', 'Chemicals'),
+    ('Textiles & Apparel', 'Leather'),
+    ('Textiles & Apparel', 'Retail'),
+    ('Leather', 'Retail'),
+    ('Food & Beverage', 'Retail'),
+    ('Food & Beverage', 'Hospitality'),
+    ('Manufacturing', 'Chemicals'),
+    ('Manufacturing', 'Construction'),
+    ('Manufacturing', 'Transportation'),
+    ('Pharmaceuticals', 'Healthcare'),
+    ('Pharmaceuticals', 'Chemicals'),
+    ('Construction', 'Real Estate'),
+    ('Construction', 'Energy'),
+    ('Energy', 'Mining'),
+    ('Mining', 'Construction'),
+    ('Retail', 'Transportation'),
+    ('Technology', 'Telecommunications'),
+    ('Technology', 'Education'),
+    ('Technology', 'Finance'),
+    ('Media', 'Technology'),
+    ('Media', 'Education'),
+    ('Hospitality', 'Transportation'),
+)
+
+# Weight of an industry's own companies, of RELATED ones, and of others in the same sector
+SAME_WEIGHT = 1.0
+RELATED_WEIGHT = 0.6
+SECTOR_WEIGHT = 0.3
+
+# Words that say nothing about which industry is meant
+FILLER_WORDS = {'and', 'the', 'of', 'industry', 'industries', 'sector', 'services', 'products', 'company', 'companies'}
+
+# What a company does with the goods rather than which goods: left out when weighing a fuzzy match
+# (normalize()d, so singular)
+TRADE_WORDS = {'export', 'exporter', 'import', 'importer', 'trader', 'supplier', 'dealer', 'manufacturer', 'distributor'}
+
+# A fuzzy match needs every word of the alias in the text, making up more than this share of
+# its words: "cotton exports" -> cotton, but not "power tools" -> power or "oil painting" -> oil
+MIN_FUZZY_SCORE = 0.5
+
+TAXONOMY_DDL = [
+    '''CREATE TABLE IF NOT EXISTS industries (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE,
+        sector TEXT NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS industry_aliases (
+        alias TEXT PRIMARY KEY,
+        industry_id INTEGER NOT NULL REFERENCES industries(id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS industry_adjacency (
+        industry_id INTEGER NOT NULL,
+        adjacent_id INTEGER NOT NULL,
+        weight REAL NOT NULL,
+        PRIMARY KEY (industry_id, adjacent_id)
+    ) WITHOUT ROWID''',
+]
+
+# The same key the triggers compute in SQL
+_ALIAS_ID_SQL = "(SELECT industry_id FROM industry_aliases WHERE alias = lower(trim(new.industry)))"
+
+
+def industry_table_ddl(table):
+    """The industry_id index and the alias triggers for `table`"""
+    return [
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_industry_id ON {table} (industry_id)",
+        f'''CREATE TRIGGER IF NOT EXISTS {table}_industry_ai AFTER INSERT ON {table} BEGIN
+            UPDATE {table} SET industry_id = {_ALIAS_ID_SQL} WHERE rowid = new.rowid;
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS {table}_industry_au AFTER UPDATE OF industry ON {table} BEGIN
+            UPDATE {table} SET industry_id = {_ALIAS_ID_SQL} WHERE rowid = new.rowid;
+        END''',
+    ]
+
+
+def alias_key(text):
+    """What the triggers look up: lower(trim(industry)) (SQLite's lower() is ASCII-only)"""
+    text = (text or '').strip(' ')
+    return ''.join(char.lower() if char.isascii() else char for char in text)
+
+
+def normalize(text):
+    """Words of an industry name with case, punctuation, '&' and plurals smoothed out"""
+    words = re.sub(r'[^a-z0-9]+', ' ', (text or '').lower().replace('&', ' and ')).split()
+    singular = []
+    for word in words:
+        if word in FILLER_WORDS:
+            continue
+        if word.endswith('ies') and len(word) > 4:
+            word = word[:-3] + 'y'
+        elif word.endswith('s') and not word.endswith('ss') and len(word) > 3:
+            word = word[:-1]
+        singular.append(word)
+    return tuple(singular)
+
+
+def _spellings(name):
+    """The alias keys to seed for a name or synonym: as written, with '&'/'and' swapped, and
+    with the last word in singular/plural"""
+    key = alias_key(name)
+    keys = {key, key.replace(' & ', ' and '), key.replace(' and ', ' & ')}
+    for key in list(keys):
+        if len(key.split()[-1]) > 3:
+            keys.add(key[:-1] if key.endswith('s') and not key.endswith('ss') else key + 's')
+    return keys
+
+
+def industry_adjacency():
+    """[(industry_id, adjacent_id, weight)] for every related pair, both directions"""
+    ids = {name: industry_id for industry_id, name, _, _ in INDUSTRIES}
+    weights = {}
+    for a_id, _, a_sector, _ in INDUSTRIES:
+        weights[(a_id, a_id)] = SAME_WEIGHT
+        for b_id, _, b_sector, _ in INDUSTRIES:
+            if a_id != b_id and a_sector == b_sector:
+                weights[(a_id, b_id)] = SECTOR_WEIGHT
+    for a, b in RELATED:
+        weights[(ids[a], ids[b])] = weights[(ids[b], ids[a])] = RELATED_WEIGHT
+    return [(a, b, weight) for (a, b), weight in sorted(weights.items())]
+
+
+def resolve_industry(conn, text, learn=True):
+    """Industry id for free text, or None. Exact alias first, then the canonical industry whose name
+    or synonym makes up most of the text ("Cotton exports" -> Textiles & Apparel, see MIN_FUZZY_SCORE).
+    With learn, a fuzzy match is saved as an alias"""
+    key = alias_key(text)
+    if not key:
+        return None
+    row = conn.execute("SELECT industry_id FROM industry_aliases WHERE alias = ?", (key,)).fetchone()
+    if row:
+        return row[0]
+    words = set(normalize(text))
+    if not words:
+        return None
+    content = (words - TRADE_WORDS) or words
+    scores = {}
+    for industry_id, name, _, synonyms in INDUSTRIES:
+        for alias in (name, *synonyms):
+            alias_words = set(normalize(alias))
+            if not alias_words or not alias_words <= words:
+                continue
+            if alias_words == words:
+                score = 2.0
+            else:
+                # Share of the text's words the alias accounts for, e.g. "cotton exports" -> cotton: 1
+                score = len(alias_words) / len(alias_words | content)
+            scores[industry_id] = max(scores.get(industry_id, 0), score)
+    best = sorted(scores.items(), key=lambda item: -item[1])
+    if not best or best[0][1] <= MIN_FUZZY_SCORE or (len(best) > 1 and best[1][1] == best[0][1]):
+        return None     # no close enough match, or a tie we can't break
+    if learn:
+        conn.execute("INSERT OR IGNORE INTO industry_aliases (alias, industry_id) VALUES (?, ?)", (key, best[0][0]))
+    return best[0][0]
+
+
+def assign_industry_ids(conn, table):
+    """Resolve industry_id for rows the alias triggers couldn't match. Returns how many were set"""
+    rows = conn.execute(
+        f"SELECT rowid, industry FROM {table} WHERE industry_id IS NULL AND trim(coalesce(industry, '')) != ''"
+    ).fetchall()
+    updated = 0
+    for rowid, industry in rows:
+        industry_id = resolve_industry(conn, industry)
+        if industry_id is not None:
+            conn.execute(f"UPDATE {table} SET industry_id = ? WHERE rowid = ?", (industry_id, rowid))
+            updated += 1
+    return updated
+
+
+def install_industries(conn, table):
+    """Create or update the taxonomy tables, add an indexed industry_id to `table` with its
+    triggers, and fill it in for existing rows. Safe to run on every start.
+
+    Returns False, after creating only the taxonomy, when `table` doesn't exist yet.
+    """
+    with conn:
+        for statement in TAXONOMY_DDL:
+            conn.execute(statement)
+        conn.executemany(
+            "INSERT INTO industries (id, name, sector) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET name = excluded.name, sector = excluded.sector "
+            "WHERE name != excluded.name OR sector != excluded.sector",
+            [(industry_id, name, sector) for industry_id, name, sector, _ in INDUSTRIES]
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO industry_aliases (alias, industry_id) VALUES (?, ?)",
+            [
+                (key, industry_id)
+                for industry_id, name, _, synonyms in INDUSTRIES
+                for alias in (name, *synonyms)
+                for key in _spellings(alias)
+            ]
+        )
+        conn.executemany(
+            "INSERT INTO industry_adjacency (industry_id, adjacent_id, weight) VALUES (?, ?, ?) "
+            "ON CONFLICT(industry_id, adjacent_id) DO UPDATE SET weight = excluded.weight "
+            "WHERE weight != excluded.weight",
+            industry_adjacency()
+        )
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if not columns:
+            return False
+        if 'industry_id' not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN industry_id INTEGER REFERENCES industries(id)")
+            conn.execute(f"UPDATE {table} SET industry_id = (SELECT industry_id FROM industry_aliases "
+                         f"WHERE alias = lower(trim({table}.industry)))")
+        for statement in industry_table_ddl(table):
+            conn.execute(statement)
+        assign_industry_ids(conn, table)
+    return True
+
+
+# Companies of the given industry, then of related ones, through the two indexes
+RELATED_COMPANIES_SQL = '''
+    SELECT company.*, industries.name AS matched_industry, adjacency.weight AS relevance
+    FROM industry_adjacency AS adjacency
+    JOIN industries ON industries.id = adjacency.adjacent_id
+    JOIN company ON company.industry_id = adjacency.adjacent_id
+    WHERE adjacency.industry_id = ?
+    ORDER BY adjacency.weight DESC, company.name, company.id
+    LIMIT ?
+'''
+
+
+def related_companies(conn, industry_id, limit=None):
+    """Companies in industry_id first, then adjacent industries by weight; rows carry
+    matched_industry and relevance"""
+    if industry_id is None:
+        return []
+    return conn.execute(RELATED_COMPANIES_SQL, (industry_id, -1 if limit is None else limit)).fetchall()
@@ -0,0 +1,152 @@
+"""
+Local answers for structured /ask questions.
+
+A few kinds of question can be answered exactly from the company table, so
+they skip the model round-trip and keep working when every upstream model is
+rate limited:
+
+    list_all   "list all companies", "show me your partner companies"
+    contact    "contact details for Karachi Textile Mills"
+    offers     "who offers solar panels", "suppliers of basmati rice"
+
+Replies follow the formatting rules given to the model in
+format_system_prompt: one bullet per line, at most 250 characters, no "*".
+Anything that doesn't clearly match an intent returns None and goes to the
+model as before.
+"""
+
+import re
+from company_retrieval import tokenize
+
+MAX_REPLY_CHARS = 250
+BULLET = '•'
+
+LIST_ALL_RE = re.compile(
+    r"(please )?(can you |could you )?(list|show|show me|give me|tell me|what are)( all| every)?( of)?"
+    r"( the| your| our)?( partner| registered)? (companies|partners|partner companies|businesses)( please)?"
+    r"|(all|list of)( the| your)?( partner| registered)? companies"
+    r"|(what|which) companies (do you have|are there|are registered|are listed)"
+)
+
+OFFERS_RES = [
+    re.compile(
+        r"(who|which companies|which company|which partners|any companies|anyone) "
+        r"(offers?|provides?|sells?|supplies|supply|exports?|imports?|makes?|manufactures?|deals? in) (?P<topic>.+)"
+    ),
+    re.compile(r"(suppliers?|providers?|exporters?|sellers?|manufacturers?|companies) (of|for|offering|selling) (?P<topic>.+)"),
+]
+
+CONTACT_WORDS = {
+    'contact', 'phone', 'email', 'mail', 'number', 'reach', 'call', 'website',
+    'address', 'detail', 'details', 'info', 'information', 'about',
+}
+
+# Left out when matching a company name in a question
+GENERIC_NAME_WORDS = {'ltd', 'limited', 'pvt', 'private', 'co', 'inc', 'llc', 'plc', 'corporation', 'corp', 'group'}
+
+
+def simplify(message):
+    """Lowercase words only, for matching the intent patterns"""
+    return ' '.join(re.findall(r"[a-z0-9&']+", (message or '').lower()))
+
+
+def fit_reply(header, lines, limit=MAX_REPLY_CHARS):
+    """Join header and bullet lines, ending with "• and N more" if they don't all fit in `limit`"""
+    out = [header]
+    for i, line in enumerate(lines):
+        left_after = len(lines) - i - 1
+        reserve = len(f"\n{BULLET} and {left_after} more") if left_after else 0
+        if len('\n'.join(out + [line])) + reserve > limit:
+            out.append(f"{BULLET} and {len(lines) - i} more")
+            break
+        out.append(line)
+    return '\n'.join(out).replace('*', '')[:limit]
+
+
+class LocalAnswerer:
+    """Answers the structured intents above from prompt records (see get_company_prompt_data)"""
+
+    def __init__(self, companies):
+        # The table can hold the same company twice; list it once
+        seen = set()
+        self.companies = []
+        for company in companies:
+            key = (company.get('name') or '').strip().lower()
+            if key and key not in seen:
+                seen.add(key)
+                self.companies.append(company)
+        self._name_tokens = []
+        self._offer_tokens = []
+        for company in self.companies:
+            tokens = set(tokenize(company.get('name')))
+            self._name_tokens.append(tokens - GENERIC_NAME_WORDS or tokens)
+            self._offer_tokens.append(set(tokenize(' '.join(company.get('services') or []) + ' ' + (company.get('industry') or ''))))
+
+    def answer(self, message):
+        """{'intent', 'reply', 'companies_included'} or None if the model should answer"""
+        if not self.companies:
+            return None
+        text = simplify(message)
+        if LIST_ALL_RE.fullmatch(text):
+            return self._list_all()
+        for pattern in OFFERS_RES:
+            match = pattern.fullmatch(text)
+            if match:
+                return self._offers(match.group('topic'))
+        tokens = set(tokenize(text))
+        if tokens & CONTACT_WORDS or set(text.split()) & CONTACT_WORDS:
+            return self._contact(tokens)
+        return None
+
+    def _list_all(self):
+        lines = []
+        for company in self.companies:
+            services = company.get('services') or []
+            lines.append(f"{BULLET} {company['name']}" + (f" - {services[0]}" if services else ''))
+        return {
+            'intent': 'list_all',
+            'reply': fit_reply(f"Our {len(self.companies)} partner companies:", lines),
+            'companies_included': len(self.companies),
+        }
+
+    def _offers(self, topic):
+        wanted = set(tokenize(topic))
+        if not wanted:
+            return None
+        matches = [company for company, offered in zip(self.companies, self._offer_tokens) if wanted <= offered]
+        if not matches:
+            # Synonyms and broader questions are better left to the model
+            return None
+        lines = []
+        for company in matches:
+            services = [s for s in company.get('services') or [] if wanted & set(tokenize(s))]
+            lines.append(f"{BULLET} {company['name']}" + (f" - {services[0]}" if services else ''))
+        return {
+            'intent': 'offers',
+            'reply': fit_reply(f"Partners offering {topic}:", lines),
+            'companies_included': len(matches),
+        }
+
+    def _contact(self, tokens):
+        best, best_size, tied = None, 0, False
+        for company, name_tokens in zip(self.companies, self._name_tokens):
+            if name_tokens and name_tokens <= tokens:
+                if len(name_tokens) > best_size:
+                    best, best_size, tied = company, len(name_tokens), False
+                elif len(name_tokens) == best_size:
+                    tied = True
+        if best is None or tied:
+            return None
+        # contact is "email | phone | mobile"
+        email, phone, mobile = [part.strip() for part in ((best.get('contact') or '').split('|') + ['', ''])[:3]]
+        lines = [
+            f"{BULLET} Services: {', '.join((best.get('services') or [])[:3])}",
+            f"{BULLET} Website: {best.get('website') or '-'}",
+            f"{BULLET} Email: {email or '-'}",
+            f"{BULLET} Phone: {phone or mobile or '-'}",
+        ]
+        return {
+            'intent': 'contact',
+            'reply': fit_reply(f"{best['name']}", lines),
+            'companies_included': 1,
+        }
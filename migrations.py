@@ -0,0 +1,308 @@
+"""
+Versioned schema migrations for the app's SQLite databases.
+
+Each database in db_connections.DATABASES has a numbered list of migrations
+in MIGRATIONS. schema_migrations records which ones a database has had;
+migrate() applies the rest in order, each followed by its version row. Every
+migration is idempotent (CREATE ... IF NOT EXISTS, column checks before
+ALTER TABLE), so the first ones also serve as the baseline for databases
+created before this runner existed, and a migration interrupted half-way is
+safe to run again.
+
+Run at deploy time (see Procfile):
+
+    python migrations.py            apply pending migrations to every database
+    python migrations.py --status   list applied and pending versions
+    python migrations.py --check    also EXPLAIN every ROUTE_QUERIES statement and fail on a full scan
+
+check_query_plans() is the EXPLAIN QUERY PLAN check: a route query whose
+plan has a SCAN of a table (rather than a SEARCH through an index) fails,
+unless it is marked bounded (its LIMIT caps the rows read).
+"""
+
+import argparse
+import re
+import sys
+from collections import namedtuple
+from db_connections import DATABASES, connect
+from company_search import COUNT_SQL as COMPANY_COUNT_SQL, SEARCH_SQL as COMPANY_SEARCH_SQL, install_company_fts
+from email_queue import CLAIM_SQL as EMAIL_CLAIM_SQL, install_outbox
+from image_pipeline import install_images
+from industry_taxonomy import install_industries
+from model_router import ModelRouter
+from partner_matches import CONNECTIONS_SQL, install_company_changes, install_vendor_matches
+from upload_store import install_upload_store
+
+SCHEMA_MIGRATIONS_DDL = '''
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+# Columns added to users after it was first created (formerly sign_up/model.py update_db_schema)
+USER_COLUMNS = {
+    'email_verified': 'BOOLEAN DEFAULT FALSE',
+    'verification_token': 'TEXT',
+    'verification_token_expires': 'DATETIME',
+    'created_at': 'DATETIME',
+}
+
+
+def _users(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            country TEXT,
+            role TEXT,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT,
+            company_name TEXT,
+            full_name TEXT,
+            mobile_number TEXT,
+            email_verified BOOLEAN DEFAULT FALSE,
+            verification_token TEXT,
+            verification_token_expires DATETIME,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    columns = {row[1] for row in conn.execute("PRAGMA main.table_info(users)")}
+    for column, column_type in USER_COLUMNS.items():
+        if column not in columns:
+            conn.execute(f"ALTER TABLE users ADD COLUMN {column} {column_type}")
+            if column == 'created_at':
+                # ALTER TABLE can't add a CURRENT_TIMESTAMP default
+                conn.execute("UPDATE users SET created_at = datetime('now') WHERE created_at IS NULL")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS email_verification_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            email TEXT,
+            verification_token TEXT,
+            sent_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            verified_at DATETIME,
+            status TEXT DEFAULT 'pending',
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+
+# Formerly company_profile.py, which created it in your_database.db; the app has always used database.db
+COMPANY_PROFILES_DDL = '''
+    CREATE TABLE IF NOT EXISTS company_profiles (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        company_logo TEXT,
+        product_images TEXT,
+        product_description TEXT,
+        last_updated DATETIME DEFAULT CURRENT_TIMESTAMP,
+        company_name TEXT,
+        location TEXT,
+        industry TEXT,
+        about_us TEXT,
+        products_and_services TEXT,
+        email TEXT,
+        phone TEXT,
+        website TEXT,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+'''
+
+# The column set of the SQLAlchemy Company model, plus the columns added since
+COMPANY_DDL = '''
+    CREATE TABLE IF NOT EXISTS company (
+        id INTEGER NOT NULL,
+        name VARCHAR(200),
+        address VARCHAR(300),
+        phone VARCHAR(50),
+        mobile VARCHAR(50),
+        email VARCHAR(100),
+        services VARCHAR(300),
+        industry VARCHAR(100),
+        country VARCHAR(100),
+        PRIMARY KEY (id)
+    )
+'''
+
+CONTACT_MESSAGES_DDL = '''
+    CREATE TABLE IF NOT EXISTS contact_messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        company_name TEXT NOT NULL,
+        email TEXT NOT NULL,
+        purpose TEXT NOT NULL,
+        subject TEXT NOT NULL
+    )
+'''
+
+# database name -> [(version, name, SQL statements or a function of the connection)]
+# Append only: a released version number must never change meaning
+MIGRATIONS = {
+    'user': [
+        (1, 'users and email verification logs', _users),
+        (2, 'company profiles', [COMPANY_PROFILES_DDL]),
+        (3, 'email outbox', install_outbox),
+        (4, 'upload store and image variants', lambda conn: (install_upload_store(conn), install_images(conn))),
+        (5, 'industry taxonomy', lambda conn: install_industries(conn, 'company_profiles')),
+        (6, 'partner matches', install_vendor_matches),
+        (7, 'indexes for profile and verification lookups', [
+            "CREATE INDEX IF NOT EXISTS ix_company_profiles_user_id ON company_profiles (user_id)",
+            "CREATE INDEX IF NOT EXISTS ix_email_verification_logs_email_status ON email_verification_logs (email, status)",
+            "CREATE INDEX IF NOT EXISTS ix_email_verification_logs_user_id ON email_verification_logs (user_id)",
+        ]),
+    ],
+    'partner': [
+        (1, 'company', [COMPANY_DDL]),
+        (2, 'company full-text search', install_company_fts),
+        (3, 'industry taxonomy', lambda conn: install_industries(conn, 'company')),
+        (4, 'partner match change queue', install_company_changes),
+    ],
+    'contact': [
+        (1, 'contact messages', [CONTACT_MESSAGES_DDL]),
+    ],
+    'router': [
+        (1, 'model stats', ModelRouter.install),
+    ],
+}
+
+
+def applied_versions(conn):
+    conn.execute(SCHEMA_MIGRATIONS_DDL)
+    conn.commit()
+    return {row[0] for row in conn.execute("SELECT version FROM main.schema_migrations")}
+
+
+def pending_migrations(conn, name):
+    """The migrations of database `name` that conn's database hasn't had yet, in order"""
+    done = applied_versions(conn)
+    return [migration for migration in sorted(MIGRATIONS[name], key=lambda m: m[0]) if migration[0] not in done]
+
+
+def migrate(name, conn=None, report=print):
+    """Apply database `name`'s pending migrations. Returns the versions applied"""
+    own = conn is None
+    conn = conn or connect(name)
+    try:
+        applied = []
+        for version, title, step in pending_migrations(conn, name):
+            if callable(step):
+                step(conn)
+            else:
+                for statement in step:
+                    conn.execute(statement)
+            conn.execute("INSERT INTO main.schema_migrations (version, name) VALUES (?, ?)", (version, title))
+            conn.commit()
+            applied.append(version)
+            report(f"{name}: applied migration {version} ({title})")
+        return applied
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if own:
+            conn.close()
+
+
+def migrate_all(report=print):
+    """Apply pending migrations to every database. Returns {name: [versions applied]}"""
+    return {name: migrate(name, report=report) for name in MIGRATIONS}
+
+
+def schema_status():
+    """{name: (applied versions, pending versions)} for every database"""
+    status = {}
+    for name in MIGRATIONS:
+        conn = connect(name)
+        try:
+            pending = [version for version, _, _ in pending_migrations(conn, name)]
+            status[name] = (sorted(applied_versions(conn)), pending)
+        finally:
+            conn.close()
+    return status
+
+
+RouteQuery = namedtuple('RouteQuery', 'database route sql params bounded', defaults=(False,))
+
+# The statements routes run on each request, with representative parameters. Keep in step with app.py
+ROUTE_QUERIES = [
+    RouteQuery('user', 'login', "SELECT id, email, password, full_name, role, email_verified FROM users WHERE email = ?", ('a@example.com',)),
+    RouteQuery('user', 'signup', '''UPDATE email_verification_logs SET user_id = NULL
+        WHERE user_id IN (SELECT id FROM users WHERE email = ? AND email_verified = 0)''', ('a@example.com',)),
+    RouteQuery('user', 'signup', "DELETE FROM users WHERE email = ? AND email_verified = 0", ('a@example.com',)),
+    RouteQuery('user', 'manual_verify', '''SELECT id, verification_token, verification_token_expires
+        FROM users WHERE email = ? AND verification_token = ?''', ('a@example.com', 'token')),
+    RouteQuery('user', 'verify_email', '''UPDATE email_verification_logs SET verified_at = CURRENT_TIMESTAMP, status = 'verified'
+        WHERE email = ? AND status = 'pending' ''', ('a@example.com',)),
+    RouteQuery('user', 'vendor_dashboard', "SELECT id, full_name, email, mobile_number, company_name FROM users WHERE id = ?", (1,)),
+    RouteQuery('user', 'vendor_profile', '''SELECT company_logo, product_images, product_description, company_name, location,
+        industry, about_us, products_and_services, email, phone, website FROM company_profiles WHERE user_id = ?''', (1,)),
+    RouteQuery('user', 'vendor_profile', "SELECT id FROM company_profiles WHERE user_id = ?", (1,)),
+    RouteQuery('user', 'connections_page', "SELECT industry, industry_id FROM company_profiles WHERE user_id = ?", (1,)),
+    RouteQuery('user', 'connections_page', CONNECTIONS_SQL, {'vendor': 1, 'limit': 50}),
+    RouteQuery('user', 'image_status', "SELECT * FROM uploaded_images WHERE src IN (?, ?)", ('/a.png', '/b.png')),
+    RouteQuery('user', 'vendor_profile', "SELECT path FROM upload_blobs WHERE digest = ?", ('0' * 64,)),
+    RouteQuery('user', 'vendor_profile', "DELETE FROM upload_refs WHERE owner = ?", ('profile:1',)),
+    RouteQuery('user', 'email delivery', EMAIL_CLAIM_SQL, ()),
+    RouteQuery('partner', 'leads_page', COMPANY_SEARCH_SQL, {'match': '"rice"*', 'after': None, 'after_rank': None, 'limit': 21}),
+    RouteQuery('partner', 'leads_page', COMPANY_COUNT_SQL, ('"rice"*', 1001)),
+    RouteQuery('partner', 'leads_page', "SELECT * FROM company WHERE (1) AND id > ? ORDER BY id LIMIT ?", (0, 21)),
+    # Counting all companies for an empty search stops at LEADS_COUNT_CAP + 1 rows
+    RouteQuery('partner', 'leads_page', "SELECT COUNT(*) FROM (SELECT 1 FROM company WHERE 1 LIMIT ?)", (1001,), bounded=True),
+]
+
+# "SCAN company", "SCAN profile USING INDEX ..." - but not "SCAN (subquery-1)" or a virtual (FTS) table
+SCAN_RE = re.compile(r'^SCAN (?!\()')
+
+
+def full_scans(conn, sql, params=()):
+    """The plan lines of sql that scan a whole table"""
+    plan = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return [row[3] for row in plan if SCAN_RE.match(row[3]) and 'VIRTUAL TABLE' not in row[3]]
+
+
+def check_query_plans(queries=ROUTE_QUERIES):
+    """[(route, sql, scan lines)] for every unbounded route query whose plan has a full scan"""
+    failures = []
+    connections = {}
+    try:
+        for query in queries:
+            if query.bounded:
+                continue
+            if query.database not in connections:
+                connections[query.database] = connect(query.database)
+            scans = full_scans(connections[query.database], query.sql, query.params)
+            if scans:
+                failures.append((query.route, ' '.join(query.sql.split()), scans))
+    finally:
+        for conn in connections.values():
+            conn.close()
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply schema migrations to the app's SQLite databases")
+    parser.add_argument('--status', action='store_true', help="only list applied and pending migrations")
+    parser.add_argument('--check', action='store_true', help="after migrating, fail if a route query does a full table scan")
+    args = parser.parse_args(argv)
+
+    if args.status:
+        for name, (applied, pending) in schema_status().items():
+            print(f"{name} ({DATABASES[name]}): applied {applied or 'none'}, pending {pending or 'none'}")
+        return 0
+
+    applied = migrate_all()
+    if not any(applied.values()):
+        print("All databases are up to date")
+    if args.check:
+        failures = check_query_plans()
+        for route, sql, scans in failures:
+            print(f"Full scan in {route}: {'; '.join(scans)}\n    {sql}")
+        if failures:
+            return 1
+        print(f"Query plans OK ({len(ROUTE_QUERIES)} route queries)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
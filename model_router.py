@@ -0,0 +1,181 @@
+"""
+Adaptive ordering of the OpenRouter MODELS fallback chain.
+
+Every attempt updates rolling (exponentially weighted) latency and success
+rate for its model. Candidates are tried in order of expected time to a good
+answer (latency / success rate), and a model that keeps failing gets its
+circuit opened: it is skipped until the open period ends. The circuit is then
+half-open: the first order() call to see that claims a single trial by
+pushing open_until forward (a conditional UPDATE, so only one worker wins),
+and other requests keep skipping the model. The trial's success closes the
+circuit and its failure reopens it for longer; a claim whose request never
+reports back (or never reached the model) expires after trial_seconds. A 429
+with Retry-After opens the circuit for exactly that long.
+
+State lives in a small SQLite file (model_router.db) so all gunicorn workers
+share it. Updates are single UPSERT statements, so concurrent workers never
+overwrite each other's samples.
+"""
+
+import sqlite3
+import time
+from email.utils import parsedate_to_datetime
+
+ROUTER_DDL = '''
+    CREATE TABLE IF NOT EXISTS model_stats (
+        model TEXT PRIMARY KEY,
+        latency_ms REAL NOT NULL,
+        success_rate REAL NOT NULL,
+        consecutive_failures INTEGER NOT NULL DEFAULT 0,
+        open_until REAL NOT NULL DEFAULT 0,
+        samples INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        updated_at REAL
+    )
+'''
+
+RECORD_SUCCESS_SQL = '''
+    INSERT INTO model_stats (model, latency_ms, success_rate, consecutive_failures, open_until, samples, updated_at)
+    VALUES (:model, :latency, 1.0, 0, 0, 1, :now)
+    ON CONFLICT(model) DO UPDATE SET
+        latency_ms = latency_ms + :alpha * (:latency - latency_ms),
+        success_rate = success_rate + :alpha * (1.0 - success_rate),
+        consecutive_failures = 0,
+        open_until = 0,
+        samples = samples + 1,
+        last_error = NULL,
+        updated_at = :now
+'''
+
+# open_until: Retry-After wins when given; otherwise the circuit opens once
+# consecutive failures reach the threshold, for a period that doubles with
+# every further failure (capped at max_open).
+RECORD_FAILURE_SQL = '''
+    INSERT INTO model_stats (model, latency_ms, success_rate, consecutive_failures, open_until, samples, last_error, updated_at)
+    VALUES (:model, :latency, 0.0, 1,
+            CASE WHEN :retry_after IS NOT NULL THEN :now + :retry_after
+                 WHEN :threshold <= 1 THEN :now + :open_seconds
+                 ELSE 0 END,
+            1, :error, :now)
+    ON CONFLICT(model) DO UPDATE SET
+        latency_ms = latency_ms + :alpha * (:latency - latency_ms),
+        success_rate = success_rate + :alpha * (0.0 - success_rate),
+        consecutive_failures = consecutive_failures + 1,
+        open_until = CASE
+            WHEN :retry_after IS NOT NULL THEN :now + :retry_after
+            WHEN consecutive_failures + 1 >= :threshold
+                THEN :now + MIN(:max_open, :open_seconds * (1 << MIN(consecutive_failures + 1 - :threshold, 10)))
+            ELSE open_until END,
+        samples = samples + 1,
+        last_error = :error,
+        updated_at = :now
+'''
+
+# Half-open: only the caller that still sees the expired open_until it read gets the trial
+CLAIM_TRIAL_SQL = '''
+    UPDATE model_stats SET open_until = :now + :trial_seconds
+    WHERE model = :model AND open_until = :seen
+'''
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ModelRouter:
+    """Orders models by expected latency and success, skipping open circuits"""
+
+    def __init__(self, get_connection, failure_threshold=3, open_seconds=30, max_open_seconds=900,
+                 alpha=0.2, prior_latency_ms=5000, prior_success_rate=0.8, trial_seconds=60):
+        self._get_connection = get_connection
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        # How long a half-open trial keeps the model to itself before another request may try
+        self.trial_seconds = trial_seconds
+        self.alpha = alpha
+        # Models without samples yet are assumed to look like this
+        self.prior_latency_ms = prior_latency_ms
+        self.prior_success_rate = prior_success_rate
+
+    @staticmethod
+    def install(conn):
+        conn.execute(ROUTER_DDL)
+        conn.commit()
+
+    def stats(self):
+        rows = self._get_connection().execute('SELECT * FROM model_stats').fetchall()
+        return {row['model']: dict(row) for row in rows}
+
+    def order(self, models, claim_trials=True):
+        """The models worth trying now, best first. Empty when every circuit is open.
+
+        A half-open model is included only if this call claims its trial; with
+        claim_trials=False (for reports) it is listed without claiming anything.
+        """
+        try:
+            stats = self.stats()
+        except sqlite3.Error as e:
+            # Routing is an optimisation; without its state fall back to the configured order
+            print(f"Error reading model stats: {str(e)}")
+            return list(models)
+        now = time.time()
+        candidates = []
+        for position, model in enumerate(models):
+            row = stats.get(model)
+            if row and row['open_until'] > now:
+                print(f"Circuit open for {model} ({row['open_until'] - now:.0f}s left) - skipping")
+                continue
+            if row and row['open_until'] and claim_trials and not self._claim_trial(model, row['open_until'], now):
+                print(f"Trial request for {model} already in flight - skipping")
+                continue
+            latency = row['latency_ms'] if row else self.prior_latency_ms
+            success = row['success_rate'] if row else self.prior_success_rate
+            # Expected time until a successful answer; configured order breaks ties
+            candidates.append((latency / max(success, 0.05), position, model))
+        return [model for _, _, model in sorted(candidates)]
+
+    def _claim_trial(self, model, seen, now):
+        conn = self._get_connection()
+        try:
+            claimed = conn.execute(CLAIM_TRIAL_SQL, {'model': model, 'seen': seen, 'now': now,
+                                                     'trial_seconds': self.trial_seconds}).rowcount == 1
+            conn.commit()
+            return claimed
+        except sqlite3.Error as e:
+            # As in order(): without the router's state, don't hold the model back
+            print(f"Error claiming a trial for {model}: {str(e)}")
+            return True
+
+    def _record(self, sql, **params):
+        conn = self._get_connection()
+        try:
+            conn.execute(sql, dict(params, now=time.time(), alpha=self.alpha))
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error recording stats for {params['model']}: {str(e)}")
+
+    def record_success(self, model, latency_ms):
+        self._record(RECORD_SUCCESS_SQL, model=model, latency=latency_ms)
+
+    def record_failure(self, model, latency_ms, error=None, retry_after=None):
+        self._record(
+            RECORD_FAILURE_SQL,
+            model=model,
+            latency=latency_ms,
+            error=error,
+            retry_after=retry_after,
+            threshold=self.failure_threshold,
+            open_seconds=self.open_seconds,
+            max_open=self.max_open_seconds
+        )
@@ -0,0 +1,488 @@
+"""
+Precomputed partner recommendations for vendors.
+
+Every vendor (company_profiles, database.db) is scored against every partner
+company (company, companies.db) on
+
+    industry   industry_adjacency weight between their canonical industries (industry_taxonomy.py)
+    services   cosine similarity of TF-IDF vectors of the vendor's and company's text
+    country    1 for a partner abroad, COUNTRY_SAME for one in the vendor's country
+
+and the best MATCHES_PER_VENDOR per vendor are kept in partner_matches, which
+connections_page reads as a ranked list.
+
+Triggers queue changed rows in vendor_match_changes (database.db) and
+company_match_changes (companies.db). refresh() then rescores only those: a
+changed vendor against all companies, a changed company against all vendors,
+merged into each vendor's stored list. The TF-IDF vocabulary is fitted by
+rebuild() and stored in match_vocabulary so incremental updates score on the
+same scale; run `python partner_matches.py rebuild` now and then to refit it.
+
+scikit-learn and NumPy are imported on first use, not at import time.
+"""
+
+import argparse
+import json
+import sys
+import threading
+from db_connections import connect
+
+MATCHES_PER_VENDOR = 20
+
+# How much each signal counts towards the score (they add up to 1)
+INDUSTRY_WEIGHT = 0.5
+TEXT_WEIGHT = 0.35
+COUNTRY_WEIGHT = 0.15
+
+# Country signal for a partner in the vendor's own country, and when the partner's country is unknown
+COUNTRY_SAME = 0.25
+COUNTRY_UNKNOWN = 0.5
+
+# Shared by the fitted vectorizer and the incremental transform
+VECTORIZER_OPTIONS = {'stop_words': 'english', 'lowercase': True, 'sublinear_tf': True, 'min_df': 1}
+
+VENDOR_DDL = [
+    '''CREATE TABLE IF NOT EXISTS partner_matches (
+        vendor_id INTEGER NOT NULL,
+        company_id INTEGER NOT NULL,
+        score REAL NOT NULL,
+        industry_score REAL NOT NULL,
+        text_score REAL NOT NULL,
+        country_score REAL NOT NULL,
+        PRIMARY KEY (vendor_id, company_id)
+    ) WITHOUT ROWID''',
+    "CREATE INDEX IF NOT EXISTS ix_partner_matches_rank ON partner_matches (vendor_id, score DESC)",
+    '''CREATE TABLE IF NOT EXISTS vendor_match_changes (
+        vendor_id INTEGER PRIMARY KEY,
+        changes INTEGER NOT NULL DEFAULT 1
+    )''',
+    '''CREATE TABLE IF NOT EXISTS match_vocabulary (
+        term TEXT PRIMARY KEY,
+        idf REAL NOT NULL
+    ) WITHOUT ROWID''',
+]
+
+
+def _change_triggers(table, queue, key, id_column):
+    queue_row = (f"INSERT INTO {queue} ({key}, changes) VALUES ({{row}}.{id_column}, 1) "
+                 f"ON CONFLICT({key}) DO UPDATE SET changes = changes + 1;")
+    return [
+        f'''CREATE TRIGGER IF NOT EXISTS {queue}_ai AFTER INSERT ON {table} BEGIN
+            {queue_row.format(row='new')}
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS {queue}_au AFTER UPDATE ON {table} BEGIN
+            {queue_row.format(row='old')}
+            {queue_row.format(row='new')}
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS {queue}_ad AFTER DELETE ON {table} BEGIN
+            {queue_row.format(row='old')}
+        END''',
+    ]
+
+
+COMPANY_DDL = [
+    '''CREATE TABLE IF NOT EXISTS company_match_changes (
+        company_id INTEGER PRIMARY KEY,
+        changes INTEGER NOT NULL DEFAULT 1
+    )''',
+    *_change_triggers('company', 'company_match_changes', 'company_id', 'id'),
+]
+
+
+def install_vendor_matches(user_conn):
+    """Create the match tables and the profile change queue in database.db (idempotent). The first
+    time, every vendor is queued so the next refresh() fills partner_matches"""
+    with user_conn:
+        exists = user_conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'partner_matches'"
+        ).fetchone()
+        for statement in VENDOR_DDL:
+            user_conn.execute(statement)
+        has_profiles = user_conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'company_profiles'"
+        ).fetchone()
+        if has_profiles:
+            for statement in _change_triggers('company_profiles', 'vendor_match_changes', 'vendor_id', 'user_id'):
+                user_conn.execute(statement)
+            if not exists:
+                user_conn.execute("INSERT OR IGNORE INTO vendor_match_changes (vendor_id) SELECT user_id FROM company_profiles")
+
+
+def install_company_changes(partner_conn):
+    """Create the company change queue and its triggers in companies.db (idempotent)"""
+    with partner_conn:
+        for statement in COMPANY_DDL:
+            partner_conn.execute(statement)
+
+
+def install_matches(user_conn, partner_conn):
+    """install_vendor_matches() and install_company_changes()"""
+    install_vendor_matches(user_conn)
+    install_company_changes(partner_conn)
+
+
+def _json_text(value):
+    """The strings inside products_and_services (a JSON list of products), or the text itself"""
+    try:
+        data = json.loads(value)
+    except (TypeError, ValueError):
+        return value or ''
+    parts = []
+    def walk(item):
+        if isinstance(item, str):
+            parts.append(item)
+        elif isinstance(item, dict):
+            for key, inner in item.items():
+                if key not in ('id', 'image', 'images'):
+                    walk(inner)
+        elif isinstance(item, list):
+            for inner in item:
+                walk(inner)
+    walk(data)
+    return ' '.join(parts)
+
+
+def load_vendors(user_conn, vendor_ids=None):
+    """[{'id', 'industry_id', 'location', 'text'}] for the given vendors (all when None)"""
+    sql = '''SELECT user_id, industry_id, industry, location, product_description, about_us, products_and_services
+             FROM company_profiles'''
+    params = ()
+    if vendor_ids is not None:
+        vendor_ids = list(vendor_ids)
+        sql += f" WHERE user_id IN ({','.join('?' * len(vendor_ids))})"
+        params = vendor_ids
+    return [
+        {
+            'id': row[0],
+            'industry_id': row[1],
+            'location': (row[3] or '').lower(),
+            'text': ' '.join([row[2] or '', row[4] or '', row[5] or '', _json_text(row[6])]),
+        }
+        for row in user_conn.execute(sql, params)
+    ]
+
+
+def load_companies(partner_conn):
+    """[{'id', 'industry_id', 'country', 'text'}] for every partner company"""
+    return [
+        {
+            'id': row[0],
+            'industry_id': row[1],
+            'country': (row[2] or '').strip().lower(),
+            'text': ' '.join([row[3] or '', row[4] or '', row[5] or '']),
+        }
+        for row in partner_conn.execute("SELECT id, industry_id, country, name, industry, services FROM company")
+    ]
+
+
+def _vectorize(texts, vocabulary, idf):
+    """L2-normalised sublinear TF-IDF rows for texts, using a stored vocabulary and idf"""
+    import numpy as np
+    from scipy.sparse import csr_matrix, diags
+    from sklearn.feature_extraction.text import CountVectorizer
+    from sklearn.preprocessing import normalize
+    if not vocabulary:
+        return csr_matrix((len(texts), 0))
+    options = {key: value for key, value in VECTORIZER_OPTIONS.items() if key not in ('sublinear_tf', 'min_df')}
+    counts = CountVectorizer(vocabulary=vocabulary, **options).transform(texts).astype(np.float64)
+    counts.data = np.log(counts.data) + 1
+    return normalize(counts @ diags(idf), copy=False)
+
+
+class MatchScorer:
+    """Scores vendors against all companies with one vocabulary and adjacency table"""
+
+    def __init__(self, companies, vocabulary, idf, adjacency):
+        import numpy as np
+        self.np = np
+        self.companies = companies
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.company_ids = np.array([c['id'] for c in companies], dtype=np.int64)
+        self.company_vectors = _vectorize([c['text'] for c in companies], vocabulary, idf)
+        # Dense industry x industry weights, index 0 meaning "no industry"
+        size = max([0, *(max(pair) for pair in adjacency)]) + 1
+        self.adjacency = np.zeros((size, size))
+        for (a, b), weight in adjacency.items():
+            self.adjacency[a, b] = weight
+        self.company_industries = np.array([self._industry(c['industry_id']) for c in companies], dtype=np.int64)
+        self.countries = sorted({c['country'] for c in companies if c['country']})
+        country_index = {country: i for i, country in enumerate(self.countries)}
+        self.company_countries = np.array([country_index.get(c['country'], -1) for c in companies], dtype=np.int64)
+
+    def _industry(self, industry_id):
+        return industry_id if industry_id is not None and 0 < industry_id < len(self.adjacency) else 0
+
+    def vendor_vectors(self, vendors):
+        return _vectorize([v['text'] for v in vendors], self.vocabulary, self.idf)
+
+    def scores(self, vendors, columns=None):
+        """(score, industry, text, country) matrices: vendors x companies (or the given company indexes)"""
+        np = self.np
+        columns = np.arange(len(self.companies)) if columns is None else np.asarray(columns, dtype=np.int64)
+        text = (self.vendor_vectors(vendors) @ self.company_vectors[columns].T).toarray()
+        rows = np.array([self._industry(v['industry_id']) for v in vendors], dtype=np.int64)
+        industry = self.adjacency[rows][:, self.company_industries[columns]]
+        # Which known countries each vendor's location mentions
+        home = np.array([[country in v['location'] for country in self.countries] + [False] for v in vendors])
+        company_countries = self.company_countries[columns]
+        same = home[:, company_countries]   # -1 (unknown) picks the trailing False column
+        country = np.where(same, COUNTRY_SAME, 1.0)
+        country[:, company_countries < 0] = COUNTRY_UNKNOWN
+        score = INDUSTRY_WEIGHT * industry + TEXT_WEIGHT * text + COUNTRY_WEIGHT * country
+        # A shared country alone doesn't make a match
+        score[(industry <= 0) & (text <= 0)] = 0
+        return score, industry, text, country
+
+    def top_matches(self, vendors, limit):
+        """{vendor_id: [(company_id, score, industry, text, country)]}, best first, for each vendor"""
+        np = self.np
+        results = {}
+        if not len(self.companies):
+            return {v['id']: [] for v in vendors}
+        # Chunks keep the dense vendors x companies matrices small
+        for start in range(0, len(vendors), 256):
+            chunk = vendors[start:start + 256]
+            score, industry, text, country = self.scores(chunk)
+            for i, vendor in enumerate(chunk):
+                count = min(limit, len(self.companies))
+                best = np.argpartition(-score[i], count - 1)[:count]
+                best = best[np.lexsort((self.company_ids[best], -score[i, best]))]
+                results[vendor['id']] = [
+                    (int(self.company_ids[j]), float(score[i, j]), float(industry[i, j]),
+                     float(text[i, j]), float(country[i, j]))
+                    for j in best if score[i, j] > 0
+                ]
+        return results
+
+
+def _load_adjacency(conn):
+    return {(a, b): weight for a, b, weight in conn.execute(
+        "SELECT industry_id, adjacent_id, weight FROM industry_adjacency")}
+
+
+def _load_vocabulary(conn):
+    rows = conn.execute("SELECT term, idf FROM match_vocabulary ORDER BY term").fetchall()
+    return {term: i for i, (term, _) in enumerate(rows)}, [idf for _, idf in rows]
+
+
+def _store(conn, vendor_id, matches):
+    conn.execute("DELETE FROM partner_matches WHERE vendor_id = ?", (vendor_id,))
+    conn.executemany(
+        '''INSERT INTO partner_matches (vendor_id, company_id, score, industry_score, text_score, country_score)
+           VALUES (?, ?, ?, ?, ?, ?)''',
+        [(vendor_id, *match) for match in matches]
+    )
+
+
+def _take(conn, queue, key):
+    """Queued (id, changes) pairs; _done() removes them unless they changed again meanwhile"""
+    return conn.execute(f"SELECT {key}, changes FROM {queue}").fetchall()
+
+
+def _done(conn, queue, key, taken):
+    conn.executemany(f"DELETE FROM {queue} WHERE {key} = ? AND changes = ?", [tuple(row) for row in taken])
+
+
+def rebuild(user_conn, partner_conn, limit=MATCHES_PER_VENDOR):
+    """Refit the TF-IDF vocabulary on all vendors and companies and recompute every vendor's matches"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    vendor_queue = _take(user_conn, 'vendor_match_changes', 'vendor_id')
+    company_queue = _take(partner_conn, 'company_match_changes', 'company_id')
+    vendors = load_vendors(user_conn)
+    companies = load_companies(partner_conn)
+    texts = [c['text'] for c in companies] + [v['text'] for v in vendors]
+    vectorizer = TfidfVectorizer(**VECTORIZER_OPTIONS)
+    try:
+        vectorizer.fit(texts)
+        terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+        idf = list(vectorizer.idf_)
+    except ValueError:
+        terms, idf = [], []     # no words at all (empty tables)
+    with user_conn:
+        user_conn.execute("DELETE FROM match_vocabulary")
+        user_conn.executemany("INSERT INTO match_vocabulary (term, idf) VALUES (?, ?)", zip(terms, idf))
+        vocabulary, idf = _load_vocabulary(user_conn)
+        scorer = MatchScorer(companies, vocabulary, idf, _load_adjacency(user_conn))
+        user_conn.execute("DELETE FROM partner_matches")
+        for vendor_id, matches in scorer.top_matches(vendors, limit).items():
+            _store(user_conn, vendor_id, matches)
+        _done(user_conn, 'vendor_match_changes', 'vendor_id', vendor_queue)
+    with partner_conn:
+        _done(partner_conn, 'company_match_changes', 'company_id', company_queue)
+    return {'vendors': len(vendors), 'companies': len(companies), 'terms': len(terms)}
+
+
+def refresh(user_conn, partner_conn, limit=MATCHES_PER_VENDOR):
+    """Rescore the queued vendors and companies. Returns how many of each were processed"""
+    vendor_queue = _take(user_conn, 'vendor_match_changes', 'vendor_id')
+    company_queue = _take(partner_conn, 'company_match_changes', 'company_id')
+    if not vendor_queue and not company_queue:
+        return {'vendors': 0, 'companies': 0}
+    vocabulary, idf = _load_vocabulary(user_conn)
+    if not vocabulary:
+        stats = rebuild(user_conn, partner_conn, limit)
+        return {'vendors': stats['vendors'], 'companies': stats['companies']}
+
+    companies = load_companies(partner_conn)
+    scorer = MatchScorer(companies, vocabulary, idf, _load_adjacency(user_conn))
+    recompute = {vendor_id for vendor_id, _ in vendor_queue}
+
+    changed = {company_id for company_id, _ in company_queue}
+    if changed:
+        others = [v for v in load_vendors(user_conn) if v['id'] not in recompute]
+        columns = [i for i, c in enumerate(companies) if c['id'] in changed]
+        current = {}
+        for vendor_id, company_id, score in user_conn.execute(
+                "SELECT vendor_id, company_id, score FROM partner_matches"):
+            current.setdefault(vendor_id, {})[company_id] = score
+        updates = {}
+        if others:
+            score, industry, text, country = scorer.scores(others, columns)
+        for i, vendor in enumerate(others):
+            stored = dict(current.get(vendor['id'], {}))
+            new = {}
+            for k, column in enumerate(columns):
+                if score[i, k] > 0:
+                    new[companies[column]['id']] = (float(score[i, k]), float(industry[i, k]),
+                                                    float(text[i, k]), float(country[i, k]))
+            full = len(stored) >= limit
+            # A listed company that got worse or went away may now be below one that isn't
+            # stored, so only a full rescore can tell what takes its place
+            if full and any(c in stored and (c not in new or new[c][0] < stored[c]) for c in changed):
+                recompute.add(vendor['id'])
+                continue
+            if not new and not any(c in stored for c in changed):
+                continue
+            updates[vendor['id']] = new
+
+        with user_conn:
+            for vendor_id, new in updates.items():
+                for company_id in changed:
+                    user_conn.execute("DELETE FROM partner_matches WHERE vendor_id = ? AND company_id = ?",
+                                      (vendor_id, company_id))
+                user_conn.executemany(
+                    '''INSERT INTO partner_matches (vendor_id, company_id, score, industry_score, text_score, country_score)
+                       VALUES (?, ?, ?, ?, ?, ?)''',
+                    [(vendor_id, company_id, *values) for company_id, values in new.items()]
+                )
+                # Keep the best `limit`
+                user_conn.execute('''
+                    DELETE FROM partner_matches WHERE vendor_id = ? AND company_id NOT IN (
+                        SELECT company_id FROM partner_matches WHERE vendor_id = ?
+                        ORDER BY score DESC, company_id LIMIT ?
+                    )
+                ''', (vendor_id, vendor_id, limit))
+
+    with user_conn:
+        vendors = load_vendors(user_conn, recompute)
+        for vendor_id, matches in scorer.top_matches(vendors, limit).items():
+            _store(user_conn, vendor_id, matches)
+        # Deleted profiles
+        for vendor_id in recompute - {v['id'] for v in vendors}:
+            _store(user_conn, vendor_id, [])
+        _done(user_conn, 'vendor_match_changes', 'vendor_id', vendor_queue)
+    with partner_conn:
+        _done(partner_conn, 'company_match_changes', 'company_id', company_queue)
+    return {'vendors': len(vendor_queue), 'companies': len(company_queue)}
+
+
+def vendor_matches(conn, vendor_id, limit=None):
+    """The stored matches of a vendor, best first: [(company_id, score, industry_score, text_score, country_score)]"""
+    return conn.execute('''
+        SELECT company_id, score, industry_score, text_score, country_score
+        FROM partner_matches WHERE vendor_id = ?
+        ORDER BY score DESC, company_id
+        LIMIT ?
+    ''', (vendor_id, -1 if limit is None else limit)).fetchall()
+
+
+# One statement on a user connection with companies.db attached as `partner` (see db_connections.py):
+# the vendor's stored matches, or until the first refresh has scored them, the companies in
+# the profile's own and adjacent industries (as industry_taxonomy.related_companies)
+CONNECTIONS_SQL = '''
+    SELECT * FROM (
+        SELECT company.*, industries.name AS matched_industry, matches.industry_score AS relevance,
+               matches.score AS sort_weight, NULL AS sort_name
+        FROM partner_matches AS matches
+        JOIN partner.company AS company ON company.id = matches.company_id
+        LEFT JOIN partner.industries AS industries ON industries.id = company.industry_id
+        WHERE matches.vendor_id = :vendor
+        UNION ALL
+        SELECT company.*, industries.name, adjacency.weight, adjacency.weight, company.name
+        FROM company_profiles AS profile
+        JOIN partner.industry_adjacency AS adjacency ON adjacency.industry_id = profile.industry_id
+        JOIN partner.industries AS industries ON industries.id = adjacency.adjacent_id
+        JOIN partner.company AS company ON company.industry_id = adjacency.adjacent_id
+        WHERE profile.user_id = :vendor
+          AND NOT EXISTS (SELECT 1 FROM partner_matches WHERE vendor_id = :vendor)
+    )
+    ORDER BY sort_weight DESC, sort_name, id
+    LIMIT :limit
+'''
+
+
+def vendor_connections(conn, vendor_id, limit=None):
+    """Company rows recommended to a vendor, best first, with matched_industry and relevance
+    (the industry weight). conn must be a user connection with companies.db attached"""
+    return conn.execute(CONNECTIONS_SQL, {'vendor': vendor_id, 'limit': -1 if limit is None else limit}).fetchall()
+
+
+class MatchRefresher:
+    """Background thread that applies queued vendor/company changes to partner_matches"""
+
+    def __init__(self, poll_interval=60, connect=connect):
+        self.poll_interval = poll_interval
+        self.connect = connect
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the thread once per process, then wake it"""
+        with self._lock:
+            if not self._started and self.poll_interval > 0:
+                threading.Thread(target=self._run, name='partner-matches', daemon=True).start()
+                self._started = True
+        self._wakeup.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def _run(self):
+        user_conn = self.connect('user')
+        partner_conn = self.connect('partner')
+        try:
+            while not self._stopped.is_set():
+                try:
+                    refresh(user_conn, partner_conn)
+                except Exception as e:
+                    print(f"Error refreshing partner matches: {str(e)}")
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+        finally:
+            user_conn.close()
+            partner_conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Partner match recommendations")
+    parser.add_argument('command', choices=['rebuild', 'refresh'],
+                        help="rebuild: refit and rescore everything; refresh: apply queued changes")
+    args = parser.parse_args(argv)
+
+    user_conn = connect('user')
+    partner_conn = connect('partner')
+    try:
+        install_matches(user_conn, partner_conn)
+        stats = (rebuild if args.command == 'rebuild' else refresh)(user_conn, partner_conn)
+    finally:
+        user_conn.close()
+        partner_conn.close()
+    print(f"Scored {stats['vendors']} vendors / {stats['companies']} companies")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
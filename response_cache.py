@@ -0,0 +1,141 @@
+"""
+Response cache for /ask.
+
+Most assistant traffic repeats the same few questions, so model replies are
+cached per process and keyed on the normalized message (the retrieval
+tokenizer: lowercase, stopwords dropped, plurals folded, words sorted) plus
+the company data version. Optionally a question whose token set is close
+enough to a cached one (Jaccard similarity >= `similarity`) reuses that reply
+too, but only when the words they don't share are FILLER_WORDS: two questions
+naming a different company or city are never the same question, however long.
+
+Entries expire after `ttl` seconds, the least recently used are evicted past
+`max_entries`, and everything is dropped when the company table changes.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from company_cache import register_cache
+from company_retrieval import tokenize
+
+
+# Words (after tokenize) that can differ between two questions without changing what is asked
+FILLER_WORDS = frozenset({
+    'also', 'could', 'detail', 'get', 'hello', 'hi', 'info', 'information', 'just', 'kindly',
+    'know', 'like', 'looking', 'need', 'provide', 'share', 'should', 'some', 'thank', 'there',
+    'u', 'us', 'we', 'would',
+})
+
+
+def normalize(message):
+    """Cache key text for a message; falls back to collapsed lowercase when only stopwords remain"""
+    tokens = tokenize(message)
+    if tokens:
+        return ' '.join(sorted(tokens)), frozenset(tokens)
+    return ' '.join((message or '').lower().split()), frozenset()
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def same_question(a, b, similarity):
+    """Whether token sets a and b are close enough and differ only in FILLER_WORDS"""
+    return jaccard(a, b) >= similarity and (a ^ b) <= FILLER_WORDS
+
+
+class ResponseCache:
+    """LRU + TTL cache of model replies for one company data version at a time"""
+
+    def __init__(self, max_entries=500, ttl=3600, similarity=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity      # None or >= 1 disables near-duplicate matching
+        self._entries = OrderedDict()     # key -> entry dict
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        register_cache(self)
+
+    def _sync_version(self, version):
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def _expired(self, entry, now):
+        return now - entry['stored_at'] > self.ttl
+
+    def get(self, message, version):
+        """The cached entry for `message` at `version`, or None"""
+        if version is None:
+            return None
+        key, tokens = normalize(message)
+        now = time.time()
+        with self._lock:
+            self._sync_version(version)
+            entry = self._entries.get(key)
+            near = False
+            if entry is None and self.similarity is not None and self.similarity < 1 and tokens:
+                best = 0.0
+                for candidate_key, candidate in self._entries.items():
+                    if not same_question(tokens, candidate['tokens'], self.similarity):
+                        continue
+                    score = jaccard(tokens, candidate['tokens'])
+                    if score > best and not self._expired(candidate, now):
+                        key, entry, best = candidate_key, candidate, score
+                near = entry is not None
+            if entry is None or self._expired(entry, now):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if near:
+                self.near_hits += 1
+            else:
+                self.hits += 1
+            self.bytes_saved += entry['bytes']
+            return entry
+
+    def put(self, message, version, reply, model_used, companies_included=0, request_bytes=0):
+        """Store a reply. request_bytes is the size of the prompt a hit avoids sending"""
+        if version is None:
+            return
+        key, tokens = normalize(message)
+        with self._lock:
+            self._sync_version(version)
+            self._entries[key] = {
+                'reply': reply,
+                'model_used': model_used,
+                'companies_included': companies_included,
+                'tokens': tokens,
+                'bytes': request_bytes + len(reply.encode('utf-8')),
+                'stored_at': time.time(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'version': self._version,
+                'hits': self.hits,
+                'near_hits': self.near_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.near_hits) / lookups, 3) if lookups else None,
+                'bytes_saved': self.bytes_saved,
+            }
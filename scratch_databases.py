@@ -0,0 +1,47 @@
+"""
+Scratch copies of the app's databases for the tests.
+
+Opening the committed databases through the app switches them to WAL mode
+(configure_connection) and applies any pending migrations, which leaves the
+working tree modified. scratch_databases() points db_connections and the
+ORM engine at copies in a temporary directory instead. The copies are made
+and migrated on first use and shared by every test in the process.
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+import db_connections
+
+SCRATCH = tempfile.mkdtemp()
+atexit.register(shutil.rmtree, SCRATCH, True)
+
+
+def release_orm(app_module):
+    with app_module.app.app_context():
+        app_module.db.engine.dispose()
+
+
+@contextmanager
+def scratch_databases():
+    """Point the app (db_connections and the ORM) at SCRATCH, restoring the real paths on exit"""
+    import app as app_module
+    original = dict(db_connections.DATABASES)
+    first = not os.listdir(SCRATCH)
+    db_connections.close_connections()
+    for name, filename in original.items():
+        copy = os.path.join(SCRATCH, os.path.basename(filename))
+        if first and os.path.exists(filename):
+            shutil.copy(filename, copy)
+        db_connections.DATABASES[name] = copy
+    release_orm(app_module)
+    try:
+        if first:
+            app_module.init_databases()
+        yield
+    finally:
+        db_connections.close_connections()
+        db_connections.DATABASES.update(original)
+        release_orm(app_module)
@@ -2,35 +2,20 @@
 Seed Companies Script
 
 This script creates the companies database and populates it with sample data.
-It uses the Company model defined in app.py.
+The schema comes from the partner migrations (migrations.py), the same as
+`python app.py init-db`. The sample rows go through the bulk importer
+(import_companies.py), so running it again updates the sample companies
+instead of adding duplicates.
 
 Usage:
     python seed_companies.py
 """
 
-import os
 import sys
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 import random
-
-# Create a minimal Flask app for database operations
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///companies.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Initialize SQLAlchemy
-db = SQLAlchemy(app)
-
-# Define the Company model (same as in app.py)
-class Company(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(200))
-    address = db.Column(db.String(300))
-    phone = db.Column(db.String(50))
-    mobile = db.Column(db.String(50))
-    email = db.Column(db.String(100))
-    services = db.Column(db.String(300))
+from db_connections import DATABASES
+from import_companies import connect_for_import, import_rows, rows_from_dicts
+from migrations import migrate
 
 # Sample data for seeding the database
 sample_companies = [
@@ -200,31 +185,18 @@ sample_companies = [
 
 
 def create_db():
-    """Create the database and tables"""
-    with app.app_context():
-        # Create database tables
-        db.create_all()
-        print("Database tables created successfully.")
+    """Create the database and tables, or bring an existing one up to the current schema"""
+    migrate('partner')
+    print("Database tables created successfully.")
 
 def seed_companies():
-    """Seed the database with sample companies"""
-    with app.app_context():
-        # Check if companies already exist
-        existing_count = Company.query.count()
-        if existing_count > 0:
-            print(f"Database already contains {existing_count} companies.")
-            choice = input("Do you want to add more companies? (y/n): ").lower()
-            if choice != 'y':
-                return
-        
-        # Add sample companies
-        for company_data in sample_companies:
-            company = Company(**company_data)
-            db.session.add(company)
-        
-        # Commit changes
-        db.session.commit()
-        print(f"Added {len(sample_companies)} sample companies to the database.")
+    """Seed the database with sample companies (upserted by email)"""
+    conn = connect_for_import(DATABASES['partner'])
+    try:
+        stats = import_rows(conn, rows_from_dicts(sample_companies))
+    finally:
+        conn.close()
+    print(f"Sample companies: {stats['inserted']} added, {stats['updated']} updated.")
 
 def main():
     """Main function to create and seed the database"""
@@ -0,0 +1,22 @@
+// Slider functionality
+document.addEventListener('DOMContentLoaded', function () {
+    const slides = document.querySelectorAll('.slide');
+    let currentSlide = 0;
+
+    if (slides.length === 0) return; // Exit if no slides found
+
+    function showSlide(index) {
+        slides.forEach((slide, i) => {
+            slide.classList.toggle('active', i === index);
+        });
+    }
+
+    function nextSlide() {
+        currentSlide = (currentSlide + 1) % slides.length;
+        showSlide(currentSlide);
+    }
+
+    // Start the slider
+    showSlide(0);
+    setInterval(nextSlide, 4000); // Change every 4 seconds
+});
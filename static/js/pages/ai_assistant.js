@@ -0,0 +1,197 @@
+// Profile dropdown functionality
+function toggleProfileDropdown() {
+    const dropdown = document.getElementById('profileDropdown');
+    const profileDropdown = dropdown.parentElement;
+    profileDropdown.classList.toggle('show');
+}
+
+// Close dropdown when clicking outside
+window.addEventListener('click', function(event) {
+    const profileDropdown = document.querySelector('.profile-dropdown');
+    if (!profileDropdown.contains(event.target)) {
+        profileDropdown.classList.remove('show');
+    }
+});
+
+// AI Assistant functionality
+document.addEventListener('DOMContentLoaded', function() {
+    console.log('AI Assistant page loaded');
+
+    // Add any AI-specific functionality here
+    const chatInput = document.querySelector('.chat-input');
+    const sendButton = document.querySelector('.send-button');
+
+    if (chatInput && sendButton) {
+        chatInput.addEventListener('keypress', function(e) {
+            if (e.key === 'Enter') {
+                e.preventDefault();
+                sendMessage();
+            }
+        });
+
+        sendButton.addEventListener('click', function(e) {
+            e.preventDefault();
+            sendMessage();
+        });
+    }
+});
+
+function showErrorBubble(messagesContainer, text) {
+    const errorBubble = document.createElement('div');
+    errorBubble.className = 'message-bubble ai error';
+    errorBubble.textContent = text;
+    messagesContainer.appendChild(errorBubble);
+}
+
+// Read SSE events from /ask and append each token to the reply as it arrives
+async function renderStreamedReply(response, loadingBubble, messagesContainer) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let aiBubble = null;
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let eventName = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            const payload = data ? JSON.parse(data) : {};
+
+            if (eventName === 'meta') {
+                console.log('Streaming from model:', payload.model_used);
+            } else if (eventName === 'token') {
+                if (!aiBubble) {
+                    loadingBubble.remove();
+                    aiBubble = document.createElement('div');
+                    aiBubble.className = 'message-bubble ai';
+                    messagesContainer.appendChild(aiBubble);
+                }
+                aiBubble.textContent += payload.text;
+                messagesContainer.scrollTop = messagesContainer.scrollHeight;
+            } else if (eventName === 'error') {
+                loadingBubble.remove();
+                showErrorBubble(messagesContainer, `Error: ${payload.error}`);
+            }
+        }
+    }
+
+    if (!aiBubble) {
+        loadingBubble.remove();
+    }
+}
+
+async function sendMessage() {
+    const chatInput = document.querySelector('.chat-input');
+    const message = chatInput.value.trim();
+    const messagesContainer = document.querySelector('.chat-messages');
+
+    if (message) {
+        console.log('Sending message:', message);
+
+        // Show user message
+        const userBubble = document.createElement('div');
+        userBubble.className = 'message-bubble user';
+        userBubble.textContent = message;
+        messagesContainer.appendChild(userBubble);
+
+        // Clear input
+        chatInput.value = '';
+
+        // Show loading/thinking message
+        const loadingBubble = document.createElement('div');
+        loadingBubble.className = 'message-bubble ai thinking';
+        loadingBubble.innerHTML = 'Thinking<span class="dot-animation">...</span>';
+        messagesContainer.appendChild(loadingBubble);
+
+        // Auto-scroll to bottom
+        messagesContainer.scrollTop = messagesContainer.scrollHeight;
+
+        try {
+            console.log('Sending message to API:', message);
+
+            // Call the API, asking for a streamed (Server-Sent Events) reply
+            const response = await fetch("/ask", {
+                method: "POST",
+                headers: {
+                    "Content-Type": "application/json",
+                    "Accept": "text/event-stream"
+                },
+                body: JSON.stringify({ message: message, stream: true })
+            });
+
+            console.log('Response status:', response.status);
+            console.log('Response headers:', response.headers);
+
+            if (!response.ok) {
+                const errorText = await response.text();
+                console.error('API Error Response:', errorText);
+                throw new Error(`HTTP error! status: ${response.status}, message: ${errorText}`);
+            }
+
+            const contentType = response.headers.get('Content-Type') || '';
+            if (contentType.includes('text/event-stream') && response.body) {
+                await renderStreamedReply(response, loadingBubble, messagesContainer);
+            } else {
+                const data = await response.json();
+                console.log('API Response data:', data);
+
+                // Remove loading message
+                loadingBubble.remove();
+
+                if (data.error) {
+                    showErrorBubble(messagesContainer, `Error: ${data.error}`);
+                } else if (data.reply) {
+                    // Show AI response
+                    const aiBubble = document.createElement('div');
+                    aiBubble.className = 'message-bubble ai';
+                    aiBubble.textContent = data.reply;
+                    messagesContainer.appendChild(aiBubble);
+                } else {
+                    // Unexpected response format
+                    showErrorBubble(messagesContainer, 'Unexpected response format from server.');
+                }
+            }
+
+            // Auto-scroll to bottom
+            messagesContainer.scrollTop = messagesContainer.scrollHeight;
+
+        } catch (error) {
+            console.error('Error calling AI:', error);
+            console.error('Error details:', error.message);
+
+            // Remove loading message
+            loadingBubble.remove();
+
+            // Show detailed error message
+            const errorBubble = document.createElement('div');
+            errorBubble.className = 'message-bubble ai error';
+
+            let errorMessage = 'Sorry, I\'m having trouble connecting. ';
+            if (error.message.includes('Failed to fetch')) {
+                errorMessage += 'Please check if the server is running.';
+            } else if (error.message.includes('NetworkError')) {
+                errorMessage += 'Network error - please check your connection.';
+            } else {
+                errorMessage += `Error: ${error.message}`;
+            }
+
+            errorBubble.textContent = errorMessage;
+            messagesContainer.appendChild(errorBubble);
+
+            // Auto-scroll to bottom
+            messagesContainer.scrollTop = messagesContainer.scrollHeight;
+        }
+    }
+}
@@ -0,0 +1,21 @@
+// Profile dropdown functionality
+function toggleProfileDropdown() {
+    const dropdown = document.getElementById('profileDropdown');
+    const profileDropdown = dropdown.parentElement;
+    profileDropdown.classList.toggle('show');
+}
+
+// Close dropdown when clicking outside
+window.addEventListener('click', function (event) {
+    const profileDropdown = document.querySelector('.profile-dropdown');
+    if (!profileDropdown.contains(event.target)) {
+        profileDropdown.classList.remove('show');
+    }
+});
+
+// Connections page functionality
+document.addEventListener('DOMContentLoaded', function () {
+    console.log('Connections page loaded successfully');
+
+    // Add any connections-specific functionality here
+});
@@ -0,0 +1,224 @@
+// Initialize EmailJS
+(function () {
+    emailjs.init("YOUR_PUBLIC_KEY"); // Replace with your EmailJS public key
+})();
+
+// Profile dropdown functionality
+function toggleProfileDropdown() {
+    const dropdown = document.getElementById('profileDropdown');
+    const profileDropdown = dropdown.parentElement;
+    profileDropdown.classList.toggle('show');
+}
+
+// Close dropdown when clicking outside
+window.addEventListener('click', function (event) {
+    const profileDropdown = document.querySelector('.profile-dropdown');
+    if (!profileDropdown.contains(event.target)) {
+        profileDropdown.classList.remove('show');
+    }
+});
+
+// Form validation and submission
+document.addEventListener('DOMContentLoaded', function () {
+    const form = document.getElementById('contactForm');
+    const submitBtn = document.getElementById('submitBtn');
+    const successAlert = document.getElementById('successAlert');
+    const errorAlert = document.getElementById('errorAlert');
+
+    // Form validation
+    function validateField(field, errorElement, validationFn) {
+        const value = field.value.trim();
+        const error = validationFn(value);
+
+        if (error) {
+            field.parentElement.classList.add('error');
+            errorElement.textContent = error;
+            return false;
+        } else {
+            field.parentElement.classList.remove('error');
+            errorElement.textContent = '';
+            return true;
+        }
+    }
+
+    function validateName(value) {
+        if (!value) return 'Name is required';
+        if (value.length < 2) return 'Name must be at least 2 characters';
+        return null;
+    }
+
+    function validateCompanyName(value) {
+        if (!value) return 'Company name is required';
+        if (value.length < 2) return 'Company name must be at least 2 characters';
+        return null;
+    }
+
+    function validateEmail(value) {
+        if (!value) return 'Email is required';
+        const emailRegex = /^[^\s@]+@[^\s@]+\.[^\s@]+$/;
+        if (!emailRegex.test(value)) return 'Please enter a valid email address';
+        return null;
+    }
+
+    function validatePurpose(value) {
+        if (!value) return 'Purpose is required';
+        return null;
+    }
+
+    function validateSubject(value) {
+        if (!value) return 'Subject is required';
+        if (value.length < 10) return 'Subject must be at least 10 characters';
+        return null;
+    }
+
+    // Real-time validation
+    const nameField = document.getElementById('name');
+    const companyNameField = document.getElementById('companyName');
+    const emailField = document.getElementById('email');
+    const purposeField = document.getElementById('purpose');
+    const subjectField = document.getElementById('subject');
+
+    nameField.addEventListener('blur', () => validateField(nameField, document.getElementById('nameError'), validateName));
+    companyNameField.addEventListener('blur', () => validateField(companyNameField, document.getElementById('companyNameError'), validateCompanyName));
+    emailField.addEventListener('blur', () => validateField(emailField, document.getElementById('emailError'), validateEmail));
+    purposeField.addEventListener('change', () => validateField(purposeField, document.getElementById('purposeError'), validatePurpose));
+    subjectField.addEventListener('blur', () => validateField(subjectField, document.getElementById('subjectError'), validateSubject));
+
+    // Clear errors on input
+    [nameField, companyNameField, emailField, purposeField, subjectField].forEach(field => {
+        field.addEventListener('input', () => {
+            if (field.parentElement.classList.contains('error')) {
+                field.parentElement.classList.remove('error');
+                const errorElement = field.parentElement.querySelector('.error-message');
+                if (errorElement) errorElement.textContent = '';
+            }
+        });
+    });
+
+    // Form submission
+    document.addEventListener('DOMContentLoaded', function () {
+        const form = document.getElementById('contactForm');
+        const submitBtn = document.getElementById('submitBtn');
+        const successAlert = document.getElementById('successAlert');
+        const errorAlert = document.getElementById('errorAlert');
+
+        const nameField = document.getElementById('name');
+        const companyNameField = document.getElementById('companyName');
+        const emailField = document.getElementById('email');
+        const purposeField = document.getElementById('purpose');
+        const subjectField = document.getElementById('subject');
+
+        form.addEventListener('submit', async function (e) {
+            e.preventDefault();
+
+            successAlert.classList.add('hidden');
+            errorAlert.classList.add('hidden');
+
+            // Your validateField calls (as you already have)
+            const isNameValid = validateField(nameField, document.getElementById('nameError'), validateName);
+            const isCompanyValid = validateField(companyNameField, document.getElementById('companyNameError'), validateCompanyName);
+            const isEmailValid = validateField(emailField, document.getElementById('emailError'), validateEmail);
+            const isPurposeValid = validateField(purposeField, document.getElementById('purposeError'), validatePurpose);
+            const isSubjectValid = validateField(subjectField, document.getElementById('subjectError'), validateSubject);
+
+            if (!isNameValid || !isCompanyValid || !isEmailValid || !isPurposeValid || !isSubjectValid) {
+                return;
+            }
+
+            submitBtn.disabled = true;
+            submitBtn.innerHTML = `
+    <div class="loading-spinner"></div>
+    Sending...
+`;
+
+            try {
+                const result = await emailjs.send(
+                    'YOUR_SERVICE_ID',
+                    'YOUR_TEMPLATE_ID',
+                    {
+                        from_name: nameField.value,
+                        from_company: companyNameField.value,
+                        from_email: emailField.value,
+                        purpose: purposeField.value,
+                        subject: subjectField.value,
+                        to_email: 'your-email@example.com',
+                    }
+                );
+
+                if (result.status === 200 || result.text === "OK") {
+                    successAlert.classList.remove('hidden');
+                    errorAlert.classList.add('hidden');
+                    form.reset();
+                    successAlert.scrollIntoView({ behavior: 'smooth', block: 'center' });
+                } else {
+                    throw new Error("Email service returned error");
+                }
+
+            } catch (error) {
+                console.error('Error sending email:', error);
+                errorAlert.classList.remove('hidden');
+                successAlert.classList.add('hidden');
+                errorAlert.scrollIntoView({ behavior: 'smooth', block: 'center' });
+            } finally {
+                submitBtn.disabled = false;
+                submitBtn.innerHTML = `
+        <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+            <path d="m22 2-7 20-4-9-9-4Z"/>
+            <path d="M22 2 11 13"/>
+        </svg>
+        Send Message
+    `;
+
+                setTimeout(() => {
+                    successAlert.classList.add('hidden');
+                    errorAlert.classList.add('hidden');
+                }, 5000);
+            }
+        });
+    });
+
+document.getElementById('contactForm').addEventListener('submit', async function (e) {
+    e.preventDefault();
+
+    const formData = new FormData(this);
+    const submitBtn = document.getElementById('submitBtn');
+    const successAlert = document.getElementById('successAlert');
+    const errorAlert = document.getElementById('errorAlert');
+
+    // Hide both alerts before sending
+    successAlert.classList.add('hidden');
+    errorAlert.classList.add('hidden');
+
+    submitBtn.disabled = true;
+    submitBtn.textContent = 'Sending...';
+
+    try {
+        const response = await fetch('/submit_contact_form', {
+            method: 'POST',
+            body: formData
+        });
+
+        const contentType = response.headers.get("content-type");
+        if (!contentType || !contentType.includes("application/json")) {
+            throw new Error("Invalid response from server");
+        }
+
+        const result = await response.json();
+
+        if (response.ok && result.success) {
+            successAlert.classList.remove('hidden');
+            errorAlert.classList.add('hidden');
+            document.getElementById('contactForm').reset();
+        } else {
+            throw new Error("Server returned failure");
+        }
+
+    } catch (error) {
+        console.error("Form submission failed:", error);
+        errorAlert.classList.remove('hidden');
+        successAlert.classList.add('hidden');
+    } finally {
+        submitBtn.disabled = false;
+        submitBtn.textContent = 'Send Message';
+    }
+});
@@ -0,0 +1,92 @@
+// Profile dropdown functionality
+function toggleProfileDropdown() {
+    const dropdown = document.getElementById('profileDropdown');
+    const profileDropdown = dropdown.parentElement;
+    profileDropdown.classList.toggle('show');
+}
+
+// Close dropdown when clicking outside
+window.addEventListener('click', function (event) {
+    const profileDropdown = document.querySelector('.profile-dropdown');
+    if (!profileDropdown.contains(event.target)) {
+        profileDropdown.classList.remove('show');
+    }
+});
+
+// Leads page functionality
+document.addEventListener('DOMContentLoaded', function () {
+    console.log('Leads page loaded successfully');
+
+    const loadMore = document.getElementById('loadMoreLeads');
+    if (loadMore) {
+        loadMore.addEventListener('click', loadMoreLeads);
+    }
+});
+
+function leadParagraph(text) {
+    const p = document.createElement('p');
+    p.textContent = text;
+    return p;
+}
+
+function renderLead(company) {
+    const item = document.createElement('div');
+    item.className = 'list-item';
+
+    const left = document.createElement('div');
+    left.className = 'list-item-left';
+    const name = document.createElement('h4');
+    name.textContent = company.name;
+    const services = document.createElement('p');
+    services.innerHTML = '<strong>Services:</strong> ';
+    const servicesText = document.createElement('span');
+    if (company.snippet) {
+        servicesText.innerHTML = company.snippet;  // escaped server-side, only <mark> added
+    } else {
+        servicesText.textContent = company.services || 'Unknown services';
+    }
+    services.appendChild(servicesText);
+    const address = document.createElement('p');
+    address.innerHTML = '<strong>Address:</strong> ';
+    address.appendChild(document.createTextNode(company.address || 'No address listed'));
+    left.append(name, services, address);
+
+    const right = document.createElement('div');
+    right.className = 'list-item-right';
+    const tag = document.createElement('span');
+    tag.className = 'tag';
+    tag.textContent = company.industry || 'N/A';
+    right.append(tag, leadParagraph(company.country || 'Unknown Country'));
+
+    item.append(left, right);
+    return item;
+}
+
+// Fetch the next page of leads and append it to the list
+async function loadMoreLeads() {
+    const button = document.getElementById('loadMoreLeads');
+    const params = new URLSearchParams({
+        query: button.dataset.query,
+        after: button.dataset.after,
+        limit: button.dataset.limit
+    });
+    button.disabled = true;
+    button.textContent = 'Loading...';
+    try {
+        const response = await fetch(`${button.dataset.url}?${params}`);
+        const data = await response.json();
+        const list = document.getElementById('leadsList');
+        data.results.forEach(company => list.appendChild(renderLead(company)));
+        if (data.next_after) {
+            button.dataset.after = data.next_after;
+            button.disabled = false;
+            button.textContent = 'Load more';
+        } else {
+            button.remove();
+        }
+    } catch (error) {
+        console.error('Error loading more leads:', error);
+        button.disabled = false;
+        button.textContent = 'Load more';
+    }
+}
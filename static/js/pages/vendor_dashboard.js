@@ -0,0 +1,58 @@
+// Prevent unwanted navigation and add debugging
+document.addEventListener('DOMContentLoaded', function() {
+    console.log('Vendor Dashboard loaded successfully');
+
+    // Add click handler to AI Assistant card
+    const aiCard = document.querySelector('.ai-assistant-card');
+    if (aiCard) {
+        aiCard.addEventListener('click', function(e) {
+            console.log('AI Assistant card clicked');
+            // Only navigate if user explicitly clicks
+            window.location.href = 'ai_assistant.html';
+        });
+
+        // Add cursor pointer to show it's clickable
+        aiCard.style.cursor = 'pointer';
+    }
+
+    // Debug: Log all navigation clicks
+    const navLinks = document.querySelectorAll('.sidebar-nav a');
+    navLinks.forEach(link => {
+        link.addEventListener('click', function(e) {
+            console.log('Navigation clicked:', this.href);
+            // Allow normal navigation
+        });
+    });
+
+    // Prevent any automatic redirects
+    let originalLocation = window.location.href;
+    console.log('Current page:', originalLocation);
+
+    // Check if page is being redirected unexpectedly
+    setTimeout(() => {
+        if (window.location.href !== originalLocation) {
+            console.warn('Unexpected navigation detected from:', originalLocation, 'to:', window.location.href);
+        }
+    }, 1000);
+});
+
+// Function to manually navigate (for debugging)
+function navigateTo(page) {
+    console.log('Manual navigation to:', page);
+    window.location.href = page;
+}
+
+// Profile dropdown functionality
+function toggleProfileDropdown() {
+    const dropdown = document.getElementById('profileDropdown');
+    const profileDropdown = dropdown.parentElement;
+    profileDropdown.classList.toggle('show');
+}
+
+// Close dropdown when clicking outside
+window.addEventListener('click', function(event) {
+    const profileDropdown = document.querySelector('.profile-dropdown');
+    if (!profileDropdown.contains(event.target)) {
+        profileDropdown.classList.remove('show');
+    }
+});
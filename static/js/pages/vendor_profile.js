@@ -0,0 +1,449 @@
+let products = [];
+try {
+    products = JSON.parse(PRODUCTS_JSON);
+} catch (e) {
+    products = [];
+}
+// Now use products for rendering
+
+// Global state
+let isEditing = false;
+
+
+// Profile dropdown functionality
+function toggleProfileDropdown() {
+    const dropdown = document.getElementById('profileDropdown');
+    const profileDropdown = dropdown.parentElement;
+    profileDropdown.classList.toggle('show');
+}
+
+// Close dropdown when clicking outside
+window.addEventListener('click', function (event) {
+    const profileDropdown = document.querySelector('.profile-dropdown');
+    if (!profileDropdown.contains(event.target)) {
+        profileDropdown.classList.remove('show');
+    }
+});
+
+// Edit mode functionality
+function toggleEditMode() {
+    isEditing = !isEditing;
+    updateEditMode();
+}
+
+function updateEditMode() {
+    const editBtn = document.getElementById('editBtn');
+    const cancelBtn = document.getElementById('cancelBtn');
+    const saveBtn = document.getElementById('saveBtn');
+    const addProductBtn = document.getElementById('addProductBtn');
+    const headerLogoOverlay = document.getElementById('headerLogoOverlay');
+    const avatarOverlay = document.getElementById('avatarOverlay');
+
+    // Toggle button visibility
+    if (isEditing) {
+        editBtn.classList.add('hidden');
+        cancelBtn.classList.remove('hidden');
+        saveBtn.classList.remove('hidden');
+        addProductBtn.classList.remove('hidden');
+        headerLogoOverlay.classList.remove('hidden');
+        avatarOverlay.classList.remove('hidden');
+    } else {
+        editBtn.classList.remove('hidden');
+        cancelBtn.classList.add('hidden');
+        saveBtn.classList.add('hidden');
+        addProductBtn.classList.add('hidden');
+        headerLogoOverlay.classList.add('hidden');
+        avatarOverlay.classList.add('hidden');
+    }
+
+    // Toggle form fields
+    toggleFormFields('companyName', isEditing);
+    toggleFormFields('location', isEditing);
+    toggleFormFields('industry', isEditing);
+    toggleFormFields('aboutUs', isEditing);
+    toggleFormFields('email', isEditing);
+    toggleFormFields('phone', isEditing);
+    toggleFormFields('website', isEditing);
+
+    // Update products display
+    renderProducts();
+}
+
+function toggleFormFields(fieldName, editing) {
+    const displayElement = document.getElementById(fieldName + 'Display');
+    const editElement = document.getElementById(fieldName + 'Edit');
+
+    if (editing) {
+        displayElement.classList.add('hidden');
+        editElement.classList.remove('hidden');
+    } else {
+        displayElement.classList.remove('hidden');
+        editElement.classList.add('hidden');
+    }
+}
+
+function cancelEdit() {
+    isEditing = false;
+    // Reset form values to original
+    document.getElementById('companyNameInput').value = document.getElementById('companyName').textContent;
+    document.getElementById('locationInput').value = document.getElementById('location').textContent;
+    document.getElementById('industryInput').value = document.getElementById('industry').textContent;
+    document.getElementById('aboutUsInput').value = document.getElementById('aboutUsText').textContent;
+    document.getElementById('emailInput').value = document.getElementById('emailValue').textContent;
+    document.getElementById('phoneInput').value = document.getElementById('phoneValue').textContent;
+    document.getElementById('websiteInput').value = document.getElementById('websiteValue').textContent;
+
+    updateEditMode();
+}
+
+function saveChanges() {
+    const formData = new FormData();
+    formData.append('company_name', document.getElementById('companyNameInput').value);
+    formData.append('location', document.getElementById('locationInput').value);
+    formData.append('industry', document.getElementById('industryInput').value);
+    formData.append('about_us', document.getElementById('aboutUsInput').value);
+    formData.append('email', document.getElementById('emailInput').value);
+    formData.append('phone', document.getElementById('phoneInput').value);
+    formData.append('website', document.getElementById('websiteInput').value);
+    formData.append('products_and_services', JSON.stringify(products));
+    const logoInput = document.getElementById('avatarInput');
+    if (logoInput && logoInput.files.length > 0) {
+        formData.append('company_logo', logoInput.files[0]);
+    }
+
+    for (let i = 1; i <= 5; i++) { // Adjust range as needed const
+        imgInput = document.getElementById(`productImageInput${i}`); if (imgInput && imgInput.files.length > 0) {
+            formData.append(`product_image${i}`, imgInput.files[0]);
+        }
+    }
+
+    fetch('/update_vendor_profile', {
+        method: 'POST',
+        body: formData
+    })
+        .then(response => response.json())
+        .then(result => {
+            if (result.success) {
+                // Update display values from form inputs
+                document.getElementById('companyName').textContent = document.getElementById('companyNameInput').value;
+                document.getElementById('location').textContent = document.getElementById('locationInput').value;
+                document.getElementById('industry').textContent = document.getElementById('industryInput').value;
+                document.getElementById('aboutUsText').textContent = document.getElementById('aboutUsInput').value;
+                document.getElementById('emailValue').textContent = document.getElementById('emailInput').value;
+                document.getElementById('emailValue').href = 'mailto:' + document.getElementById('emailInput').value;
+                document.getElementById('phoneValue').textContent = document.getElementById('phoneInput').value;
+                document.getElementById('phoneValue').href = 'tel:' + document.getElementById('phoneInput').value;
+                document.getElementById('websiteValue').textContent = document.getElementById('websiteInput').value;
+                document.getElementById('websiteValue').href = 'https://' +
+                    document.getElementById('websiteInput').value.replace(/^https?:\/\//, '');
+
+                isEditing = false;
+                updateEditMode();
+                showNotification('Profile updated successfully!', 'success');
+            } else {
+                showNotification('Failed to update profile!', 'error');
+            }
+        })
+}
+
+// Image upload functionality
+function setupImageUpload(triggerId, inputId, targetId) {
+    const trigger = document.getElementById(triggerId);
+    const input = document.getElementById(inputId);
+    const target = document.getElementById(targetId);
+
+    trigger.addEventListener('click', () => {
+        if (isEditing) {
+            input.click();
+        }
+    });
+
+    input.addEventListener('change', (e) => {
+        const file = e.target.files[0];
+        if (file) {
+            const reader = new FileReader();
+            reader.onload = (e) => {
+                showPreview(target, e.target.result);
+            };
+            reader.readAsDataURL(file);
+        }
+    });
+
+    // Drag and drop functionality
+    trigger.addEventListener('dragover', (e) => {
+        if (isEditing) {
+            e.preventDefault();
+            trigger.style.opacity = '0.7';
+        }
+    });
+
+    trigger.addEventListener('dragleave', () => {
+        trigger.style.opacity = '1';
+    });
+
+    trigger.addEventListener('drop', (e) => {
+        if (isEditing) {
+            e.preventDefault();
+            trigger.style.opacity = '1';
+            const file = e.dataTransfer.files[0];
+            if (file && file.type.startsWith('image/')) {
+                const reader = new FileReader();
+                reader.onload = (e) => {
+                    showPreview(target, e.target.result);
+                };
+                reader.readAsDataURL(file);
+            }
+        }
+    });
+}
+
+// Uploaded images are served as <picture> with srcset; drop those so the preview shows
+function showPreview(img, dataUrl) {
+    if (img.parentElement && img.parentElement.tagName === 'PICTURE') {
+        img.parentElement.querySelectorAll('source').forEach(source => source.remove());
+    }
+    img.removeAttribute('srcset');
+    img.dataset.imageStatus = 'preview';
+    img.src = dataUrl;
+}
+
+// Uploads are resized in the background: poll /image_status and swap in
+// the variants once they are ready
+const PRODUCT_IMAGE_SIZES = '(max-width: 600px) 100vw, 300px';
+let upgradeTimer = null;
+
+function upgradeImages(attempt = 0) {
+    clearTimeout(upgradeTimer);
+    const images = [...document.querySelectorAll('img[data-image-status="pending"]')];
+    if (!images.length || attempt >= 30) return;
+    const query = new URLSearchParams();
+    images.forEach(img => query.append('src', img.getAttribute('src')));
+    fetch('/image_status?' + query)
+        .then(response => response.json())
+        .then(data => {
+            images.forEach(img => {
+                const info = data.images[img.getAttribute('src')];
+                if (!info) {
+                    img.dataset.imageStatus = 'unknown';  // uploaded before processing existed
+                } else if (info.status === 'ready') {
+                    applyImageVariants(img, info);
+                } else if (info.status !== 'pending') {
+                    img.dataset.imageStatus = info.status;
+                }
+            });
+            upgradeTimer = setTimeout(() => upgradeImages(attempt + 1), 2000);
+        })
+        .catch(error => console.error('Error checking image status:', error));
+}
+
+function applyImageVariants(img, info) {
+    const sizes = img.dataset.sizes || '100vw';
+    const picture = document.createElement('picture');
+    [['avif_srcset', 'image/avif'], ['webp_srcset', 'image/webp']].forEach(([key, type]) => {
+        if (info[key]) {
+            const source = document.createElement('source');
+            source.type = type;
+            source.srcset = info[key];
+            source.sizes = sizes;
+            picture.appendChild(source);
+        }
+    });
+    img.replaceWith(picture);
+    img.srcset = info.srcset;
+    img.sizes = sizes;
+    img.src = info.fallback;
+    img.dataset.imageStatus = 'ready';
+    picture.appendChild(img);
+}
+
+// Products functionality
+function renderProducts() {
+    const container = document.getElementById('productsContainer');
+    container.innerHTML = '';
+
+    products.forEach(product => {
+        const productCard = createProductCard(product);
+        container.appendChild(productCard);
+    });
+
+    if (isEditing) {
+        const addButton = createAddProductButton();
+        container.appendChild(addButton);
+    }
+    upgradeImages();
+}
+
+function createProductCard(product) {
+    const card = document.createElement('div');
+    card.className = 'product-card';
+    card.innerHTML = `
+<div class="product-image-container">
+    <img src="${product.image}" alt="${product.name}" class="product-image" id="productImage${product.id}"
+        data-image-status="${product.image && !product.image.startsWith('data:') ? 'pending' : 'preview'}"
+        data-sizes="${PRODUCT_IMAGE_SIZES}">
+    <div class="product-overlay" onclick="uploadProductImage('${product.id}')">
+        <svg width="32" height="32" fill="white" viewBox="0 0 24 24">
+            <path d="M14 2H6a2 2 0 0 0-2 2v16a2 2 0 0 0 2 2h12a2 2 0 0 0 2-2V8l-6-6z" />
+            <polyline points="14,2 14,8 20,8" />
+            <line x1="16" y1="13" x2="8" y2="13" />
+            <line x1="16" y1="17" x2="8" y2="17" />
+            <polyline points="10,9 9,9 8,9" />
+        </svg>
+    </div>
+    ${isEditing ? `
+    <div class="product-actions">
+        <button class="action-btn btn-danger" onclick="removeProduct('${product.id}')">
+            <svg width="16" height="16" fill="currentColor" viewBox="0 0 24 24">
+                <line x1="18" y1="6" x2="6" y2="18" />
+                <line x1="6" y1="6" x2="18" y2="18" />
+            </svg>
+        </button>
+    </div>
+    ` : ''}
+    <input type="file" id="productImageInput${product.id}" class="hidden" accept="image/*"
+        onchange="handleProductImageUpload('${product.id}', this)">
+</div>
+<div class="product-content">
+    ${isEditing ? `
+    <div class="form-group">
+        <label class="form-label">Product Name</label>
+        <input type="text" class="form-input" value="${product.name}"
+            onchange="updateProduct('${product.id}', 'name', this.value)">
+    </div>
+    <div class="form-group">
+        <label class="form-label">Description</label>
+        <textarea class="form-input form-textarea"
+            onchange="updateProduct('${product.id}', 'description', this.value)">${product.description}</textarea>
+    </div>
+    ` : `
+    <h4 style="font-size: 1.2em; font-weight: 600; margin-bottom: 12px; color: var(--dark-grey-text);">
+        ${product.name}</h4>
+    <p style="color: var(--medium-grey-text); line-height: 1.6;">${product.description}</p>
+    `}
+</div>
+`;
+    return card;
+}
+
+function createAddProductButton() {
+    const button = document.createElement('button');
+    button.className = 'add-product-btn';
+    button.onclick = addProduct;
+    button.innerHTML = `
+<svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none"
+    stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+    <circle cx="12" cy="12" r="10" />
+    <line x1="12" y1="8" x2="12" y2="16" />
+    <line x1="8" y1="12" x2="16" y2="12" />
+</svg>
+Add New Product
+`;
+    return button;
+}
+
+function addProduct() {
+    const newProduct = {
+        id: Date.now().toString(),
+        name: 'New Product',
+        description: 'Product description...',
+        image: 'https://images.pexels.com/photos/1108101/pexels-photo-1108101.jpeg?auto=compress&cs=tinysrgb&w=400'
+    };
+    products.push(newProduct);
+    renderProducts();
+}
+
+function removeProduct(productId) {
+    products = products.filter(p => p.id !== productId);
+    renderProducts();
+}
+
+function updateProduct(productId, field, value) {
+    const product = products.find(p => p.id === productId);
+    if (product) {
+        product[field] = value;
+    }
+}
+
+function uploadProductImage(productId) {
+    if (isEditing) {
+        document.getElementById(`productImageInput${productId}`).click();
+    }
+}
+
+function handleProductImageUpload(productId, input) {
+    const file = input.files[0];
+    if (file) {
+        const reader = new FileReader();
+        reader.onload = (e) => {
+            showPreview(document.getElementById(`productImage${productId}`), e.target.result);
+            updateProduct(productId, 'image', e.target.result);
+        };
+        reader.readAsDataURL(file);
+    }
+}
+
+// Notification system
+function showNotification(message, type = 'success') {
+    const notification = document.createElement('div');
+    notification.style.cssText = `
+position: fixed;
+top: 20px;
+right: 20px;
+background-color: ${type === 'success' ? 'var(--success-green)' : 'var(--error-red)'};
+color: white;
+padding: 16px 24px;
+border-radius: 8px;
+box-shadow: 0 4px 12px rgba(0, 0, 0, 0.15);
+z-index: 10000;
+font-weight: 500;
+animation: slideIn 0.3s ease;
+`;
+    notification.textContent = message;
+    document.body.appendChild(notification);
+
+    setTimeout(() => {
+        notification.style.animation = 'slideOut 0.3s ease';
+        setTimeout(() => {
+            document.body.removeChild(notification);
+        }, 300);
+    }, 3000);
+}
+
+// Initialize page
+document.addEventListener('DOMContentLoaded', function () {
+    // Setup image uploads
+    setupImageUpload('headerLogoContainer', 'headerLogoInput', 'headerLogo');
+    setupImageUpload('companyAvatarContainer', 'avatarInput', 'companyAvatar');
+
+    // Initial render
+    renderProducts();
+
+    console.log('Editable Vendor Profile page loaded successfully');
+});
+
+// Add CSS animations
+const style = document.createElement('style');
+style.textContent = `
+@keyframes slideIn {
+from {
+transform: translateX(100%);
+opacity: 0;
+}
+to {
+transform: translateX(0);
+opacity: 1;
+}
+}
+
+@keyframes slideOut {
+from {
+transform: translateX(0);
+opacity: 1;
+}
+to {
+transform: translateX(100%);
+opacity: 0;
+}
+}
+`;
+document.head.appendChild(style);
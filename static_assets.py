@@ -0,0 +1,245 @@
+"""
+Static asset fingerprinting, long-lived caching and precompression.
+
+url_for('static', filename='css/styles.css') returns
+/static/css/styles.3f2a9c1b0d4e.css, where the middle part is the start of
+the file's SHA-256. The static route strips the fingerprint again and, when it
+matches the file on disk, serves it with Cache-Control: public, max-age=1
+year, immutable - browsers never ask for it again, and a changed file gets a
+new URL. Plain (unfingerprinted) URLs keep Flask's no-cache + ETag, so they are
+revalidated with a cheap 304.
+
+The large templates keep their CSS and JS in static/css/pages/<page>.css and
+static/js/pages/<page>.js and include them with {{ page_styles('<page>') }} /
+{{ page_scripts('<page>') }}. The build step
+
+    python static_assets.py build [--folder static] [--templates templates]
+
+minifies those into static/dist (see asset_bundles.py), then writes a .gz
+(and, when the brotli package is installed, a .br) next to every CSS, JS and
+SVG file; the static route sends the best one the browser accepts instead of
+the original. page_styles/page_scripts use the minified bundles while they
+are up to date with the sources, and the sources otherwise.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sys
+import threading
+from flask import request, send_from_directory, url_for
+from markupsafe import Markup, escape
+
+FINGERPRINT_LENGTH = 12
+FINGERPRINT_RE = re.compile(r'^(?P<stem>.+)\.(?P<fingerprint>[0-9a-f]{%d})(?P<ext>\.[^./]+)$' % FINGERPRINT_LENGTH)
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+COMPRESSIBLE = ('.css', '.js', '.svg')
+
+# Preferred first; each is used only if the browser accepts it and the file exists and is current
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Not fingerprinted: content-addressed uploads already are (see upload_store.py)
+SKIP_PREFIXES = ('uploads/',)
+
+# Written by asset_bundles.build_bundles(), relative to the static folder
+MANIFEST = 'dist/manifest.json'
+
+PAGE_TAGS = {
+    'css': '<link rel="stylesheet" href="{}">',
+    'js': '<script src="{}"></script>',
+}
+
+
+class StaticAssets:
+    """Replaces the app's static view and adds fingerprints to url_for('static', ...)"""
+
+    def __init__(self, app=None, immutable=None):
+        self.folder = None
+        self.immutable = immutable      # optional filename -> bool for files that never change
+        self._fingerprints = {}         # filename -> (mtime_ns, size, fingerprint)
+        self._lock = threading.Lock()
+        self._manifest = (None, {})     # (mtime_ns, parsed manifest)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.folder = app.static_folder
+        app.url_defaults(self._add_fingerprint)
+        app.view_functions['static'] = self.send_static
+        app.add_template_global(self.page_styles)
+        app.add_template_global(self.page_scripts)
+
+    def fingerprint(self, filename):
+        """Content hash of a static file, or None if it doesn't exist. Recomputed only when the file changes"""
+        try:
+            stat = os.stat(os.path.join(self.folder, filename))
+        except (OSError, ValueError):
+            return None
+        cached = self._fingerprints.get(filename)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(os.path.join(self.folder, filename), 'rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                digest.update(chunk)
+        fingerprint = digest.hexdigest()[:FINGERPRINT_LENGTH]
+        with self._lock:
+            self._fingerprints[filename] = (stat.st_mtime_ns, stat.st_size, fingerprint)
+        return fingerprint
+
+    def fingerprinted(self, filename):
+        """css/styles.css -> css/styles.<fingerprint>.css (unchanged for missing or skipped files)"""
+        if filename.startswith(SKIP_PREFIXES):
+            return filename
+        fingerprint = self.fingerprint(filename)
+        if fingerprint is None:
+            return filename
+        stem, extension = os.path.splitext(filename)
+        return f"{stem}.{fingerprint}{extension}"
+
+    def _add_fingerprint(self, endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = self.fingerprinted(values['filename'])
+
+    def manifest(self):
+        """The last build's manifest ({} before the first build); re-read when a build rewrites it"""
+        path = os.path.join(self.folder, MANIFEST)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return {}
+        if self._manifest[0] != mtime:
+            with open(path, encoding='utf-8') as f:
+                self._manifest = (mtime, json.load(f))
+        return self._manifest[1]
+
+    def page_assets(self, page, kind):
+        """Static files with a page's CSS or JS (kind 'css'/'js'): the built bundles while
+        they match the source, else the source itself"""
+        source = f"{kind}/pages/{page}.{kind}"
+        built = self.manifest().get('pages', {}).get(page, {})
+        if built.get(kind) and built.get('sources', {}).get(source) == self.fingerprint(source):
+            return built[kind]
+        return [source] if self.fingerprint(source) else []
+
+    def _page_tags(self, page, kind):
+        return Markup(''.join(
+            PAGE_TAGS[kind].format(escape(url_for('static', filename=filename)))
+            for filename in self.page_assets(page, kind)
+        ))
+
+    def page_styles(self, page):
+        """<link> tags for a page's stylesheets (template global)"""
+        return self._page_tags(page, 'css')
+
+    def page_scripts(self, page):
+        """<script> tags for a page's scripts (template global)"""
+        return self._page_tags(page, 'js')
+
+    def send_static(self, filename):
+        """The static view: fingerprinted names are cached forever, plain names revalidated"""
+        immutable = False
+        match = FINGERPRINT_RE.match(filename)
+        if match:
+            original = match['stem'] + match['ext']
+            fingerprint = self.fingerprint(original)
+            if fingerprint is not None:
+                # A stale fingerprint (file changed since the page was rendered) still gets the current file
+                immutable = fingerprint == match['fingerprint']
+                filename = original
+        elif self.immutable is not None:
+            immutable = bool(self.immutable(filename))
+
+        response = self._send(filename)
+        if immutable:
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        return response
+
+    def _send(self, filename):
+        """send_from_directory (ETag + 304 handling), using a precompressed copy when possible"""
+        if not filename.endswith(COMPRESSIBLE):
+            return send_from_directory(self.folder, filename)
+        path = os.path.join(self.folder, filename)
+        mimetype = mimetypes.guess_type(filename)[0]
+        for encoding, suffix in ENCODINGS:
+            if not request.accept_encodings[encoding]:
+                continue
+            try:
+                if os.path.getmtime(path + suffix) < os.path.getmtime(path):
+                    continue    # out of date: the original was edited after the build
+            except OSError:
+                continue
+            response = send_from_directory(self.folder, filename + suffix, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+            return response
+        response = send_from_directory(self.folder, filename)
+        response.vary.add('Accept-Encoding')
+        return response
+
+    def send_from(self, subfolder, filename):
+        """send_static() for routes serving one static subfolder under their own URL (e.g. /images/)"""
+        return self.send_static(f"{subfolder}/{filename}")
+
+
+def precompress(folder, report=print):
+    """Write .gz (and .br if brotli is installed) next to every CSS/JS/SVG file. Returns bytes before/after"""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        report("brotli is not installed - writing gzip only (pip install brotli)")
+    totals = {'files': 0, 'original': 0, 'gzip': 0, 'br': 0}
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = [d for d in dirs if os.path.relpath(os.path.join(root, d), folder) + '/' not in SKIP_PREFIXES]
+        for name in files:
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            totals['files'] += 1
+            totals['original'] += len(data)
+            # mtime=0 keeps the .gz byte-identical between builds
+            outputs = {'gzip': ('.gz', gzip.compress(data, 9, mtime=0))}
+            if brotli is not None:
+                outputs['br'] = ('.br', brotli.compress(data, quality=11))
+            for encoding, (suffix, compressed) in outputs.items():
+                if len(compressed) >= len(data):
+                    # Not worth it; make sure an old copy isn't served instead
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+                    totals[encoding] += len(data)
+                    continue
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+                totals[encoding] += len(compressed)
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Static asset build steps")
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--folder', default='static', help="static folder (default: %(default)s)")
+    parser.add_argument('--templates', default='templates', help="templates folder, for the report (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    # Imported here: asset_bundles uses this module
+    from asset_bundles import build_bundles, format_report
+    print(format_report(build_bundles(args.folder, args.templates)))
+    totals = precompress(args.folder)
+    print(f"Precompressed {totals['files']} files: {totals['original']:,} bytes -> "
+          f"{totals['gzip']:,} gzip, {totals['br']:,} brotli")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
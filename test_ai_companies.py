@@ -3,13 +3,16 @@ Test script to verify AI can access company data
 """
 
 from app import app, get_company_prompt_data, create_system_prompt
+from scratch_databases import scratch_databases
 
 def test_company_access():
     """Test if AI can access company data"""
     print("Testing AI access to company database...")
     
-    # Test company data retrieval
-    companies = get_company_prompt_data()
+    # Test company data retrieval (from copies of the databases, so the committed files stay untouched)
+    with scratch_databases():
+        companies = get_company_prompt_data()
+        prompt = create_system_prompt() if companies else None
     print(f"Number of companies found: {len(companies)}")
     
     if companies:
@@ -23,7 +26,6 @@ def test_company_access():
         
         # Test system prompt
         print("Testing system prompt creation...")
-        prompt = create_system_prompt()
         print(f"System prompt length: {len(prompt)} characters")
         
         # Check if Pakistani companies are included
@@ -0,0 +1,86 @@
+"""
+Test script to verify hedged requests in ai_hedge
+"""
+
+import time
+import ai_hedge
+from ai_hedge import run_hedged
+
+def fake_model(delays, replies=None, log=None):
+    """A call() that sleeps per model (in small steps, so it can be cancelled) and then replies"""
+    replies = replies or {}
+
+    def call(model, cancel):
+        if log is not None:
+            log.append(('start', model))
+        finish = time.monotonic() + delays[model]
+        while time.monotonic() < finish:
+            if cancel.wait(0.01):
+                if log is not None:
+                    log.append(('cancelled', model))
+                return None
+        return replies.get(model, f'reply from {model}')
+    return call
+
+def test_fast_primary_needs_no_hedge():
+    """Test that a primary answering inside the hedge delay is the only call made"""
+    log = []
+    before = ai_hedge.hedge_stats()
+    result = run_hedged(['a', 'b'], fake_model({'a': 0.02, 'b': 0.02}, log=log), hedge_delay=0.5, budget=5)
+    assert result == ('a', 'reply from a')
+    assert log == [('start', 'a')]
+    after = ai_hedge.hedge_stats()
+    assert after['primary_wins'] == before['primary_wins'] + 1
+    assert after['hedged'] == before['hedged']
+
+def test_hedge_wins_and_primary_is_cancelled():
+    """Test that a slow primary is hedged, the hedge wins and the primary is told to stop"""
+    log = []
+    before = ai_hedge.hedge_stats()
+    started = time.monotonic()
+    result = run_hedged(['slow', 'fast'], fake_model({'slow': 5, 'fast': 0.05}, log=log), hedge_delay=0.1, budget=5)
+    assert result == ('fast', 'reply from fast')
+    assert time.monotonic() - started < 1
+    time.sleep(0.05)
+    assert ('cancelled', 'slow') in log
+    after = ai_hedge.hedge_stats()
+    assert after['hedge_wins'] == before['hedge_wins'] + 1
+    assert after['hedged'] == before['hedged'] + 1
+    assert after['cancelled'] == before['cancelled'] + 1
+
+def test_failure_moves_on_without_waiting():
+    """Test that a failed model is replaced immediately instead of after the hedge delay"""
+    log = []
+    call = fake_model({'broken': 0, 'ok': 0}, replies={'broken': None}, log=log)
+    started = time.monotonic()
+    assert run_hedged(['broken', 'ok'], call, hedge_delay=2, budget=5) == ('ok', 'reply from ok')
+    assert time.monotonic() - started < 1
+
+def test_budget_limits_total_time():
+    """Test that nothing waits past the budget and every attempt is cancelled"""
+    log = []
+    before = ai_hedge.hedge_stats()
+    started = time.monotonic()
+    result = run_hedged(['a', 'b', 'c'], fake_model({'a': 5, 'b': 5, 'c': 5}, log=log), hedge_delay=0.05, budget=0.3)
+    assert result == (None, None)
+    assert time.monotonic() - started < 1
+    time.sleep(0.05)
+    # Never more than two in flight, both stopped at the deadline
+    assert [event for event in log if event[0] == 'start'] == [('start', 'a'), ('start', 'b')]
+    assert sorted(model for kind, model in log if kind == 'cancelled') == ['a', 'b']
+    assert ai_hedge.hedge_stats()['budget_exhausted'] == before['budget_exhausted'] + 1
+
+def test_all_failed():
+    """Test the result when every model fails"""
+    call = fake_model({'a': 0, 'b': 0}, replies={'a': None, 'b': None})
+    assert run_hedged(['a', 'b'], call, hedge_delay=1, budget=5) == (None, None)
+
+if __name__ == "__main__":
+    print("Testing hedged requests...")
+    test_fast_primary_needs_no_hedge()
+    test_hedge_wins_and_primary_is_cancelled()
+    test_failure_moves_on_without_waiting()
+    test_budget_limits_total_time()
+    test_all_failed()
+    print(ai_hedge.hedge_stats())
+    print("All hedged request tests passed")
@@ -0,0 +1,63 @@
+"""
+Test script to verify OpenRouter calls share pooled keep-alive connections and record timings
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import ai_http
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        body = json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def test_connection_reused_and_timed():
+    """Test that the second attempt reuses the connection and every attempt is timed"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://localhost:{server.server_port}/api/v1/chat/completions'
+    ai_http.configure(pool_size=2, connect_timeout=2, read_timeout=5)
+    try:
+        timings = []
+        for model in ('first/model', 'second/model'):
+            with ai_http.attempt(model) as timing:
+                response = ai_http.post(url, json={'model': model})
+                timing['status'] = response.status_code
+            timings.append(timing)
+    finally:
+        server.shutdown()
+
+    first, second = timings
+    assert first['status'] == second['status'] == 200
+    assert first['reused_connection'] is False
+    assert {'dns_ms', 'connect_ms', 'tls_ms', 'ttfb_ms', 'total_ms'} <= set(first)
+    assert second['reused_connection'] is True and 'connect_ms' not in second
+    assert second['ttfb_ms'] <= second['total_ms']
+    assert list(ai_http.recent_attempts)[-2:] == timings
+
+def test_failed_attempt_recorded():
+    """Test that a connection failure is still recorded with its error"""
+    ai_http.configure(connect_timeout=1, read_timeout=1)
+    try:
+        with ai_http.attempt('down/model'):
+            ai_http.post('http://127.0.0.1:9/unreachable', json={})
+    except Exception:
+        pass
+    last = ai_http.recent_attempts[-1]
+    assert last['model'] == 'down/model' and last['error']
+
+if __name__ == "__main__":
+    test_connection_reused_and_timed()
+    test_failed_attempt_recorded()
+    print("✅ AI HTTP client tests passed")
@@ -0,0 +1,143 @@
+"""
+Test script to verify /ask streaming against a local mock of the OpenRouter API
+"""
+
+import json
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import app as app_module
+from scratch_databases import scratch_databases
+
+TOKENS = ["Punjab ", "Rice ", "Traders ", "exports basmati rice."]
+
+class MockOpenRouter(BaseHTTPRequestHandler):
+    """Rate-limits models starting with 'limited/', streams or returns JSON for the rest"""
+    requests_seen = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.requests_seen.append(body['model'])
+        if body['model'].startswith('limited/'):
+            self.send_response(429)
+            self.end_headers()
+            return
+        self.send_response(200)
+        if body.get('stream'):
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            self.wfile.write(b": OPENROUTER PROCESSING\n\n")
+            for token in TOKENS:
+                chunk = {"choices": [{"delta": {"content": token}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.write(b"data: [DONE]\n\n")
+        else:
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps({"choices": [{"message": {"content": ''.join(TOKENS)}}]}).encode())
+
+    def log_message(self, *args):
+        pass
+
+@contextmanager
+def mock_upstream(models):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockOpenRouter)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    original_url, original_models = app_module.OPENROUTER_URL, list(app_module.MODELS)
+    app_module.OPENROUTER_URL = f'http://127.0.0.1:{server.server_port}/api/v1/chat/completions'
+    app_module.MODELS[:] = models
+    app_module.response_cache.invalidate()
+    MockOpenRouter.requests_seen.clear()
+    try:
+        with scratch_databases():
+            yield
+    finally:
+        app_module.OPENROUTER_URL = original_url
+        app_module.MODELS[:] = original_models
+        server.shutdown()
+
+def parse_sse(text):
+    events = []
+    for raw in text.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in raw.split('\n'))
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+def test_stream_tokens_with_fallback_model():
+    """Test that a rate-limited model is skipped and tokens arrive as separate events"""
+    with mock_upstream(['limited/model', 'good/model']):
+        client = app_module.app.test_client()
+        response = client.post('/ask', json={'message': 'best markets for rice', 'stream': True})
+        assert response.mimetype == 'text/event-stream'
+        events = parse_sse(response.get_data(as_text=True))
+    assert events[0][0] == 'meta' and events[0][1]['model_used'] == 'good/model'
+    assert [data['text'] for event, data in events if event == 'token'] == TOKENS
+    assert events[-1][0] == 'done'
+
+def test_stream_falls_back_when_every_model_fails():
+    """Test the fallback reply in streaming mode"""
+    with mock_upstream(['limited/one', 'limited/two']):
+        client = app_module.app.test_client()
+        response = client.post('/ask', json={'message': 'hello'}, headers={'Accept': 'text/event-stream'})
+        events = parse_sse(response.get_data(as_text=True))
+    assert events[0][1]['model_used'] == 'fallback'
+    assert events[1][1]['text'] == app_module.FALLBACK_REPLY
+
+def test_json_mode_unchanged():
+    """Test that clients that don't ask for a stream still get JSON"""
+    with mock_upstream(['good/model']):
+        client = app_module.app.test_client()
+        data = client.post('/ask', json={'message': 'best markets for rice'}).get_json()
+    assert data['reply'] == ''.join(TOKENS) and data['model_used'] == 'good/model'
+
+def test_json_mode_with_hedging():
+    """Test that hedged mode assembles the streamed reply and skips a rate-limited model"""
+    app_module.app.config['AI_HEDGING'] = True
+    try:
+        with mock_upstream(['limited/model', 'good/model']):
+            client = app_module.app.test_client()
+            data = client.post('/ask', json={'message': 'best markets for rice'}).get_json()
+    finally:
+        app_module.app.config['AI_HEDGING'] = False
+    assert data['reply'] == ''.join(TOKENS) and data['model_used'] == 'good/model'
+
+def test_repeated_question_served_from_cache():
+    """Test that a repeat (or reworded) question is answered without calling the model"""
+    with mock_upstream(['good/model']):
+        client = app_module.app.test_client()
+        first = client.post('/ask', json={'message': 'Best markets for rice?'}).get_json()
+        again = client.post('/ask', json={'message': 'best market for RICE'}).get_json()
+        streamed = parse_sse(client.post('/ask', json={'message': 'rice markets best', 'stream': True}).get_data(as_text=True))
+        assert MockOpenRouter.requests_seen == ['good/model']
+    assert 'cached' not in first and again['cached'] is True
+    assert again['reply'] == first['reply'] and again['model_used'] == 'good/model'
+    assert streamed[0][1]['cached'] is True and streamed[1][1]['text'] == first['reply']
+
+def test_fallback_reply_not_cached():
+    """Test that the fallback text is never cached, so the next ask retries the models"""
+    with mock_upstream(['limited/only']):
+        client = app_module.app.test_client()
+        client.post('/ask', json={'message': 'textile suppliers'})
+        client.post('/ask', json={'message': 'textile suppliers'})
+        assert app_module.response_cache.stats()['entries'] == 0
+
+def test_structured_question_answered_locally():
+    """Test that "list all companies" is answered without the model, even when all models are limited"""
+    with mock_upstream(['limited/only']):
+        client = app_module.app.test_client()
+        data = client.post('/ask', json={'message': 'List all companies'}).get_json()
+        events = parse_sse(client.post('/ask', json={'message': 'list all companies', 'stream': True}).get_data(as_text=True))
+        assert MockOpenRouter.requests_seen == []
+    assert data['model_used'] == 'local' and data['intent'] == 'list_all'
+    assert len(data['reply']) <= 250 and '*' not in data['reply']
+    assert events[0][1]['model_used'] == 'local' and events[1][1]['text'] == data['reply']
+
+if __name__ == "__main__":
+    test_stream_tokens_with_fallback_model()
+    test_stream_falls_back_when_every_model_fails()
+    test_json_mode_unchanged()
+    test_json_mode_with_hedging()
+    test_repeated_question_served_from_cache()
+    test_fallback_reply_not_cached()
+    test_structured_question_answered_locally()
+    print("✅ AI streaming tests passed")
@@ -0,0 +1,88 @@
+"""
+Test script to verify the page CSS/JS build: shared bundles, the manifest and the source fallback
+"""
+
+import os
+import tempfile
+import time
+from flask import Flask, render_template_string
+from asset_bundles import ClassUsage, build_bundles, conflicts, block_rules, split_shared
+from static_assets import StaticAssets
+
+def test_conflicts_follow_the_cascade():
+    """Test that only rules which can set the same property on one element, at equal specificity, conflict"""
+    usage = ClassUsage(['<div class="card active"></div><p class="note"></p>'])
+    assert conflicts(block_rules('.card{color:red}'), block_rules('.active{color:blue}'), usage)
+    assert not conflicts(block_rules('.card{color:red}'), block_rules('.note{color:blue}'), usage)
+    assert not conflicts(block_rules('.card{color:red}'), block_rules('.card{margin:0}'), usage)
+    assert conflicts(block_rules('.card{margin:0}'), block_rules('.card{margin-top:4px}'), usage)
+    # The class wins over the universal selector in either order
+    assert not conflicts(block_rules('*{padding:0}'), block_rules('.card{padding:4px}'), usage)
+    assert conflicts(block_rules('div{padding:0}'), block_rules('@media (max-width:600px){p,div{padding:4px}}'), usage)
+
+def test_split_shared_keeps_order():
+    """Test that a shared rule is only moved where loading it first can't change the result"""
+    usage = ClassUsage(['<div class="card active"></div>'])
+    pages = {
+        'a': ['body{margin:0}', '.active{color:blue}', '.card{color:red}', '.footer{padding:0}'],
+        'b': ['body{margin:0}', '.card{color:red}', '.footer{padding:0}'],
+    }
+    shared, remaining = split_shared(pages, usage)
+    # .card followed .active on page a, so it stays there
+    assert shared == ['body{margin:0}', '.footer{padding:0}']
+    assert remaining == {'a': ['.active{color:blue}', '.card{color:red}'], 'b': ['.card{color:red}']}
+    # A later bundle can still take it from the pages that don't have the conflict
+    more, remaining = split_shared({'b': pages['b'], 'c': pages['b']}, usage, {'b': set(shared), 'c': set(shared)})
+    assert more == ['.card{color:red}'] and remaining == {'b': [], 'c': []}
+
+def make_folders():
+    folder = tempfile.mkdtemp()
+    templates = tempfile.mkdtemp()
+    for page in ('one', 'two'):
+        os.makedirs(os.path.join(folder, 'css', 'pages'), exist_ok=True)
+        os.makedirs(os.path.join(folder, 'js', 'pages'), exist_ok=True)
+        with open(os.path.join(folder, 'css', 'pages', f'{page}.css'), 'w') as f:
+            f.write(f'/* {page} */\nbody {{ margin: 0; }}\n.{page} {{ color: red; }}\n')
+        with open(os.path.join(folder, 'js', 'pages', f'{page}.js'), 'w') as f:
+            f.write(f'// {page}\nconsole.log("{page}");\n')
+        with open(os.path.join(templates, f'{page}.html'), 'w') as f:
+            f.write(f'<div class="{page}"></div>')
+    return folder, templates
+
+def test_build_and_fallback():
+    """Test that pages use the built files while they match the sources, and the sources otherwise"""
+    import asset_bundles
+    folder, templates = make_folders()
+    original = asset_bundles.SHARED_BUNDLES
+    asset_bundles.SHARED_BUNDLES = (('base', ('one', 'two')),)
+    try:
+        sizes = build_bundles(folder, templates, report=lambda line: None)
+    finally:
+        asset_bundles.SHARED_BUNDLES = original
+    assert sizes['one']['minified'] < sizes['one']['source']
+    with open(os.path.join(folder, 'dist', 'css', 'base.min.css')) as f:
+        assert f.read() == 'body{margin:0}'
+
+    app = Flask(__name__, static_folder=folder, static_url_path='/static')
+    assets = StaticAssets(app)
+    page = "{{ page_styles('one') }}{{ page_scripts('one') }}"
+    with app.test_request_context():
+        html = render_template_string(page)
+    assert html.count('<link') == 2 and '/static/dist/css/base.' in html and '/static/dist/js/pages/one.' in html
+    assert assets.page_assets('one', 'css') == ['dist/css/base.min.css', 'dist/css/pages/one.min.css']
+
+    # Editing a source switches that page back to it until the next build
+    time.sleep(0.01)
+    with open(os.path.join(folder, 'css', 'pages', 'one.css'), 'a') as f:
+        f.write('.new { color: blue; }\n')
+    assert assets.page_assets('one', 'css') == ['css/pages/one.css']
+    assert assets.page_assets('one', 'js') == ['dist/js/pages/one.min.js']
+    assert assets.page_assets('two', 'css') == ['dist/css/base.min.css', 'dist/css/pages/two.min.css']
+    assert assets.page_assets('missing', 'css') == []
+
+if __name__ == "__main__":
+    print("Testing asset bundles...")
+    test_conflicts_follow_the_cascade()
+    test_split_shared_keeps_order()
+    test_build_and_fallback()
+    print("All asset bundle tests passed")
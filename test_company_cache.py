@@ -0,0 +1,56 @@
+"""
+Test script to verify the company cache rebuilds only when the company table changes
+"""
+
+import sqlite3
+from company_cache import VersionedCache, install_change_counter, bump_company_version, SELECT_COMPANY_VERSION_SQL
+
+def make_db():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE company (id INTEGER PRIMARY KEY, name TEXT, services TEXT)')
+    install_change_counter(conn.execute)
+    install_change_counter(conn.execute)  # must be idempotent
+    return conn
+
+def test_cache_rebuilds_on_change():
+    """Test that inserts, updates and deletes all invalidate the cached value"""
+    conn = make_db()
+    version = lambda: conn.execute(SELECT_COMPANY_VERSION_SQL).fetchone()[0]
+    build = lambda: [row[0] for row in conn.execute('SELECT name FROM company ORDER BY id')]
+    cache = VersionedCache(build, version)
+
+    assert cache.get() == []
+    assert cache.get() == []
+    assert cache.builds == 1 and cache.hits == 1
+
+    conn.execute("INSERT INTO company (name) VALUES ('Karachi Textile Mills')")
+    assert cache.get() == ['Karachi Textile Mills']
+    conn.execute("UPDATE company SET name = 'Punjab Rice Traders'")
+    assert cache.get() == ['Punjab Rice Traders']
+    conn.execute("DELETE FROM company")
+    assert cache.get() == []
+    assert cache.builds == 4
+    print(f"Cache stats: {cache.stats()}")
+
+def test_explicit_invalidation():
+    """Test that seed scripts can force a rebuild without touching rows"""
+    conn = make_db()
+    version = lambda: conn.execute(SELECT_COMPANY_VERSION_SQL).fetchone()[0]
+    cache = VersionedCache(lambda: 'prompt', version)
+    cache.get()
+    bump_company_version(conn.execute)
+    cache.get()
+    assert cache.builds == 2
+
+def test_missing_version_never_caches():
+    """Test that an unreadable version disables caching instead of serving stale data"""
+    cache = VersionedCache(lambda: 'prompt', lambda: None)
+    cache.get()
+    cache.get()
+    assert cache.builds == 2
+
+if __name__ == "__main__":
+    test_cache_rebuilds_on_change()
+    test_explicit_invalidation()
+    test_missing_version_never_caches()
+    print("✅ Company cache tests passed")
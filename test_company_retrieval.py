@@ -0,0 +1,40 @@
+"""
+Test script to verify /ask only sends relevant companies to the model
+"""
+
+import json
+from company_retrieval import BM25Index, select_companies, tokenize
+
+COMPANIES = [
+    {"name": "Punjab Rice Traders", "services": ["Basmati rice", "Parboiled rice"], "industry": "Agriculture", "country": "Pakistan"},
+    {"name": "Karachi Textile Mills", "services": ["Yarn manufacturing", "Cotton exports"], "industry": "Textiles", "country": "Pakistan"},
+    {"name": "Rwanda Green Energy Ltd", "services": ["Solar panels", "Mini-grids"], "industry": "Energy", "country": "Rwanda"},
+    {"name": "Kigali Coffee Exporters", "services": ["Arabica beans", "Specialty coffee"], "industry": "Agriculture", "country": "Rwanda"},
+]
+
+def test_tokenize():
+    """Test stopword removal and plural folding"""
+    assert tokenize("Who sells Solar Panels?") == ['sell', 'solar', 'panel']
+
+def test_ranking():
+    """Test that the best match comes first"""
+    index = BM25Index(COMPANIES)
+    results = index.search("who exports rice", 2)
+    assert results[0][0]["name"] == "Punjab Rice Traders"
+    results = index.search("solar panel suppliers", 3)
+    assert [c["name"] for c, _ in results] == ["Rwanda Green Energy Ltd"]
+
+def test_selection_limits():
+    """Test top-K, the no-match fallback and the character ceiling"""
+    index = BM25Index(COMPANIES)
+    assert len(select_companies(index, "coffee from rwanda", top_k=1, max_chars=10000)) == 1
+    # Nothing matches "list all" so the first companies are used instead
+    assert len(select_companies(index, "list all", top_k=3, max_chars=10000)) == 3
+    one_record = len(json.dumps(COMPANIES[0], indent=2))
+    assert len(select_companies(index, "list all", top_k=4, max_chars=one_record)) == 1
+
+if __name__ == "__main__":
+    test_tokenize()
+    test_ranking()
+    test_selection_limits()
+    print("✅ Company retrieval tests passed")
@@ -0,0 +1,76 @@
+"""
+Test script to verify the FTS5 leads search index
+"""
+
+import sqlite3
+from company_search import install_company_fts, search_companies, count_matches, build_match_query
+
+def make_db():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('''CREATE TABLE company (id INTEGER PRIMARY KEY, name TEXT, address TEXT,
+                    services TEXT, industry TEXT, country TEXT)''')
+    conn.execute("INSERT INTO company (name, services, industry, country) VALUES ('Punjab Rice Traders', 'Basmati rice, Packaging', 'Agriculture', 'Pakistan')")
+    conn.execute("INSERT INTO company (name, services, industry, country) VALUES ('Karachi Textile Mills', 'Yarn manufacturing, <b>Cotton</b> exports', 'Textiles', 'Pakistan')")
+    conn.commit()
+    return conn
+
+def test_backfill_and_prefix_search():
+    """Test that existing rows are indexed and prefixes match"""
+    conn = make_db()
+    assert install_company_fts(conn)
+    assert install_company_fts(conn)  # second run is a no-op
+    results = search_companies(conn, ['basm'])
+    assert [r['name'] for r in results] == ['Punjab Rice Traders']
+    assert '<mark>' in results[0]['snippet']
+
+def test_triggers_keep_index_in_sync():
+    """Test inserts, updates and deletes on company"""
+    conn = make_db()
+    install_company_fts(conn)
+    conn.execute("INSERT INTO company (name, services) VALUES ('Rwanda Green Energy', 'Solar panels')")
+    assert len(search_companies(conn, ['solar'])) == 1
+    conn.execute("UPDATE company SET services = 'Wind turbines' WHERE name = 'Rwanda Green Energy'")
+    assert search_companies(conn, ['solar']) == []
+    assert len(search_companies(conn, ['wind'])) == 1
+    conn.execute("DELETE FROM company WHERE name = 'Rwanda Green Energy'")
+    assert search_companies(conn, ['wind']) == []
+
+def test_ranking_and_escaping():
+    """Test that name matches rank first and snippets are HTML-escaped"""
+    conn = make_db()
+    install_company_fts(conn)
+    results = search_companies(conn, ['textile', 'cotton'])
+    assert results[0]['name'] == 'Karachi Textile Mills'
+    assert '&lt;b&gt;' in results[0]['snippet']
+
+def test_keyset_pagination():
+    """Test that paging with after=<id> walks every match once, in rank order"""
+    conn = make_db()
+    for i in range(7):
+        conn.execute("INSERT INTO company (name, services) VALUES (?, ?)", (f'Rice Mill {i}', 'rice ' * (i % 3 + 1)))
+    install_company_fts(conn)
+    everything = [r['id'] for r in search_companies(conn, ['rice'])]
+    assert count_matches(conn, ['rice'], cap=100) == len(everything) == 8
+    assert count_matches(conn, ['rice'], cap=5) == 5
+
+    pages, after = [], None
+    while True:
+        page = search_companies(conn, ['rice'], after=after, limit=3)
+        if not page:
+            break
+        pages.extend(r['id'] for r in page)
+        after = page[-1]['id']
+    assert pages == everything
+
+def test_match_query_sanitizing():
+    """Test that FTS5 syntax in user input can't break the query"""
+    assert build_match_query(['rice', 'or', 'a"b*']) == '"rice"* OR "or"* OR "a"* OR "b"*'
+    assert build_match_query(['***']) == ''
+
+if __name__ == "__main__":
+    test_backfill_and_prefix_search()
+    test_triggers_keep_index_in_sync()
+    test_ranking_and_escaping()
+    test_keyset_pagination()
+    test_match_query_sanitizing()
+    print("✅ Company search tests passed")
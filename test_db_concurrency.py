@@ -0,0 +1,64 @@
+"""
+Load test: several processes writing to the same SQLite database at once,
+like gunicorn workers handling concurrent signups and contact submissions.
+
+Run directly for a bigger run:
+    python test_db_concurrency.py [writers] [rows_per_writer]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+import db_connections
+
+def writer(path, rows):
+    """Insert rows one transaction at a time, returning how many failed"""
+    db_connections.DATABASES['contact'] = path
+    conn = db_connections.connect('contact')
+    failures = 0
+    for i in range(rows):
+        try:
+            conn.execute('INSERT INTO contact_messages (name, company_name, email, purpose, subject) VALUES (?, ?, ?, ?, ?)',
+                         (f'writer {os.getpid()}', 'Load Test', 'load@test.com', 'test', f'row {i}'))
+            conn.commit()
+        except Exception as e:
+            print(f"Write failed: {str(e)}")
+            failures += 1
+    conn.close()
+    return failures
+
+def run_load_test(writers=4, rows=50):
+    path = os.path.join(tempfile.mkdtemp(), 'contact_messages.db')
+    db_connections.DATABASES['contact'] = path
+    conn = db_connections.connect('contact')
+    conn.execute('''CREATE TABLE contact_messages (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, company_name TEXT,
+                    email TEXT, purpose TEXT, subject TEXT)''')
+    conn.commit()
+
+    started = time.perf_counter()
+    with get_context('spawn').Pool(writers) as pool:
+        failures = sum(pool.starmap(writer, [(path, rows)] * writers))
+    elapsed = time.perf_counter() - started
+
+    written = conn.execute('SELECT COUNT(*) FROM contact_messages').fetchone()[0]
+    mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+    conn.close()
+    print(f"{writers} writers x {rows} rows in {elapsed:.2f}s ({mode}): {written} written, {failures} failed")
+    return written, failures, mode
+
+def test_concurrent_writers():
+    """Test that concurrent writers all succeed instead of hitting 'database is locked'"""
+    original = db_connections.DATABASES['contact']
+    try:
+        written, failures, mode = run_load_test()
+    finally:
+        db_connections.DATABASES['contact'] = original
+    assert mode == 'wal'
+    assert failures == 0
+    assert written == 4 * 50
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    run_load_test(*args)
@@ -0,0 +1,82 @@
+"""
+Test script to verify per-thread connection reuse for the SQLite databases
+"""
+
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+import db_connections
+
+@contextmanager
+def temp_databases():
+    """Point every database at a throwaway file for the duration of a test"""
+    original = dict(db_connections.DATABASES)
+    folder = tempfile.mkdtemp()
+    db_connections.close_connections()
+    for name in db_connections.DATABASES:
+        db_connections.DATABASES[name] = os.path.join(folder, f'{name}.db')
+    try:
+        yield
+    finally:
+        db_connections.close_connections()
+        db_connections.DATABASES.update(original)
+
+def test_reuse_within_thread():
+    """Test that a thread gets the same connection back and the counters move"""
+    with temp_databases():
+        before = db_connections.connection_stats()['user']
+        first = db_connections.get_connection('user')
+        second = db_connections.get_connection('user')
+        assert first is second
+        after = db_connections.connection_stats()['user']
+        assert after['opened'] == before['opened'] + 1
+        assert after['reused'] == before['reused'] + 1
+
+def test_separate_connection_per_thread():
+    """Test that sqlite3 connections are never shared between threads"""
+    with temp_databases():
+        seen = []
+        worker = threading.Thread(target=lambda: seen.append(db_connections.get_connection('user')))
+        worker.start()
+        worker.join()
+        assert seen[0] is not db_connections.get_connection('user')
+
+def test_release_rolls_back_and_closes_on_error():
+    """Test end-of-request cleanup"""
+    with temp_databases():
+        conn = db_connections.get_connection('contact')
+        conn.execute('CREATE TABLE t (x)')
+        conn.commit()
+        conn.execute('INSERT INTO t VALUES (1)')
+        db_connections.release_connections()
+        assert db_connections.get_connection('contact') is conn
+        assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 0
+
+        db_connections.release_connections(Exception('request failed'))
+        assert db_connections.get_connection('contact') is not conn
+
+def test_user_connection_attaches_partner_db():
+    """Test that one user-DB statement can join with companies.db tables"""
+    with temp_databases():
+        partner = db_connections.connect('partner')
+        partner.execute('CREATE TABLE company (id INTEGER PRIMARY KEY, name TEXT)')
+        partner.execute("INSERT INTO company (name) VALUES ('Karachi Textile Mills')")
+        partner.commit()
+        partner.close()
+
+        conn = db_connections.get_connection('user')
+        conn.execute('CREATE TABLE saved (company_id INTEGER)')
+        conn.execute('INSERT INTO saved VALUES (1)')
+        row = conn.execute('SELECT name FROM saved JOIN partner.company ON partner.company.id = saved.company_id').fetchone()
+        assert row['name'] == 'Karachi Textile Mills'
+        assert conn.execute('PRAGMA partner.journal_mode').fetchone()[0] == 'wal'
+        # Other databases stay on their own
+        assert [row[1] for row in db_connections.get_connection('contact').execute('PRAGMA database_list')] == ['main']
+
+if __name__ == "__main__":
+    test_reuse_within_thread()
+    test_separate_connection_per_thread()
+    test_release_rolls_back_and_closes_on_error()
+    test_user_connection_attaches_partner_db()
+    print("✅ Connection layer tests passed")
@@ -0,0 +1,127 @@
+"""
+Test script to verify background email delivery through the outbox
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+from flask import Flask
+from flask_mail import Message
+from email_queue import EmailDeliveryWorker, enqueue_email, install_outbox
+
+class FakeSMTPConnection:
+    """Stands in for flask_mail.Connection; fails the first `failures` sends"""
+
+    def __init__(self, server):
+        self.server = server
+
+    def __enter__(self):
+        self.server.connections += 1
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def send(self, message):
+        if self.server.failures > 0:
+            self.server.failures -= 1
+            raise ConnectionError("SMTP server unavailable")
+        self.server.outbox.append(message)
+
+class FakeMail:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.connections = 0
+        self.outbox = []
+
+    def connect(self):
+        return FakeSMTPConnection(self)
+
+def make_db(path=':memory:'):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute('''CREATE TABLE email_verification_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER,
+                    email TEXT, verification_token TEXT, status TEXT DEFAULT 'pending')''')
+    install_outbox(conn)
+    install_outbox(conn)  # must be idempotent
+    return conn
+
+def queue(conn, count):
+    for i in range(count):
+        log_id = conn.execute("INSERT INTO email_verification_logs (email) VALUES (?)", (f'user{i}@example.com',)).lastrowid
+        enqueue_email(conn, Message(subject='Verify', sender='noreply@example.com',
+                                    recipients=[f'user{i}@example.com'], body='hello'), log_id)
+
+def test_batch_reuses_one_smtp_connection():
+    """Test that queued messages are all sent over a single SMTP connection"""
+    conn = make_db()
+    queue(conn, 3)
+    mail = FakeMail()
+    worker = EmailDeliveryWorker(Flask(__name__), mail, threads=0)
+    assert worker.deliver_pending(conn) == 3
+    assert len(mail.outbox) == 3 and mail.connections == 1
+    statuses = [row[0] for row in conn.execute('SELECT delivery_status FROM email_verification_logs')]
+    assert statuses == ['sent'] * 3
+    assert worker.deliver_pending(conn) == 0
+
+def test_retry_then_fail():
+    """Test that failed sends are retried, and given up after max_attempts"""
+    conn = make_db()
+    queue(conn, 1)
+    # No backoff delay, so the retry is due again within the same pass
+    worker = EmailDeliveryWorker(Flask(__name__), FakeMail(failures=10), threads=0, max_attempts=2, retry_delay=0)
+    assert worker.deliver_pending(conn) == 2
+    row = conn.execute('SELECT status, attempts, last_error FROM email_outbox').fetchone()
+    assert row['status'] == 'failed' and row['attempts'] == 2 and 'unavailable' in row['last_error']
+    assert conn.execute('SELECT delivery_status FROM email_verification_logs').fetchone()[0] == 'failed'
+
+def test_retry_succeeds():
+    """Test that a message sent on its second attempt ends up 'sent'"""
+    conn = make_db()
+    queue(conn, 1)
+    mail = FakeMail(failures=1)
+    worker = EmailDeliveryWorker(Flask(__name__), mail, threads=0, retry_delay=0)
+    worker.deliver_pending(conn)
+    assert len(mail.outbox) == 1 and mail.connections == 2
+    assert conn.execute('SELECT delivery_status FROM email_verification_logs').fetchone()[0] == 'sent'
+
+def test_backoff_delays_next_attempt():
+    """Test that a retry isn't claimed again before its backoff expires"""
+    conn = make_db()
+    queue(conn, 1)
+    worker = EmailDeliveryWorker(Flask(__name__), FakeMail(failures=1), threads=0, retry_delay=60)
+    assert worker.deliver_pending(conn) == 1
+    assert worker.deliver_pending(conn) == 0
+    row = conn.execute('SELECT status, attempts FROM email_outbox').fetchone()
+    assert row['status'] == 'queued' and row['attempts'] == 1
+    assert conn.execute('SELECT delivery_status FROM email_verification_logs').fetchone()[0] == 'retrying'
+
+def test_worker_survives_database_errors():
+    """Test that a delivery thread keeps polling after a database error instead of dying"""
+    path = os.path.join(tempfile.mkdtemp(), 'user.db')
+    def connect_db(name):
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        return conn
+    mail = FakeMail()
+    worker = EmailDeliveryWorker(Flask(__name__), mail, threads=1, poll_interval=0.05, connect=connect_db)
+    worker.start()  # no outbox table yet, so every claim fails
+    time.sleep(0.2)
+    conn = make_db(path)
+    queue(conn, 1)
+    conn.commit()
+    worker.start()
+    deadline = time.monotonic() + 5
+    while not mail.outbox and time.monotonic() < deadline:
+        time.sleep(0.05)
+    worker.stop()
+    assert len(mail.outbox) == 1
+
+if __name__ == "__main__":
+    test_batch_reuses_one_smtp_connection()
+    test_retry_then_fail()
+    test_retry_succeeds()
+    test_backoff_delays_next_attempt()
+    test_worker_survives_database_errors()
+    print("✅ Email queue tests passed")
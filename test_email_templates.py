@@ -0,0 +1,47 @@
+"""
+Test script to verify the precompiled verification email templates
+"""
+
+from email_templates import verification_html, verification_text
+
+FIELDS = {
+    'user_name': 'Ayesha <Khan>',
+    'verification_url': 'http://localhost:5000/verify-email/abc',
+    'verification_token': 'abc',
+}
+
+def test_matches_full_render():
+    """Test that the skeleton render gives exactly what a full Jinja render gives"""
+    for template in (verification_html, verification_text):
+        assert template.render('en', 'Africa House Pakistan', **FIELDS) == \
+            template.render_uncached('en', 'Africa House Pakistan', **FIELDS)
+
+def test_fields_and_escaping():
+    """Test per-user substitution, HTML escaping and plain-text passthrough"""
+    html = verification_html.render('en', 'Africa House Pakistan', **FIELDS)
+    assert 'Dear Ayesha &lt;Khan&gt;,' in html
+    assert html.count('http://localhost:5000/verify-email/abc') == 2
+    text = verification_text.render('en', 'Africa House Pakistan', **FIELDS)
+    assert 'Dear Ayesha <Khan>,' in text
+
+def test_skeleton_cached_per_app_name():
+    """Test that the skeleton is compiled once per (locale, app name)"""
+    verification_html.skeleton.cache_clear()
+    verification_html.render('en', 'Africa House Pakistan', **FIELDS)
+    verification_html.render('en', 'Africa House Pakistan', **FIELDS)
+    verification_html.render('en', 'Other Portal', **FIELDS)
+    info = verification_html.skeleton.cache_info()
+    assert info.misses == 2 and info.hits == 1
+
+def test_batch_render():
+    """Test bulk rendering for resend campaigns"""
+    rows = [dict(FIELDS, user_name=f'User {i}') for i in range(3)]
+    bodies = verification_text.render_batch('en', 'Africa House Pakistan', rows)
+    assert [b.splitlines()[0] for b in bodies] == ['Dear User 0,', 'Dear User 1,', 'Dear User 2,']
+
+if __name__ == "__main__":
+    test_matches_full_render()
+    test_fields_and_escaping()
+    test_skeleton_cached_per_app_name()
+    test_batch_render()
+    print("✅ Email template tests passed")
@@ -0,0 +1,170 @@
+"""
+Test script to verify the image processing pipeline for vendor uploads
+"""
+
+import io
+import os
+import sqlite3
+import tempfile
+import pytest
+from PIL import Image
+from image_pipeline import (
+    InvalidImage,
+    ImageWorkerPool,
+    process_image,
+    image_record,
+    install_images,
+    save_image_record,
+    add_pending_image,
+    get_image_records,
+    picture_html
+)
+
+def encode(image, image_format='JPEG', **params):
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **params)
+    return buffer.getvalue()
+
+def photo(width=3000, height=2000):
+    image = Image.new('RGB', (width, height), (200, 120, 40))
+    exif = Image.Exif()
+    exif[0x010F] = 'Test Camera'   # Make
+    exif[0x0112] = 6               # Orientation: rotate 90 degrees
+    return encode(image, exif=exif.tobytes())
+
+def test_variants_and_metadata():
+    """Test thumb/medium/full variants, EXIF rotation and metadata stripping"""
+    folder = tempfile.mkdtemp()
+    data = photo()
+    result = process_image(data, folder, 'logo', formats=('webp',))
+    assert [v['name'] for v in result['variants']] == ['thumb', 'medium', 'full']
+    # Orientation 6 turns the landscape photo into portrait
+    assert (result['width'], result['height']) == (2000, 3000)
+    assert [v['height'] for v in result['variants']] == [160, 640, 1600]
+    assert result['original_bytes'] == len(data)
+    for variant in result['variants']:
+        assert set(variant['files']) == {'jpeg', 'webp'}
+        with Image.open(os.path.join(folder, variant['files']['jpeg'])) as saved:
+            assert saved.height == variant['height']
+            assert not saved.getexif()
+
+def test_small_image_not_upscaled():
+    """Test that an image smaller than a variant keeps its size and isn't stored twice"""
+    folder = tempfile.mkdtemp()
+    result = process_image(encode(Image.new('RGB', (300, 200)), 'PNG'), folder, 'small', formats=())
+    assert [(v['name'], v['width']) for v in result['variants']] == [('thumb', 160), ('full', 300)]
+    record = image_record(result, lambda name: '/static/uploads/' + name)
+    assert record['src'] == '/static/uploads/small-full.jpg'
+    assert record['srcset'] == '/static/uploads/small-thumb.jpg 160w, /static/uploads/small-full.jpg 300w'
+    assert record['webp_srcset'] is None
+
+def test_transparent_png_flattened_for_jpeg():
+    """Test that transparent areas become white in the JPEG fallback"""
+    folder = tempfile.mkdtemp()
+    result = process_image(encode(Image.new('RGBA', (100, 100), (0, 0, 0, 0)), 'PNG'), folder, 'clear')
+    variant = result['variants'][0]
+    with Image.open(os.path.join(folder, variant['files']['jpeg'])) as saved:
+        assert saved.mode == 'RGB'
+        assert saved.getpixel((50, 50)) == (255, 255, 255)
+    with Image.open(os.path.join(folder, variant['files']['webp'])) as saved:
+        assert saved.mode == 'RGBA'
+
+def test_invalid_upload_rejected():
+    """Test that non-image uploads raise InvalidImage and write nothing"""
+    folder = tempfile.mkdtemp()
+    with pytest.raises(InvalidImage):
+        process_image(b'%PDF-1.4 not an image', folder, 'doc')
+    assert os.listdir(folder) == []
+
+def test_records_and_picture_html():
+    """Test storing a record and rendering <picture> with srcset"""
+    folder = tempfile.mkdtemp()
+    result = process_image(photo(1200, 800), folder, 'prod')
+    record = image_record(result, lambda name: '/static/uploads/' + name)
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    install_images(conn)
+    save_image_record(conn, record)
+    stored = get_image_records(conn, [record['src'], '/static/uploads/old.png', None])
+    assert list(stored) == [record['src']]
+
+    html = picture_html(record['src'], stored[record['src']], alt='Rice <bag>', sizes='300px', class_='product-image')
+    assert html.startswith('<picture><source type="image/webp" srcset="/static/uploads/prod-thumb.webp 107w')
+    assert 'src="/static/uploads/prod-medium.jpg"' in html
+    assert 'alt="Rice &lt;bag&gt;"' in html
+    assert 'class="product-image"' in html and 'loading="lazy"' in html
+
+    # Images uploaded before the pipeline (or data: URLs) stay a plain <img>
+    assert picture_html('/static/uploads/old.png', None, alt='Old', id='companyAvatar') == \
+        '<img src="/static/uploads/old.png" alt="Old" id="companyAvatar">'
+
+def make_pool(processes):
+    folder = tempfile.mkdtemp()
+    database = os.path.join(folder, 'images.db')
+
+    def connect():
+        conn = sqlite3.connect(database)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    conn = connect()
+    install_images(conn)
+    return folder, conn, ImageWorkerPool(connect, ('webp',), processes=processes)
+
+def upload(conn, folder, name, data):
+    path = os.path.join(folder, name)
+    with open(path, 'wb') as f:
+        f.write(data)
+    src = '/static/uploads/' + name
+    add_pending_image(conn, src, path)
+    return src, path
+
+def test_worker_pool_processes_pending_upload():
+    """Test that an upload is pending until a worker process has written its variants"""
+    folder, conn, pool = make_pool(processes=1)
+    src, path = upload(conn, folder, 'logo-1a2b.jpg', photo(800, 600))
+    pending = get_image_records(conn, [src])[src]
+    html = picture_html(src, pending, alt='Logo', sizes='120px')
+    assert html == ('<img src="/static/uploads/logo-1a2b.jpg" alt="Logo" '
+                    'data-image-status="pending" data-sizes="120px">')
+
+    pool.submit(src, path).result()
+    pool.shutdown()     # waits for the callback that records the result
+    ready = get_image_records(conn, [src])[src]
+    assert (ready['status'], ready['fallback']) == ('ready', '/static/uploads/logo-1a2b-medium.jpg')
+    assert ready['webp_srcset'].startswith('/static/uploads/logo-1a2b-thumb.webp 120w')
+    assert os.path.exists(os.path.join(folder, 'logo-1a2b-full.webp'))
+    assert 'src="/static/uploads/logo-1a2b-medium.jpg"' in picture_html(src, ready)
+    assert pool.processed == 1
+
+def test_worker_pool_rejects_non_images():
+    """Test that a fake image is marked failed, its blob left for the upload store's garbage collection"""
+    folder, conn, pool = make_pool(processes=0)
+    src, path = upload(conn, folder, 'evil.png', b'<script>alert(1)</script>')
+    assert pool.submit(src, path) is None
+    row = get_image_records(conn, [src])[src]
+    assert row['status'] == 'failed' and row['error']
+    assert os.path.exists(path)
+    assert picture_html(src, row) == '<img src="/static/uploads/evil.png" alt="">'
+
+def test_resume_pending_after_restart():
+    """Test that uploads still pending at startup are processed, and missing files fail"""
+    folder, conn, pool = make_pool(processes=0)
+    kept, _ = upload(conn, folder, 'kept.png', encode(Image.new('RGB', (50, 50)), 'PNG'))
+    lost, lost_path = upload(conn, folder, 'lost.png', b'')
+    os.remove(lost_path)
+    assert pool.resume_pending() == 1
+    rows = get_image_records(conn, [kept, lost])
+    assert (rows[kept]['status'], rows[lost]['status']) == ('ready', 'failed')
+
+if __name__ == "__main__":
+    print("Testing image pipeline...")
+    test_variants_and_metadata()
+    test_small_image_not_upscaled()
+    test_transparent_png_flattened_for_jpeg()
+    test_invalid_upload_rejected()
+    test_records_and_picture_html()
+    test_worker_pool_processes_pending_upload()
+    test_worker_pool_rejects_non_images()
+    test_resume_pending_after_restart()
+    print("All image pipeline tests passed")
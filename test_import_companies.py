@@ -0,0 +1,167 @@
+"""
+Test script to verify the bulk company importer
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import pytest
+from company_cache import install_change_counter, SELECT_COMPANY_VERSION_SQL
+from company_search import install_company_fts, search_companies
+from import_companies import connect_for_import, import_rows, read_rows, rows_from_dicts, main
+from industry_taxonomy import install_industries
+from partner_matches import install_company_changes
+from bench_import_companies import COMPANY_DDL
+
+def make_db():
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, 'companies.db')
+    conn = connect_for_import(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute(COMPANY_DDL)
+    install_change_counter(conn.execute)
+    install_company_fts(conn)
+    return folder, path, conn
+
+def write(folder, name, text):
+    path = os.path.join(folder, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return path
+
+def companies(conn):
+    rows = conn.execute("SELECT name, address, email, services, country FROM company ORDER BY id")
+    return [tuple(row) for row in rows]
+
+def test_csv_import_dedupes_and_maps_columns():
+    """Test column aliases, duplicate rows in one file and rows without name or email"""
+    folder, _, conn = make_db()
+    source = write(folder, 'partners.csv', (
+        "Company Name,Website,Email,Services,Country,Notes\n"
+        "Punjab Rice Traders,www.punjabrice.com.pk,export@punjabrice.com.pk,Basmati rice,Pakistan,x\n"
+        "Sahara Exports,www.sahara.co.za,sales@sahara.co.za,Dried fruits,South Africa,\n"
+        ",,,,,empty row\n"
+        "Punjab Rice Traders,www.punjabrice.pk,EXPORT@punjabrice.com.pk,Basmati rice,Pakistan,dup\n"
+    ))
+    stats = import_rows(conn, read_rows(source), chunk_size=2)
+    assert (stats['read'], stats['inserted'], stats['updated'], stats['skipped']) == (4, 2, 1, 1)
+    assert companies(conn) == [
+        ('Punjab Rice Traders', 'www.punjabrice.pk', 'EXPORT@punjabrice.com.pk', 'Basmati rice', 'Pakistan'),
+        ('Sahara Exports', 'www.sahara.co.za', 'sales@sahara.co.za', 'Dried fruits', 'South Africa'),
+    ]
+
+def test_reimport_upserts_and_keeps_existing_values():
+    """Test that a re-import updates by email (or name) and blanks don't erase data"""
+    folder, _, conn = make_db()
+    first = write(folder, 'a.jsonl', '\n'.join(json.dumps(row) for row in [
+        {"name": "Nile Valley Imports", "email": "contact@nile.com", "services": ["Spices", "Herbs"], "country": "Egypt"},
+        {"name": "Kigali Coffee", "services": "Arabica beans"},
+    ]) + '\n')
+    second = write(folder, 'b.jsonl', '\n'.join(json.dumps(row) for row in [
+        {"name": "Nile Valley Imports Ltd", "email": "Contact@Nile.com", "country": ""},
+        {"name": "kigali coffee", "country": "Rwanda"},
+        {"name": "Atlas Mining", "email": "ops@atlas.ma"},
+    ]) + '\n')
+    import_rows(conn, read_rows(first))
+    stats = import_rows(conn, read_rows(second))
+    assert (stats['inserted'], stats['updated']) == (1, 2)
+    assert companies(conn) == [
+        ('Nile Valley Imports Ltd', '', 'Contact@Nile.com', 'Spices, Herbs', 'Egypt'),
+        ('kigali coffee', '', '', 'Arabica beans', 'Rwanda'),
+        ('Atlas Mining', '', 'ops@atlas.ma', '', ''),
+    ]
+
+def test_triggers_and_search_index_restored():
+    """Test that imported rows are searchable, the version moved and triggers work again"""
+    folder, _, conn = make_db()
+    version = conn.execute(SELECT_COMPANY_VERSION_SQL).fetchone()[0]
+    source = write(folder, 'p.csv', "name,services\nSerengeti Coffee,Coffee beans\n")
+    import_rows(conn, read_rows(source))
+    assert conn.execute(SELECT_COMPANY_VERSION_SQL).fetchone()[0] > version
+    assert [row['name'] for row in search_companies(conn, ['coffee'])] == ['Serengeti Coffee']
+
+    version = conn.execute(SELECT_COMPANY_VERSION_SQL).fetchone()[0]
+    conn.execute("INSERT INTO company (name, services) VALUES ('Lagos Solar', 'Solar panels')")
+    assert conn.execute(SELECT_COMPANY_VERSION_SQL).fetchone()[0] == version + 1
+    assert [row['name'] for row in search_companies(conn, ['solar'])] == ['Lagos Solar']
+
+def test_industries_and_match_queue_after_import():
+    """Test that imported rows get industry_id (fuzzy text too) and are queued once for partner matches"""
+    folder, _, conn = make_db()
+    install_industries(conn, 'company')
+    install_company_changes(conn)
+    source = write(folder, 'p.csv', (
+        "name,email,industry\n"
+        "Faisalabad Looms,looms@example.com,TEXTILES\n"
+        "Multan Cotton,cotton@example.com,Cotton Exports\n"
+    ))
+    import_rows(conn, read_rows(source))
+    import_rows(conn, read_rows(source))
+    industries = conn.execute(
+        "SELECT company.name, industries.name FROM company JOIN industries ON industries.id = company.industry_id ORDER BY company.id"
+    ).fetchall()
+    assert [tuple(row) for row in industries] == [('Faisalabad Looms', 'Textiles & Apparel'), ('Multan Cotton', 'Textiles & Apparel')]
+    # One queue entry per import, not one per trigger firing
+    assert [tuple(row) for row in conn.execute("SELECT company_id, changes FROM company_match_changes ORDER BY company_id")] == [(1, 2), (2, 2)]
+
+    conn.execute("INSERT INTO company (name, industry) VALUES ('Lagos Leather', 'Leather')")
+    row = conn.execute("SELECT id, industry_id FROM company WHERE name = 'Lagos Leather'").fetchone()
+    assert row['industry_id'] is not None
+    assert conn.execute("SELECT 1 FROM company_match_changes WHERE company_id = ?", (row['id'],)).fetchone()
+
+def test_failed_import_raises_and_restores_triggers():
+    """Test that an error partway through surfaces as is, with the triggers back and earlier batches indexed,
+    on a connection in sqlite3's default isolation level too"""
+    folder, path, conn = make_db()
+    conn.close()
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    install_industries(conn, 'company')
+    install_company_changes(conn)
+    triggers = "SELECT name FROM sqlite_master WHERE type = 'trigger' ORDER BY name"
+    before = [row[0] for row in conn.execute(triggers)]
+
+    def rows():
+        yield from rows_from_dicts([{"name": "Serengeti Coffee", "email": "beans@example.com", "industry": "Coffee"},
+                                    {"name": "Accra Cocoa", "email": "cocoa@example.com"}])
+        raise ValueError("unreadable row")
+
+    with pytest.raises(ValueError, match="unreadable row"):
+        import_rows(conn, rows(), chunk_size=1, batch_size=1, report=lambda message: None)
+    assert not conn.in_transaction
+    assert [row[0] for row in conn.execute(triggers)] == before
+    assert [row['name'] for row in search_companies(conn, ['coffee'])] == ['Serengeti Coffee']
+    assert conn.execute("SELECT count(*) FROM company_match_changes").fetchone()[0] == 2
+
+def test_xlsx_import():
+    """Test reading the first sheet of an .xlsx workbook"""
+    openpyxl = pytest.importorskip('openpyxl')
+    folder, path, conn = make_db()
+    workbook = openpyxl.Workbook()
+    workbook.active.append(['Name', 'Email', 'Phone'])
+    workbook.active.append(['Sialkot Sports Gear', 'sales@sialkot.com', 924267890])
+    source = os.path.join(folder, 'partners.xlsx')
+    workbook.save(source)
+    conn.close()
+    main([source, '--db', path])
+    conn = connect_for_import(path)
+    assert conn.execute("SELECT name, email, phone FROM company").fetchall() == [
+        ('Sialkot Sports Gear', 'sales@sialkot.com', '924267890')
+    ]
+
+def test_unsupported_file_type():
+    """Test that other extensions are rejected"""
+    with pytest.raises(SystemExit):
+        read_rows('partners.txt')
+
+if __name__ == "__main__":
+    print("Testing bulk company import...")
+    test_csv_import_dedupes_and_maps_columns()
+    test_reimport_upserts_and_keeps_existing_values()
+    test_triggers_and_search_index_restored()
+    test_industries_and_match_queue_after_import()
+    test_failed_import_raises_and_restores_triggers()
+    test_xlsx_import()
+    test_unsupported_file_type()
+    print("All import tests passed")
@@ -0,0 +1,96 @@
+"""
+Test script to verify the industry taxonomy, alias matching and adjacent-industry lookups
+"""
+
+import sqlite3
+from industry_taxonomy import (
+    install_industries,
+    resolve_industry,
+    related_companies,
+    normalize
+)
+
+def make_db():
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.execute('CREATE TABLE company (id INTEGER PRIMARY KEY, name TEXT, industry TEXT, country TEXT)')
+    conn.executemany("INSERT INTO company (name, industry) VALUES (?, ?)", [
+        ('Karachi Textile Mills', 'Textile & Apparel'),
+        ('Lahore Garments', ' garments '),
+        ('Sialkot Leather Works', 'Leather goods'),
+        ('Punjab Rice Traders', 'Agriculture'),
+        ('Kigali Fintech', 'Banking'),
+        ('Unknown Co', 'Underwater basket weaving'),
+    ])
+    conn.commit()
+    return conn
+
+def industry_of(conn, name):
+    return conn.execute(
+        "SELECT industries.name FROM company JOIN industries ON industries.id = company.industry_id WHERE company.name = ?",
+        (name,)
+    ).fetchone()
+
+def test_backfill_and_aliases():
+    """Test that existing rows get canonical ids from aliases, spellings and plurals"""
+    conn = make_db()
+    assert install_industries(conn, 'company')
+    assert install_industries(conn, 'company')  # second run changes nothing
+    assert industry_of(conn, 'Karachi Textile Mills')[0] == 'Textiles & Apparel'
+    assert industry_of(conn, 'Lahore Garments')[0] == 'Textiles & Apparel'
+    assert industry_of(conn, 'Sialkot Leather Works')[0] == 'Leather'
+    assert industry_of(conn, 'Kigali Fintech')[0] == 'Finance'
+    assert industry_of(conn, 'Unknown Co') is None
+    assert normalize('Textiles & Apparel') == normalize('textile and apparels') == ('textile', 'apparel')
+
+def test_triggers_and_learned_aliases():
+    """Test inserts and updates, and that a fuzzy match is remembered for the trigger"""
+    conn = make_db()
+    install_industries(conn, 'company')
+    conn.execute("INSERT INTO company (name, industry) VALUES ('Faisalabad Looms', 'TEXTILES')")
+    assert industry_of(conn, 'Faisalabad Looms')[0] == 'Textiles & Apparel'
+    conn.execute("UPDATE company SET industry = 'Pharma' WHERE name = 'Faisalabad Looms'")
+    assert industry_of(conn, 'Faisalabad Looms')[0] == 'Pharmaceuticals'
+
+    assert resolve_industry(conn, 'Cotton exports') == resolve_industry(conn, 'textile')
+    conn.execute("INSERT INTO company (name, industry) VALUES ('Multan Cotton', 'cotton exports')")
+    assert industry_of(conn, 'Multan Cotton')[0] == 'Textiles & Apparel'
+    assert resolve_industry(conn, '') is None and resolve_industry(conn, 'zzz') is None
+
+def test_weak_matches_rejected_and_not_learned():
+    """Test that one shared word doesn't decide the industry, and that a rejected text isn't saved as an alias"""
+    conn = make_db()
+    install_industries(conn, 'company')
+    for text in ('Oil Painting', 'Power tools', 'Mobile accessories', 'Textile machinery'):
+        assert resolve_industry(conn, text) is None, text
+        assert not conn.execute("SELECT 1 FROM industry_aliases WHERE alias = ?", (text.lower(),)).fetchone()
+    assert resolve_industry(conn, 'Oil and gas exploration') == resolve_industry(conn, 'energy')
+    assert resolve_industry(conn, 'Leather goods exporters') == resolve_industry(conn, 'leather')
+
+def test_related_companies_ranked():
+    """Test that the vendor's own industry comes first, then adjacent ones"""
+    conn = make_db()
+    install_industries(conn, 'company')
+    results = related_companies(conn, resolve_industry(conn, 'Textiles'))
+    names = [row['name'] for row in results]
+    assert names[:2] == ['Karachi Textile Mills', 'Lahore Garments']
+    assert set(names[2:]) == {'Sialkot Leather Works', 'Punjab Rice Traders'}
+    assert results[0]['relevance'] == 1 and results[2]['relevance'] < 1
+    assert 'Kigali Fintech' not in names
+    assert len(related_companies(conn, resolve_industry(conn, 'Textiles'), limit=1)) == 1
+    assert related_companies(conn, None) == []
+
+def test_missing_table():
+    """Test that a database without the table only gets the taxonomy"""
+    conn = sqlite3.connect(':memory:')
+    assert install_industries(conn, 'company_profiles') is False
+    assert conn.execute("SELECT COUNT(*) FROM industries").fetchone()[0] > 0
+
+if __name__ == "__main__":
+    print("Testing industry taxonomy...")
+    test_backfill_and_aliases()
+    test_triggers_and_learned_aliases()
+    test_weak_matches_rejected_and_not_learned()
+    test_related_companies_ranked()
+    test_missing_table()
+    print("All industry taxonomy tests passed")
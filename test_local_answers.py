@@ -0,0 +1,72 @@
+"""
+Test script to verify local answers for structured /ask questions
+"""
+
+from local_answers import LocalAnswerer, fit_reply, MAX_REPLY_CHARS
+
+COMPANIES = [
+    {"name": "Karachi Textile Mills", "website": "www.karachitextile.com",
+     "services": ["Yarn manufacturing", "Fabric processing", "Cotton exports"],
+     "contact": "info@karachitextile.com | +92 21 34567890 | +92 300 1234567", "industry": "Textiles", "country": "Pakistan"},
+    {"name": "Punjab Rice Traders", "website": "www.punjabrice.com.pk",
+     "services": ["Basmati rice", "Parboiled rice", "Global exports"],
+     "contact": "export@punjabrice.com.pk | +92 42 37373737 | ", "industry": "Agriculture", "country": "Pakistan"},
+    {"name": "Rwanda Green Energy Ltd", "website": "www.rwandagreen.rw",
+     "services": ["Solar panels", "Wind turbines", "Energy consulting"],
+     "contact": "hello@rwandagreen.rw |  | +250 788 123 456", "industry": "Energy", "country": "Rwanda"},
+    {"name": "Punjab Rice Traders", "website": "www.punjabrice.com.pk",
+     "services": ["Basmati rice"], "contact": "", "industry": "", "country": ""},
+]
+
+answerer = LocalAnswerer(COMPANIES)
+
+def test_list_all():
+    """Test the list intent, with duplicate rows listed once"""
+    for question in ["list all companies", "Show me your partner companies", "What companies do you have?"]:
+        result = answerer.answer(question)
+        assert result['intent'] == 'list_all', question
+    assert result['reply'].startswith("Our 3 partner companies:")
+    assert "• Punjab Rice Traders - Basmati rice" in result['reply']
+    assert result['reply'].count("Punjab Rice Traders") == 1
+
+def test_offers():
+    """Test the offers intent and that unmatched topics go to the model"""
+    result = answerer.answer("Who offers solar panels?")
+    assert result['intent'] == 'offers'
+    assert result['reply'] == "Partners offering solar panels:\n• Rwanda Green Energy Ltd - Solar panels"
+    assert answerer.answer("suppliers of basmati rice")['companies_included'] == 1
+    assert answerer.answer("who offers photovoltaic modules") is None
+
+def test_contact():
+    """Test contact details, ignoring "Ltd" and falling back to the mobile number"""
+    result = answerer.answer("contact details for Karachi Textile Mills")
+    assert result['intent'] == 'contact'
+    assert "• Email: info@karachitextile.com" in result['reply']
+    assert "• Phone: +92 21 34567890" in result['reply']
+    result = answerer.answer("What is the phone number of Rwanda Green Energy?")
+    assert "• Phone: +250 788 123 456" in result['reply']
+    # No single company named
+    assert answerer.answer("what is your email address") is None
+
+def test_unclassified_falls_through():
+    """Test that open questions are left to the model"""
+    for question in ["best markets for rice", "how do I export to Kenya?", "who are you"]:
+        assert answerer.answer(question) is None, question
+
+def test_formatting_rules():
+    """Test the prompt's rules: bullets, 250 characters, no '*'"""
+    lines = [f"• Company number {i} *special*" for i in range(40)]
+    reply = fit_reply("Header:", lines)
+    assert len(reply) <= MAX_REPLY_CHARS
+    assert '*' not in reply
+    assert reply.splitlines()[-1].startswith("• and ") and reply.splitlines()[-1].endswith(" more")
+    assert all(line.startswith('•') for line in reply.splitlines()[1:])
+
+if __name__ == "__main__":
+    print("Testing local answers...")
+    test_list_all()
+    test_offers()
+    test_contact()
+    test_unclassified_falls_through()
+    test_formatting_rules()
+    print("All local answer tests passed")
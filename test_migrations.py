@@ -0,0 +1,96 @@
+"""
+Test script to verify the schema migration runner and the route query plan check
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+import db_connections
+from migrations import MIGRATIONS, RouteQuery, check_query_plans, full_scans, migrate, pending_migrations
+from db_connections import connect
+
+@contextmanager
+def copied_databases():
+    """Point every database at a scratch copy of the committed file, so migrating leaves the tree clean"""
+    original = dict(db_connections.DATABASES)
+    folder = tempfile.mkdtemp()
+    db_connections.close_connections()
+    for name, filename in original.items():
+        copy = os.path.join(folder, os.path.basename(filename))
+        if os.path.exists(filename):
+            shutil.copy(filename, copy)
+        db_connections.DATABASES[name] = copy
+    try:
+        yield
+    finally:
+        db_connections.close_connections()
+        db_connections.DATABASES.update(original)
+        shutil.rmtree(folder, ignore_errors=True)
+
+def memory_db():
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def tables(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'index')")}
+
+def test_fresh_database_then_noop():
+    """Test that a new database gets every migration once and a second run does nothing"""
+    for name in MIGRATIONS:
+        conn = memory_db()
+        applied = migrate(name, conn, report=lambda message: None)
+        assert applied == [version for version, _, _ in MIGRATIONS[name]]
+        assert migrate(name, conn, report=lambda message: None) == []
+        assert pending_migrations(conn, name) == []
+    conn = memory_db()
+    migrate('user', conn, report=lambda message: None)
+    assert {'users', 'company_profiles', 'email_outbox', 'partner_matches', 'ix_company_profiles_user_id',
+            'ix_email_verification_logs_email_status'} <= tables(conn)
+
+def test_legacy_database_upgraded():
+    """Test that a database created before the runner keeps its rows and gains the missing columns"""
+    conn = memory_db()
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, email TEXT UNIQUE, password TEXT)")
+    conn.execute("INSERT INTO users (email, password) VALUES ('old@example.com', 'x')")
+    conn.commit()
+    migrate('user', conn, report=lambda message: None)
+    user = conn.execute("SELECT * FROM users WHERE email = 'old@example.com'").fetchone()
+    assert user['created_at'] is not None and not user['email_verified']
+    versions = [row[0] for row in conn.execute("SELECT version FROM schema_migrations ORDER BY version")]
+    assert versions == [version for version, _, _ in MIGRATIONS['user']]
+
+def test_route_queries_use_indexes():
+    """Test that no route query scans a whole table once the databases are migrated"""
+    with copied_databases():
+        for name in MIGRATIONS:
+            migrate(name, report=lambda message: None)
+        assert check_query_plans() == []
+
+def test_full_scan_detected():
+    """Test that the plan check reports a lookup on an unindexed column, but not a bounded one"""
+    conn = memory_db()
+    migrate('user', conn, report=lambda message: None)
+    conn.execute("DROP INDEX ix_company_profiles_user_id")
+    assert full_scans(conn, "SELECT id FROM company_profiles WHERE user_id = ?", (1,)) == ['SCAN company_profiles']
+
+    unindexed = "SELECT id FROM users WHERE full_name = ?"
+    with copied_databases():
+        failures = check_query_plans([RouteQuery('user', 'test', unindexed, ('x',)),
+                                      RouteQuery('user', 'test', unindexed + " LIMIT 1", ('x',), bounded=True)])
+        assert [route for route, _, _ in failures] == ['test']
+        copy = connect('user')
+        try:
+            assert full_scans(copy, "SELECT * FROM users WHERE email = ?", ('a@example.com',)) == []
+        finally:
+            copy.close()
+
+if __name__ == "__main__":
+    print("Testing schema migrations...")
+    test_fresh_database_then_noop()
+    test_legacy_database_upgraded()
+    test_route_queries_use_indexes()
+    test_full_scan_detected()
+    print("All migration tests passed")
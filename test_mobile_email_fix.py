@@ -5,12 +5,13 @@ Test script to verify mobile email verification fixes
 from app import app
 from email_utils import send_verification_email
 from flask_mail import Mail
+from scratch_databases import scratch_databases
 
 def test_dynamic_url_generation():
     """Test dynamic URL generation based on request context"""
     print("Testing dynamic URL generation...")
     
-    with app.test_client() as client:
+    with scratch_databases(), app.test_client() as client:
         with app.app_context():
             # Simulate a request from different hosts
             test_cases = [
@@ -41,7 +42,7 @@ def test_manual_verification_route():
     """Test manual verification route"""
     print("Testing manual verification route...")
     
-    with app.test_client() as client:
+    with scratch_databases(), app.test_client() as client:
         # Test GET request
         response = client.get('/manual-verification')
         print(f"GET /manual-verification: {response.status_code}")
@@ -0,0 +1,103 @@
+"""
+Test script to verify model ordering and circuit breaking in model_router
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+from model_router import ModelRouter, parse_retry_after
+
+def make_router(**kwargs):
+    conn = sqlite3.connect(os.path.join(tempfile.mkdtemp(), 'router.db'))
+    conn.row_factory = sqlite3.Row
+    ModelRouter.install(conn)
+    return ModelRouter(lambda: conn, **kwargs)
+
+def test_unknown_models_keep_configured_order():
+    """Test that models without samples are tried in MODELS order"""
+    router = make_router()
+    assert router.order(['a', 'b', 'c']) == ['a', 'b', 'c']
+
+def test_orders_by_latency_and_success():
+    """Test that a fast, reliable model moves ahead of a slow one"""
+    router = make_router()
+    router.record_success('slow', 9000)
+    router.record_success('fast', 800)
+    router.record_success('flaky', 500)
+    router.record_failure('flaky', 500, 'HTTP 500')
+    router.record_failure('flaky', 500, 'HTTP 500')
+    # flaky: success rate 0.64 -> 500 / 0.64 ~ 780ms, still ahead of fast's 800ms
+    assert router.order(['slow', 'fast', 'flaky']) == ['flaky', 'fast', 'slow']
+    router.record_failure('flaky', 500, 'HTTP 500')
+    assert router.order(['slow', 'fast', 'flaky']) == ['fast', 'slow']
+
+def test_circuit_opens_after_threshold_and_closes_on_success():
+    """Test that consecutive failures open the circuit and a success resets it"""
+    router = make_router(failure_threshold=2, open_seconds=60)
+    router.record_failure('m', 30000, 'timeout')
+    assert router.order(['m']) == ['m']
+    router.record_failure('m', 30000, 'timeout')
+    assert router.order(['m', 'other']) == ['other']
+
+    # Once the open period has passed one request gets the trial; the others keep skipping it
+    router._get_connection().execute("UPDATE model_stats SET open_until = ?", (time.time() - 1,))
+    assert router.order(['m'], claim_trials=False) == ['m']
+    assert router.order(['m']) == ['m']
+    assert router.order(['m', 'other']) == ['other']
+    router.record_success('m', 1000)
+    stats = router.stats()['m']
+    assert stats['consecutive_failures'] == 0 and stats['open_until'] == 0
+
+def test_failed_trial_reopens_and_expired_claim_frees_trial():
+    """Test that a failed trial reopens the circuit for longer, and an abandoned claim lets another request try"""
+    router = make_router(failure_threshold=1, open_seconds=10, trial_seconds=5)
+    router.record_failure('m', 100, 'HTTP 502')
+    conn = router._get_connection()
+    conn.execute("UPDATE model_stats SET open_until = ?", (time.time() - 1,))
+    assert router.order(['m']) == ['m']
+    assert 4 < router.stats()['m']['open_until'] - time.time() <= 5
+    router.record_failure('m', 100, 'HTTP 502')
+    assert router.order(['m']) == []
+    assert 15 < router.stats()['m']['open_until'] - time.time() <= 20
+
+    conn.execute("UPDATE model_stats SET open_until = ?", (time.time() - 1,))
+    assert router.order(['m']) == ['m']
+    # The trial never reported back: once the claim expires the next request takes over
+    conn.execute("UPDATE model_stats SET open_until = ?", (time.time() - 1,))
+    assert router.order(['m']) == ['m']
+
+def test_open_period_doubles():
+    """Test that failures past the threshold back off exponentially"""
+    router = make_router(failure_threshold=1, open_seconds=10, max_open_seconds=25)
+    periods = []
+    for _ in range(3):
+        router.record_failure('m', 100, 'HTTP 502')
+        periods.append(round(router.stats()['m']['open_until'] - time.time()))
+    assert periods == [10, 20, 25]
+
+def test_retry_after_opens_circuit():
+    """Test that a 429 with Retry-After skips the model for that long, even below the threshold"""
+    router = make_router(failure_threshold=5)
+    router.record_failure('limited', 200, 'HTTP 429', retry_after=120)
+    assert router.order(['limited', 'ok']) == ['ok']
+    assert 115 < router.stats()['limited']['open_until'] - time.time() <= 120
+
+def test_parse_retry_after():
+    """Test both Retry-After forms"""
+    assert parse_retry_after('30') == 30
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    date = time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime(time.time() + 60))
+    assert 55 < parse_retry_after(date) <= 60
+
+if __name__ == "__main__":
+    print("Testing model router...")
+    test_unknown_models_keep_configured_order()
+    test_orders_by_latency_and_success()
+    test_circuit_opens_after_threshold_and_closes_on_success()
+    test_failed_trial_reopens_and_expired_claim_frees_trial()
+    test_open_period_doubles()
+    test_retry_after_opens_circuit()
+    test_parse_retry_after()
+    print("All model router tests passed")
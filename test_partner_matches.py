@@ -0,0 +1,127 @@
+"""
+Test script to verify precomputed partner matches and their incremental refresh
+"""
+
+import os
+import sqlite3
+import tempfile
+from db_connections import attach
+from industry_taxonomy import install_industries
+from partner_matches import (
+    MatchScorer,
+    install_matches,
+    rebuild,
+    refresh,
+    vendor_matches,
+    vendor_connections,
+    load_companies,
+    load_vendors,
+    _load_adjacency,
+    _load_vocabulary
+)
+
+COMPANIES = [
+    ('Karachi Textile Mills', 'Textiles', 'Cotton yarn and fabrics', 'Pakistan'),
+    ('Nairobi Garments', 'Garments', 'Cotton shirts and fabrics export', 'Kenya'),
+    ('Lagos Leather', 'Leather', 'Leather bags and shoes', 'Nigeria'),
+    ('Cairo Rice Mills', 'Agriculture', 'Rice and grains', 'Egypt'),
+    ('Accra Bank', 'Finance', 'Trade finance', 'Ghana'),
+    ('Kigali Code', 'Technology', 'Software development', 'Rwanda'),
+]
+
+def make_dbs(folder=None):
+    user = sqlite3.connect(os.path.join(folder, 'user.db') if folder else ':memory:')
+    user.row_factory = sqlite3.Row
+    user.execute('''CREATE TABLE company_profiles (id INTEGER PRIMARY KEY, user_id INTEGER, industry TEXT,
+                    location TEXT, product_description TEXT, about_us TEXT, products_and_services TEXT)''')
+    user.execute('''INSERT INTO company_profiles (user_id, industry, location, about_us, products_and_services)
+                    VALUES (1, 'Textile & Apparel', 'Faisalabad, Pakistan', 'We weave cotton fabrics',
+                            '[{"id": 1, "name": "Cotton fabrics", "image": "/static/x.png"}]')''')
+    user.execute('''INSERT INTO company_profiles (user_id, industry, location, about_us)
+                    VALUES (2, 'IT services', 'Lahore, Pakistan', 'Custom software development')''')
+    partner = sqlite3.connect(os.path.join(folder, 'partner.db') if folder else ':memory:')
+    partner.row_factory = sqlite3.Row
+    partner.execute('CREATE TABLE company (id INTEGER PRIMARY KEY, name TEXT, industry TEXT, services TEXT, country TEXT)')
+    partner.executemany('INSERT INTO company (name, industry, services, country) VALUES (?, ?, ?, ?)', COMPANIES)
+    install_industries(user, 'company_profiles')
+    install_industries(partner, 'company')
+    install_matches(user, partner)
+    return user, partner
+
+def names(user, partner, vendor_id):
+    return [partner.execute('SELECT name FROM company WHERE id = ?', (m['company_id'],)).fetchone()[0]
+            for m in vendor_matches(user, vendor_id)]
+
+def test_first_refresh_ranks_matches():
+    """Test that existing vendors are queued and scored on industry, text and country"""
+    user, partner = make_dbs()
+    assert refresh(user, partner, limit=3) == {'vendors': 2, 'companies': 6}
+    # Same industry and text, and abroad, beats the same industry at home
+    assert names(user, partner, 1) == ['Nairobi Garments', 'Karachi Textile Mills', 'Lagos Leather']
+    assert names(user, partner, 2)[0] == 'Kigali Code'
+    assert refresh(user, partner) == {'vendors': 0, 'companies': 0}
+
+def test_incremental_matches_full_rescore():
+    """Test that queued profile and company changes give the same lists as scoring from scratch"""
+    user, partner = make_dbs()
+    refresh(user, partner, limit=3)
+    partner.execute("INSERT INTO company (name, industry, services, country) VALUES ('Dakar Denim', 'Textile', 'Cotton denim fabrics', 'Senegal')")
+    partner.execute("DELETE FROM company WHERE name = 'Nairobi Garments'")
+    partner.execute("UPDATE company SET services = 'Cotton and software' WHERE name = 'Accra Bank'")
+    partner.commit()
+    user.execute("UPDATE company_profiles SET about_us = 'Rice export' WHERE user_id = 2")
+    user.commit()
+    assert refresh(user, partner, limit=3) == {'vendors': 1, 'companies': 3}
+    assert names(user, partner, 1)[0] == 'Dakar Denim'
+    assert 'Nairobi Garments' not in names(user, partner, 1) and len(names(user, partner, 1)) == 3
+    assert_same_as_full_rescore(user, partner)
+
+    # Only companies changed: merged into the stored lists without rescoring the vendors
+    partner.execute("INSERT INTO company (name, industry, services, country) VALUES ('Multan Looms', 'Textiles', 'Cotton fabrics', 'Pakistan')")
+    partner.execute("UPDATE company SET services = 'Software and cotton fabrics' WHERE name = 'Kigali Code'")
+    partner.commit()
+    assert refresh(user, partner, limit=3) == {'vendors': 0, 'companies': 2}
+    assert_same_as_full_rescore(user, partner)
+
+def assert_same_as_full_rescore(user, partner):
+    vocabulary, idf = _load_vocabulary(user)
+    scorer = MatchScorer(load_companies(partner), vocabulary, idf, _load_adjacency(user))
+    expected = scorer.top_matches(load_vendors(user), 3)
+    for vendor_id, matches in expected.items():
+        assert [m['company_id'] for m in vendor_matches(user, vendor_id)] == [m[0] for m in matches]
+
+def test_rebuild_and_deleted_vendor():
+    """Test that rebuild refits the vocabulary and a deleted profile loses its matches"""
+    user, partner = make_dbs()
+    stats = rebuild(user, partner)
+    assert stats['vendors'] == 2 and stats['terms'] > 0
+    assert user.execute("SELECT COUNT(*) FROM vendor_match_changes").fetchone()[0] == 0
+    user.execute("DELETE FROM company_profiles WHERE user_id = 2")
+    user.commit()
+    refresh(user, partner)
+    assert vendor_matches(user, 2) == [] and vendor_matches(user, 1)
+
+def test_vendor_connections_in_one_query():
+    """Test the connections_page query across the attached partner database"""
+    folder = tempfile.mkdtemp()
+    user, partner = make_dbs(folder)
+    partner.commit()
+    attach(user, 'partner', os.path.join(folder, 'partner.db'))
+    # Not scored yet: same industry first, then adjacent ones, by name
+    before = vendor_connections(user, 1)
+    assert [row['name'] for row in before[:2]] == ['Karachi Textile Mills', 'Nairobi Garments']
+    assert before[0]['relevance'] == 1 and before[-1]['relevance'] < 1
+    assert before[-1]['matched_industry'] in ('Leather', 'Agriculture', 'Retail', 'Manufacturing', 'Chemicals')
+    refresh(user, partner, limit=3)
+    after = vendor_connections(user, 1, limit=2)
+    assert [row['id'] for row in after] == [m['company_id'] for m in vendor_matches(user, 1, 2)]
+    assert after[0]['name'] == 'Nairobi Garments'
+    assert vendor_connections(user, 99) == []
+
+if __name__ == "__main__":
+    print("Testing partner matches...")
+    test_first_refresh_ranks_matches()
+    test_incremental_matches_full_rescore()
+    test_rebuild_and_deleted_vendor()
+    test_vendor_connections_in_one_query()
+    print("All partner match tests passed")
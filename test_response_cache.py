@@ -0,0 +1,79 @@
+"""
+Test script to verify the /ask response cache
+"""
+
+import time
+from company_cache import invalidate_all
+from response_cache import ResponseCache, normalize
+
+def test_normalize():
+    """Test that case, punctuation, stopwords and plurals don't change the key"""
+    assert normalize('Who exports RICE?')[0] == normalize('exports rice')[0] == 'export rice'
+    assert normalize('Who are you?')[0] == 'who are you?'
+
+def test_exact_and_near_hits():
+    """Test exact hits, near-duplicate hits and misses"""
+    cache = ResponseCache(similarity=0.6)
+    cache.put('textile suppliers in Pakistan', 1, 'Sialkot Textiles', 'm', 3, request_bytes=100)
+    assert cache.get('Textile suppliers in pakistan?', 1)['reply'] == 'Sialkot Textiles'
+    assert cache.get('kindly share pakistan textile suppliers', 1)['reply'] == 'Sialkot Textiles'
+    assert cache.get('rice suppliers in Kenya', 1) is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['near_hits'], stats['misses']) == (1, 1, 1)
+    assert stats['bytes_saved'] == 2 * (100 + len('Sialkot Textiles'))
+
+def test_exact_only():
+    """Test that similarity=1 turns near-duplicate matching off, but word order still doesn't matter"""
+    cache = ResponseCache(similarity=1)
+    cache.put('textile suppliers in Pakistan', 1, 'reply', 'm')
+    assert cache.get('pakistan textile suppliers', 1)['reply'] == 'reply'
+    assert cache.get('kindly pakistan textile suppliers', 1) is None
+    assert ResponseCache().similarity is None
+
+def test_different_place_never_near_hit():
+    """Test that long questions naming a different city or company don't share a reply"""
+    cache = ResponseCache(similarity=0.5)
+    question = 'verified cotton yarn fabric exporters with organic certification and fast shipping in {}'
+    cache.put(question.format('Karachi'), 1, 'Karachi reply', 'm')
+    assert cache.get(question.format('Lahore'), 1) is None
+    assert cache.get('kindly ' + question.format('Karachi'), 1)['reply'] == 'Karachi reply'
+
+def test_version_change_drops_entries():
+    """Test that a new company data version invalidates everything"""
+    cache = ResponseCache()
+    cache.put('list all companies', 1, 'reply', 'm')
+    assert cache.get('list all companies', 2) is None
+    assert cache.stats()['entries'] == 0
+    assert cache.get('list all companies', None) is None
+
+def test_invalidate_all_clears_cache():
+    """Test that company_cache.invalidate_all reaches the response cache"""
+    cache = ResponseCache()
+    cache.put('list all companies', 1, 'reply', 'm')
+    invalidate_all()
+    assert cache.get('list all companies', 1) is None
+
+def test_ttl_and_lru():
+    """Test expiry and least-recently-used eviction"""
+    cache = ResponseCache(max_entries=2, ttl=60)
+    cache.put('rice', 1, 'r', 'm')
+    cache.put('cotton', 1, 'c', 'm')
+    cache.get('rice', 1)
+    cache.put('leather', 1, 'l', 'm')
+    assert cache.get('cotton', 1) is None
+    assert cache.get('rice', 1) and cache.get('leather', 1)
+
+    cache._entries['rice']['stored_at'] = time.time() - 61
+    assert cache.get('rice', 1) is None
+    assert cache.stats()['entries'] == 1
+
+if __name__ == "__main__":
+    print("Testing response cache...")
+    test_normalize()
+    test_exact_and_near_hits()
+    test_exact_only()
+    test_different_place_never_near_hit()
+    test_version_change_drops_entries()
+    test_invalidate_all_clears_cache()
+    test_ttl_and_lru()
+    print("All response cache tests passed")
@@ -0,0 +1,91 @@
+"""
+Test script to verify static asset fingerprinting, caching headers and precompression
+"""
+
+import gzip
+import os
+import tempfile
+import time
+from flask import Flask, url_for
+from static_assets import StaticAssets, precompress
+
+CSS = b'body { color: #006a44; }\n' * 200
+
+def make_app():
+    folder = tempfile.mkdtemp()
+    os.makedirs(os.path.join(folder, 'css'))
+    with open(os.path.join(folder, 'css', 'styles.css'), 'wb') as f:
+        f.write(CSS)
+    with open(os.path.join(folder, 'logo.png'), 'wb') as f:
+        f.write(b'\x89PNG not really')
+    app = Flask(__name__, static_folder=folder, static_url_path='/static')
+    assets = StaticAssets(app)
+    return app, assets, folder
+
+def test_url_for_fingerprints():
+    """Test that url_for puts the content hash in the file name"""
+    app, assets, folder = make_app()
+    with app.test_request_context():
+        url = url_for('static', filename='css/styles.css')
+        assert url == f"/static/css/styles.{assets.fingerprint('css/styles.css')}.css"
+        assert url_for('static', filename='missing.css') == '/static/missing.css'
+        assert url_for('static', filename='uploads/a.png') == '/static/uploads/a.png'
+    # Editing the file changes its URL
+    time.sleep(0.01)
+    with open(os.path.join(folder, 'css', 'styles.css'), 'ab') as f:
+        f.write(b'a { color: red; }')
+    with app.test_request_context():
+        assert url_for('static', filename='css/styles.css') != url
+
+def test_cache_headers_and_304():
+    """Test immutable caching for fingerprinted URLs and revalidation for plain ones"""
+    app, _, _ = make_app()
+    client = app.test_client()
+    with app.test_request_context():
+        url = url_for('static', filename='logo.png')
+    response = client.get(url)
+    assert response.status_code == 200 and response.data == b'\x89PNG not really'
+    assert response.cache_control.immutable and response.cache_control.max_age == 365 * 24 * 3600
+    etag = response.headers['ETag']
+    response.close()
+
+    response = client.get('/static/logo.png')
+    assert response.cache_control.no_cache and not response.cache_control.immutable
+    response.close()
+    response = client.get('/static/logo.png', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    response.close()
+    # An outdated fingerprint still gets the file, but it mustn't be cached forever
+    response = client.get('/static/logo.0123456789ab.png')
+    assert response.status_code == 200 and not response.cache_control.immutable
+    response.close()
+
+def test_precompressed_assets():
+    """Test that the build writes .gz/.br files and the best accepted one is served"""
+    app, _, folder = make_app()
+    totals = precompress(folder, report=lambda line: None)
+    assert totals['files'] == 1 and totals['gzip'] < totals['original']
+    assert not os.path.exists(os.path.join(folder, 'logo.png.gz'))
+    client = app.test_client()
+    with app.test_request_context():
+        url = url_for('static', filename='css/styles.css')
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.mimetype == 'text/css' and 'Accept-Encoding' in response.vary
+    assert gzip.decompress(response.data) == CSS
+    response.close()
+    if os.path.exists(os.path.join(folder, 'css', 'styles.css.br')):
+        response = client.get(url, headers={'Accept-Encoding': 'gzip, br'})
+        assert response.headers['Content-Encoding'] == 'br'
+        response.close()
+    response = client.get(url)
+    assert 'Content-Encoding' not in response.headers and response.data == CSS
+    response.close()
+
+if __name__ == "__main__":
+    print("Testing static assets...")
+    test_url_for_fingerprints()
+    test_cache_headers_and_304()
+    test_precompressed_assets()
+    print("All static asset tests passed")
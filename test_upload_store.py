@@ -0,0 +1,103 @@
+"""
+Test script to verify content-addressed upload storage and garbage collection
+"""
+
+import hashlib
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+from upload_store import (
+    install_upload_store,
+    store_upload,
+    digests_in,
+    sync_refs,
+    refcounts,
+    collect_garbage
+)
+
+def make_store():
+    root = tempfile.mkdtemp()
+    conn = sqlite3.connect(os.path.join(root, 'uploads.db'))
+    install_upload_store(conn)
+    return root, conn
+
+def test_store_dedupes_by_content():
+    """Test sharded SHA-256 names, one file for identical bytes, no overwrite for equal names"""
+    root, conn = make_store()
+    data = b'\x89PNG fake logo bytes'
+    digest = hashlib.sha256(data).hexdigest()
+    assert store_upload(conn, io.BytesIO(data), root, '.PNG') == \
+        (digest, f'{digest[:2]}/{digest[2:4]}/{digest}.png', True)
+    # Same bytes from another vendor (even as .jpeg): stored once, first path kept
+    assert store_upload(conn, io.BytesIO(data), root, '.jpeg') == \
+        (digest, f'{digest[:2]}/{digest[2:4]}/{digest}.png', False)
+    # Different bytes under the same original name get their own file
+    other, other_path, created = store_upload(conn, io.BytesIO(b'another logo'), root, '.png')
+    assert created and other != digest
+    with open(os.path.join(root, other_path), 'rb') as f:
+        assert f.read() == b'another logo'
+    assert not [name for name in os.listdir(root) if name.startswith('.upload-')]
+
+def test_refcounts_follow_profiles():
+    """Test that saving a profile replaces its references"""
+    root, conn = make_store()
+    logo, _, _ = store_upload(conn, io.BytesIO(b'logo'), root, '.png')
+    product, _, _ = store_upload(conn, io.BytesIO(b'product'), root, '.jpg')
+    products_json = f'[{{"id": 1, "image": "/static/uploads/ab/cd/{product}-medium.jpg"}}]'
+    assert digests_in(f'/static/uploads/x/y/{logo}.png', None, products_json) == {logo, product}
+
+    sync_refs(conn, 'profile:1', {logo, product})
+    sync_refs(conn, 'profile:2', {logo})
+    assert refcounts(conn) == {logo: 2, product: 1}
+    sync_refs(conn, 'profile:1', set())
+    assert refcounts(conn) == {logo: 1, product: 0}
+
+def test_garbage_collection():
+    """Test that only old, unreferenced blobs and their variants are deleted"""
+    root, conn = make_store()
+    kept, kept_path, _ = store_upload(conn, io.BytesIO(b'kept'), root, '.png')
+    dropped, dropped_path, _ = store_upload(conn, io.BytesIO(b'dropped'), root, '.png')
+    fresh, fresh_path, _ = store_upload(conn, io.BytesIO(b'fresh'), root, '.png')
+    variant = os.path.join(root, os.path.dirname(dropped_path), f'{dropped}-thumb.webp')
+    with open(variant, 'wb') as f:
+        f.write(b'1234')
+    sync_refs(conn, 'profile:1', {kept})
+    conn.execute("UPDATE upload_blobs SET created_at = datetime('now', '-2 days') WHERE digest != ?", (fresh,))
+    conn.commit()
+
+    assert collect_garbage(conn, root, dry_run=True) == {'blobs': 1, 'files': 2, 'bytes': 11}
+    assert os.path.exists(variant)
+    assert collect_garbage(conn, root) == {'blobs': 1, 'files': 2, 'bytes': 11}
+    assert not os.path.exists(os.path.join(root, dropped_path)) and not os.path.exists(variant)
+    assert os.path.exists(os.path.join(root, kept_path)) and os.path.exists(os.path.join(root, fresh_path))
+    assert set(refcounts(conn)) == {kept, fresh}
+
+def test_hashed_uploads_cached_immutably():
+    """Test the Cache-Control header on content-addressed uploads"""
+    from app import app
+    digest = hashlib.sha256(b'cache test').hexdigest()
+    folder = os.path.join(app.static_folder, 'uploads', digest[:2])
+    os.makedirs(os.path.join(folder, digest[2:4]), exist_ok=True)
+    try:
+        with open(os.path.join(folder, digest[2:4], f'{digest}.png'), 'wb') as f:
+            f.write(b'cache test')
+        client = app.test_client()
+        response = client.get(f'/static/uploads/{digest[:2]}/{digest[2:4]}/{digest}.png')
+        assert response.status_code == 200
+        assert response.cache_control.immutable and response.cache_control.max_age == 365 * 24 * 3600
+        response.close()
+        response = client.get('/static/css/styles.css')
+        assert not response.cache_control.immutable
+        response.close()
+    finally:
+        shutil.rmtree(folder)
+
+if __name__ == "__main__":
+    print("Testing upload store...")
+    test_store_dedupes_by_content()
+    test_refcounts_follow_profiles()
+    test_garbage_collection()
+    test_hashed_uploads_cached_immutably()
+    print("All upload store tests passed")
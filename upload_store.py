@@ -0,0 +1,180 @@
+"""
+Content-addressed storage for vendor uploads.
+
+Uploads are named by the SHA-256 of their bytes and sharded two directories
+deep (static/uploads/ab/cd/abcd...ef.png), so two vendors' "logo.png" can't
+overwrite each other, the same image uploaded twice is stored once, and a
+file's URL never points at different content - which lets it be served with
+an immutable Cache-Control header. Derived files (the resized variants from
+image_pipeline.py) are written next to the blob as <digest>-<variant>.<ext>.
+
+upload_refs holds one row per (owner, digest); owners are company profiles
+('profile:<user_id>') and sync_refs() replaces an owner's set every time the
+profile is saved, so a blob's reference count is its number of rows.
+collect_garbage() deletes blobs nobody references any more, with their
+variants.
+
+Usage:
+    python upload_store.py gc [--dry-run] [--grace-hours 24] [--db database.db] [--root static/uploads]
+"""
+
+import argparse
+import glob
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from db_connections import DATABASES, BUSY_TIMEOUT_MS, configure_connection
+
+UPLOAD_STORE_DDL = [
+    '''
+    CREATE TABLE IF NOT EXISTS upload_blobs (
+        digest TEXT PRIMARY KEY,
+        path TEXT NOT NULL,
+        bytes INTEGER NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS upload_refs (
+        owner TEXT NOT NULL,
+        digest TEXT NOT NULL,
+        PRIMARY KEY (owner, digest)
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_upload_refs_digest ON upload_refs (digest)",
+]
+
+# Same format, same extension: "photo.jpeg" and "photo.JPG" share one blob
+EXTENSION_ALIASES = {'.jpeg': '.jpg', '.tif': '.tiff'}
+
+CHUNK_SIZE = 64 * 1024
+
+# A digest in a stored URL: the blob itself (<digest>.png) or one of its variants (<digest>-thumb.webp)
+DIGEST_RE = re.compile(r'(?<![0-9a-f])([0-9a-f]{64})(?=[.-])')
+
+# Unreferenced blobs older than the grace period (a newer one may belong to a form still being saved)
+UNREFERENCED_SQL = '''
+    SELECT digest, path FROM upload_blobs
+    WHERE NOT EXISTS (SELECT 1 FROM upload_refs WHERE upload_refs.digest = upload_blobs.digest)
+      AND created_at < datetime('now', ?)
+'''
+
+
+def install_upload_store(conn):
+    for statement in UPLOAD_STORE_DDL:
+        conn.execute(statement)
+    conn.commit()
+
+
+def blob_path(digest, extension):
+    """Path of a blob relative to the upload root, e.g. ab/cd/abcd...ef.png"""
+    extension = extension.lower()
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{EXTENSION_ALIASES.get(extension, extension)}"
+
+
+def store_upload(conn, stream, root, extension):
+    """Write an upload into the store, hashing it while it streams to disk.
+
+    Returns (digest, relative path, created); created is False when the same
+    bytes were already stored, in which case the existing file is reused.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    # Same directory as the blobs, so the final rename is atomic
+    with tempfile.NamedTemporaryFile(dir=root, prefix='.upload-', delete=False) as temp:
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            temp.write(chunk)
+            size += len(chunk)
+    digest = digest.hexdigest()
+
+    existing = conn.execute("SELECT path FROM upload_blobs WHERE digest = ?", (digest,)).fetchone()
+    path = existing[0] if existing else blob_path(digest, extension)
+    target = os.path.join(root, path)
+    if os.path.exists(target):
+        os.remove(temp.name)
+        created = False
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(temp.name, target)
+        created = True
+    conn.execute(
+        "INSERT OR REPLACE INTO upload_blobs (digest, path, bytes, created_at) VALUES (?, ?, ?, CURRENT_TIMESTAMP)",
+        (digest, path, size)
+    )
+    conn.commit()
+    return digest, path, created
+
+
+def digests_in(*values):
+    """Blob digests referenced by stored URLs, comma lists or JSON (None values are skipped)"""
+    return {match for value in values if value for match in DIGEST_RE.findall(value)}
+
+
+def sync_refs(conn, owner, digests):
+    """Make `digests` the complete set of blobs `owner` uses. Doesn't commit, so it can
+    share the transaction that saves the owner"""
+    conn.execute("DELETE FROM upload_refs WHERE owner = ?", (owner,))
+    conn.executemany(
+        "INSERT OR IGNORE INTO upload_refs (owner, digest) VALUES (?, ?)",
+        [(owner, digest) for digest in sorted(digests)]
+    )
+
+
+def refcounts(conn):
+    """{digest: number of owners} for every stored blob"""
+    rows = conn.execute('''
+        SELECT upload_blobs.digest, COUNT(upload_refs.owner)
+        FROM upload_blobs LEFT JOIN upload_refs ON upload_refs.digest = upload_blobs.digest
+        GROUP BY upload_blobs.digest
+    ''')
+    return {digest: count for digest, count in rows}
+
+
+def collect_garbage(conn, root, grace_seconds=86400, dry_run=False):
+    """Delete unreferenced blobs and their variants. Returns counts of blobs, files and bytes removed"""
+    stats = {'blobs': 0, 'files': 0, 'bytes': 0}
+    has_images = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'uploaded_images'").fetchone()
+    for digest, path in conn.execute(UNREFERENCED_SQL, (f'-{int(grace_seconds)} seconds',)).fetchall():
+        blob = os.path.join(root, path)
+        files = [blob] + glob.glob(os.path.join(os.path.dirname(blob), f'{digest}-*'))
+        for file in files:
+            if os.path.exists(file):
+                stats['files'] += 1
+                stats['bytes'] += os.path.getsize(file)
+                if not dry_run:
+                    os.remove(file)
+        stats['blobs'] += 1
+        if not dry_run:
+            conn.execute("DELETE FROM upload_blobs WHERE digest = ?", (digest,))
+            if has_images:
+                conn.execute("DELETE FROM uploaded_images WHERE src LIKE ?", (f'%/{digest}.%',))
+    conn.commit()
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintenance for content-addressed uploads")
+    parser.add_argument('command', choices=['gc'])
+    parser.add_argument('--db', default=DATABASES['user'], help="database with upload_refs (default: %(default)s)")
+    parser.add_argument('--root', default='static/uploads', help="upload folder (default: %(default)s)")
+    parser.add_argument('--grace-hours', type=float, default=24, help="keep unreferenced uploads this recent")
+    parser.add_argument('--dry-run', action='store_true', help="only report what would be deleted")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db, timeout=BUSY_TIMEOUT_MS / 1000)
+    configure_connection(conn)
+    try:
+        install_upload_store(conn)
+        stats = collect_garbage(conn, args.root, args.grace_hours * 3600, args.dry_run)
+    finally:
+        conn.close()
+    verb = 'Would remove' if args.dry_run else 'Removed'
+    print(f"{verb} {stats['blobs']} unreferenced uploads ({stats['files']} files, {stats['bytes']:,} bytes)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])